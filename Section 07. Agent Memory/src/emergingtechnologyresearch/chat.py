@@ -1,27 +1,16 @@
 import os
-from langfuse import get_client
-from openinference.instrumentation.crewai import CrewAIInstrumentor
-from . utils.crewUtils import executeApp
 from termcolor import colored
-from . utils.env import populateEnvWithSecrets
+from . utils.startup import startWarmUp, warmUp, getLangfuse
 import uuid
 import asyncio
 from rich.console import Console
 from rich.markdown import Markdown
 
-# Step1: Populate environment variables from AWS secrets manager
-populateEnvWithSecrets()
-    
-# Step2: Setup langfuse for tracing
-langfuse = get_client()
-if langfuse.auth_check():
-    print("Langfuse client is authenticated and ready!")
-else:
-    print("Authentication failed. Please check your credentials and host.")
-CrewAIInstrumentor().instrument(skip_dep_check=True)
-
-#Step3: Run while loop for chat
+#Step1: Run while loop for chat
 async def main():
+    # Populating environment variables from AWS secrets manager and setting up langfuse for tracing
+    # run in the background, together with loading the crews, while the user types the first prompt.
+    startWarmUp()
     sessionId = f"{uuid.uuid4()}"
     actorId = os.getenv("ACTOR_ID", f"{uuid.uuid4()}")
     os.environ["ACTOR_ID"] = actorId
@@ -31,6 +20,10 @@ async def main():
             print("Chatbot: Goodbye! It was nice talking to you.")
             break
 
+        await warmUp()
+        from . utils.crewUtils import executeApp
+        langfuse = getLangfuse()
+
         inputs = {
             "prompt": user_input,
             'sessionId': sessionId,
@@ -5,10 +5,15 @@ from crewai.flow.flow import Flow, listen, router, start
 from typing import Any,Optional
 from pydantic import BaseModel, Field
 from . utils.memoryUtils import MemoryUtils
+from . utils.crewFactory import kickoffCrew
+from . utils.metricsUtils import recordStep
+from . utils.reportPipeline import isPipelined, writeReport
 from . crews.followupCrew import FollowupQuestionCrew
 from . crews.intentCrew import Intent, PromptIntent, IntentAnalyzer
 from . crews.researchCrew import Emergingtechnologyresearch, ResearchReport
 
+import asyncio
+
 # Pydantic model for the flow state
 class EmergingTechnologyFlowState(BaseModel):
     prompt:Optional[str] = Field(default=None, description="User prompt")
@@ -23,32 +28,58 @@ class EmergingTechnologyFlowState(BaseModel):
 # Flow taking care of user prompt
 class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
     stepCallback:Any=None
+    conversationHistoryTask:Any=None
 
     def __init__(self, stepCallback=None):
         super().__init__()
         self.stepCallback = stepCallback
     
     @start()
-    def initialize(self):
-        self.state.conversationHistory = MemoryUtils(
+    @recordStep
+    async def initialize(self):
+        memoryUtils = MemoryUtils(
             sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).loadShortTermMemory()
+            actorId=self.state.actorId)
 
-        self.state.preferences = MemoryUtils(
-            sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).extractUserPreferences()
+        # Both AgentCore round trips are started together, off the event loop. Only the 
+        # preferences are needed by the intent prompt, so the history keeps loading while
+        # the IntentAnalyzer runs and is awaited by the steps which consume it.
+        self.conversationHistoryTask = asyncio.create_task(asyncio.to_thread(memoryUtils.loadShortTermMemory))
+        self.state.preferences = await asyncio.to_thread(memoryUtils.extractUserPreferences)
+
+    async def loadConversationHistory(self) -> str:
+        if self.conversationHistoryTask:
+            self.state.conversationHistory = await self.conversationHistoryTask
+            self.conversationHistoryTask = None
+        return self.state.conversationHistory
+
+    async def discardConversationHistory(self):
+        # The flow may end before a step awaited the history, on an error or a route like
+        # UserProfileIsRequired, so the pending load is cancelled instead of being left behind
+        if self.conversationHistoryTask:
+            self.conversationHistoryTask.cancel()
+            await asyncio.gather(self.conversationHistoryTask, return_exceptions=True)
+            self.conversationHistoryTask = None
+
+    async def kickoff_async(self, *args, **kwargs):
+        try:
+            return await super().kickoff_async(*args, **kwargs)
+        finally:
+            await self.discardConversationHistory()
 
     @listen("initialize")
-    def checkIntent(self):
+    @recordStep
+    async def checkIntent(self):
         inputs = {
             'prompt': self.state.prompt,
             'preferences': self.state.preferences
         }
 
-        response = IntentAnalyzer(self.stepCallback).crew().kickoff(inputs=inputs)
+        response = await kickoffCrew(IntentAnalyzer, inputs, self.stepCallback)
         self.state.intent = response.pydantic
 
     @router(checkIntent)
+    @recordStep
     def routeRequest(self):
         match self.state.intent.intent:
             case Intent.EMERGING_TECHNOLOGY_RESEARCH:
@@ -57,16 +88,22 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
                 return "EmergingTechnologyFollowup"
 
     @listen("EmergingTechnologyResearch")
-    def research(self):
+    @recordStep
+    async def research(self):
         inputs = {
             'topic': self.state.intent.topic,
             'current_year': str(datetime.now().year),
             'style': self.state.intent.style,
             'prompt': self.state.prompt,
         }
-        self.state.report = Emergingtechnologyresearch(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        if isPipelined():
+            # One reporting call per research bullet point, executed concurrently
+            self.state.report = await writeReport(inputs, self.stepCallback)
+        else:
+            self.state.report = (await kickoffCrew(Emergingtechnologyresearch, inputs, self.stepCallback)).pydantic
 
     @listen(research)
+    @recordStep
     def generateReport(self):
         if self.state.report:
             response = f"# Research Report on: {self.state.intent.topic}\n"
@@ -84,15 +121,18 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
             self.state.response = response
 
     @listen("EmergingTechnologyFollowup")
-    def followup(self):
+    @recordStep
+    async def followup(self):
         inputs = {
             'prompt': self.state.prompt,
             'style': self.state.intent.style,
-            'history': self.state.conversationHistory,
+            'history': await self.loadConversationHistory(),
             'actorId': self.state.actorId
         }
-        self.state.response = FollowupQuestionCrew(self.stepCallback).crew().kickoff(inputs=inputs).raw
+        self.state.response = (await kickoffCrew(FollowupQuestionCrew, inputs, self.stepCallback)).raw
 
     @listen(or_(generateReport, followup))
-    def finish(self):
+    @recordStep
+    async def finish(self):
+        await self.loadConversationHistory()
         return self.state.response
\ No newline at end of file
@@ -0,0 +1,147 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# OFF, CACHE (serve hits, call the LLM on a miss), RECORD (always call the LLM and store the
+# response) or REPLAY (serve from the cache only, a miss is an error)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "OFF").upper()
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llmCache.db")
+# Seconds a response is served for in CACHE mode, 0 keeps it forever. Replays ignore it.
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))
+# Maximum number of responses kept, the least recently used ones are evicted beyond it
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "10000"))
+
+class LlmCacheMiss(Exception):
+    """Raised in REPLAY mode for a prompt which wasn't recorded."""
+    def __init__(self, model:str, key:str):
+        super().__init__(f"No recorded response of {model} for the prompt {key[:12]}, record the run first")
+
+class LlmCache:
+    """Persistent exact-match cache of LLM responses, keyed on model, messages, tools, temperature
+    and the expected response model. Only text responses are cached."""
+
+    def __init__(self, mode:str=LLM_CACHE_MODE, path:str=LLM_CACHE_PATH, ttl:int=LLM_CACHE_TTL,
+                 maxEntries:int=LLM_CACHE_SIZE):
+        self.mode = mode
+        self.path = path
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self.local = threading.local()
+        self.initLock = threading.Lock()
+        self.initialized = False
+        self.statsLock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def isEnabled(self) -> bool:
+        return self.mode in ("CACHE", "RECORD", "REPLAY")
+
+    def getConnection(self) -> sqlite3.Connection:
+        # The database is only created once the cache is used
+        if not self.initialized:
+            with self.initLock:
+                if not self.initialized:
+                    connection = sqlite3.connect(self.path, timeout=30)
+                    with connection:
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.execute(
+                            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, "
+                            "response TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+                        connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+                    connection.close()
+                    self.initialized = True
+        # sqlite3 connections can't be shared between threads, so each thread gets its own
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def getKey(self, model:str, messages, tools, temperature, responseModel) -> str:
+        schema = responseModel.model_json_schema() if hasattr(responseModel, "model_json_schema") else None
+        payload = {"model": model, "messages": messages, "tools": tools, "temperature": temperature,
+                   "responseModel": schema}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key:str) -> str | None:
+        now = time.time()
+        connection = self.getConnection()
+        with connection:
+            row = connection.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, createdAt = row
+            if self.mode != "REPLAY" and self.ttl and now - createdAt > self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return response
+
+    def put(self, key:str, model:str, response:str):
+        now = time.time()
+        connection = self.getConnection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now))
+            if self.ttl:
+                connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxEntries,))
+
+    def record(self, hit:bool):
+        with self.statsLock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def wrap(self, llm):
+        """Routes the calls of the LLM through the cache, the LLM is returned as it is when the cache is off."""
+        if not self.isEnabled() or getattr(llm.call, "isCached", False):
+            return llm
+        call = llm.call
+        model = getattr(llm, "model", type(llm).__name__)
+
+        @functools.wraps(call)
+        def cachedCall(messages, tools=None, *args, **kwargs):
+            key = self.getKey(model, messages, tools, getattr(llm, "temperature", None), kwargs.get("response_model"))
+            if self.mode != "RECORD":
+                try:
+                    response = self.get(key)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to read the LLM cache: {e}")
+                    response = None
+                self.record(response is not None)
+                if response is not None:
+                    return response
+                if self.mode == "REPLAY":
+                    raise LlmCacheMiss(model, key)
+
+            response = call(messages, tools, *args, **kwargs)
+            if isinstance(response, str):
+                try:
+                    self.put(key, model, response)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to write the LLM cache: {e}")
+            return response
+        cachedCall.isCached = True
+
+        # LLMs may be pydantic models, which don't allow setting undeclared attributes
+        object.__setattr__(llm, "call", cachedCall)
+        return llm
+
+    def getStats(self) -> dict:
+        with self.statsLock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+llmCache = LlmCache()
@@ -0,0 +1,92 @@
+import asyncio
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Modules which make up most of the cold start, they are imported during the warm-up
+APP_MODULES = [".crewUtils"]
+
+langfuse = None
+envLoaded = False
+warmUpFutures:list[Future] = None
+warmUpLock = threading.Lock()
+
+def loadEnv():
+    """Loads .env once. Most modules read their settings when they are imported, so entry points
+    call it before importing them, and the warm-up before anything else."""
+    global envLoaded
+    with warmUpLock:
+        if not envLoaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            envLoaded = True
+
+def loadSecrets():
+    # Populate environment variables from AWS secrets manager, before the app modules read them
+    from . env import populateEnvWithSecrets
+    populateEnvWithSecrets()
+
+def initObservability(dependencies:list[Future]):
+    for future in dependencies:
+        future.result()
+
+    # Step1: Setup langfuse for tracing
+    global langfuse
+    from langfuse import get_client
+    client = get_client()
+    if client.auth_check():
+        print("Langfuse client is authenticated and ready!")
+    else:
+        print("Authentication failed. Please check your credentials and host.")
+    langfuse = client
+
+    # Step2: Setup the meter provider for the step and crew histograms
+    from . metricsUtils import setupMetrics
+    setupMetrics()
+
+def importAppModules(dependencies:list[Future]):
+    for future in dependencies:
+        future.result()
+    for module in APP_MODULES:
+        importlib.import_module(module, __package__)
+
+def instrumentCrewAI(dependencies:list[Future]):
+    # crewai is only imported by importAppModules, and instrumented once Langfuse is set up
+    for future in dependencies:
+        future.result()
+    from openinference.instrumentation.crewai import CrewAIInstrumentor
+    CrewAIInstrumentor().instrument(skip_dep_check=True)
+
+def startWarmUp():
+    """Starts the initialization in background threads and returns straight away.
+    The secrets are loaded first, as the app modules read their settings when imported. Then
+    checking Langfuse, which is network bound, and the imports, which are CPU bound, run
+    concurrently. Calling it again doesn't start another warm-up."""
+    global warmUpFutures
+    # The secrets are looked up with the settings in .env
+    loadEnv()
+    with warmUpLock:
+        if warmUpFutures is None:
+            executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="WarmUp")
+            secrets = [executor.submit(loadSecrets)]
+            warmUpFutures = secrets + [executor.submit(initObservability, secrets),
+                                       executor.submit(importAppModules, secrets)]
+            warmUpFutures.append(executor.submit(instrumentCrewAI, warmUpFutures[1:]))
+            executor.shutdown(wait=False)
+    return warmUpFutures
+
+async def warmUp():
+    """Waits for the warm-up, starting it if needed. A failed warm-up is retried on the next call."""
+    global warmUpFutures
+    futures = startWarmUp()
+    try:
+        await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+    except Exception:
+        with warmUpLock:
+            if warmUpFutures is futures:
+                warmUpFutures = None
+        raise
+
+def getLangfuse():
+    # Only available once the warm-up has completed
+    return langfuse
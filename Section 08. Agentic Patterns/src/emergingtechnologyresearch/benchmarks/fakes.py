@@ -0,0 +1,98 @@
+# Scripted stand-in for the LLM of the orchestrator worker crews, so that the sequential manager
+# and the parallel orchestration can be compared without network calls or LLM cost.
+import json
+import re
+import threading
+import time
+
+from crewai.llm import BaseLLM
+
+# Task text of the hierarchical manager and of the parallel orchestration crews
+MANAGER_MARKER = "Plan Step by Step and make sure to delegate"
+PLANNER_MARKER = "Plan how the user prompt is answered by the workers"
+RESEARCH_WORKER_MARKER = "Main task is to research the following angle"
+MERGE_MARKER = "Merge the results of the workers"
+# Tasks delegated by the manager are numbered, so that the manager knows how far it got
+DELEGATION_MARKER = "[delegation "
+
+ANGLES = ["technology", "adoption", "regulation", "cost", "security"]
+
+def finalAnswer(output) -> str:
+    if not isinstance(output, str):
+        output = json.dumps(output)
+    return f"Thought: I now know the final answer\nFinal Answer: {output}"
+
+def action(coworker:str, task:str) -> str:
+    actionInput = json.dumps({"task": task, "context": "Research requested by the user.", "coworker": coworker})
+    return (f"Thought: I should delegate the next step\nAction: Delegate work to coworker\n"
+            f"Action Input: {actionInput}")
+
+def cannedReport(angles:int) -> dict:
+    return {"intent": "EMERGING_TECHNOLOGY_RESEARCH",
+            "answer": "# Benchmark report\n" + "".join(f"## Sub-topic {i}\nOverview of sub-topic {i}.\n"
+                                                        for i in range(1, angles + 1))}
+
+class FakeLLM(BaseLLM):
+    """Scripted LLM playing the manager, the planner and the workers of a research request
+    with the given number of research angles."""
+
+    # Calls across all instances, as getLlm creates one per agent
+    calls = 0
+    callsLock = threading.Lock()
+
+    def __init__(self, latency:float=0.0, angles:int=3):
+        super().__init__(model="fake/scripted")
+        self.latency = latency
+        self.angles = angles
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        with FakeLLM.callsLock:
+            FakeLLM.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(messages, str):
+            text = messages
+        else:
+            text = "\n".join(str(message.get("content", "")) for message in messages)
+        return self.respond(text)
+
+    def delegations(self) -> list[tuple[str, str]]:
+        steps = [("Prompt Intent Analyser", "Identify the intent, topic and style of the prompt")]
+        steps += [("Senior Data Researcher", f"Research the {angle} angle of the topic")
+                  for angle in ANGLES[:self.angles]]
+        steps += [("Reporting Analyst", "Expand the research bullet points into a report")]
+        return steps
+
+    def respond(self, text:str) -> str:
+        if MANAGER_MARKER in text:
+            # The manager delegates one step at a time, and answers once every step is done
+            done = len(set(re.findall(r"\[delegation (\d+)\]", text)))
+            steps = self.delegations()
+            if done < len(steps):
+                coworker, task = steps[done]
+                return action(coworker, f"{DELEGATION_MARKER}{done + 1}] {task}")
+            return finalAnswer(cannedReport(self.angles))
+        if DELEGATION_MARKER in text:
+            return finalAnswer("Result of the delegated step.")
+        if PLANNER_MARKER in text:
+            return finalAnswer({
+                "intent": "EMERGING_TECHNOLOGY_RESEARCH",
+                "topic": "quantum computing in cryptography",
+                "style": "concise",
+                "assignments": [{"worker": "RESEARCHER", "instructions": f"The {angle} angle of the topic"}
+                                for angle in ANGLES[:self.angles]]
+            })
+        if RESEARCH_WORKER_MARKER in text:
+            return finalAnswer("- First finding of the angle.\n- Second finding of the angle.")
+        if MERGE_MARKER in text:
+            return finalAnswer(cannedReport(self.angles))
+        return finalAnswer("Done.")
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
@@ -0,0 +1,102 @@
+# Offline benchmark of the orchestrator worker pattern: the hierarchical OrchestratorWorkerCrew,
+# whose manager delegates to one worker at a time, against ParallelOrchestrator, which plans the
+# assignments upfront and runs the workers concurrently. The LLM is replaced by the scripted
+# FakeLLM in fakes.py and MCP sessions are faked, so the difference comes from the number of
+# sequential LLM round trips at the given LLM latency.
+#
+# Run with: uv run python -m src.emergingtechnologyresearch.benchmarks.orchestrationBenchmark --llm-latency 0.5
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from .fakes import FakeLLM
+
+def configureEnvironment(llmLatency:float, angles:int):
+    os.environ.update({
+        "VERBOSE_OUTPUT": "FALSE",
+        "OPENAI_API_KEY": "benchmark",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true"
+    })
+
+    from ..crews import orchestratorWorkerCrew, parallelOrchestratorCrew
+    from ..utils import mcpUtils
+    from ..utils.crewFactory import crewFactory
+
+    # Crew modules import getLlm by name, so it is replaced in each of them
+    for module in [orchestratorWorkerCrew, parallelOrchestratorCrew]:
+        module.getLlm = lambda: FakeLLM(llmLatency, angles)
+    crewFactory.clear()
+
+    class FakeMcpSession:
+        tools = []
+        gatewayUrl = "fake"
+    mcpUtils.McpUtils.acquireSession = lambda self, owner=None: FakeMcpSession()
+    mcpUtils.McpUtils.releaseSession = lambda self, session: None
+
+def getInputs() -> dict:
+    sessionId = f"{uuid.uuid4()}"
+    return {
+        "prompt": "Research on quantum computing in cryptography",
+        "sessionId": sessionId,
+        "actorId": f"benchmark-{sessionId}",
+        "conversationHistory": "",
+        "preferences": "Prefers concise reports"
+    }
+
+async def runHierarchical():
+    from ..crews.orchestratorWorkerCrew import OrchestratorWorkerCrew
+    from ..utils.crewFactory import kickoffCrew
+    return (await kickoffCrew(OrchestratorWorkerCrew, getInputs())).pydantic.answer
+
+async def runParallel():
+    from ..utils.orchestrationUtils import ParallelOrchestrator
+    return (await ParallelOrchestrator().run(getInputs())).answer
+
+async def measure(run, requests:int, concurrency:int) -> tuple[list[float], float, float]:
+    FakeLLM.calls = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    timings:list[float] = []
+
+    async def timedRun():
+        async with semaphore:
+            startTime = time.perf_counter()
+            await run()
+            timings.append(1000 * (time.perf_counter() - startTime))
+
+    startTime = time.perf_counter()
+    await asyncio.gather(*[timedRun() for _ in range(requests)])
+    return timings, time.perf_counter() - startTime, FakeLLM.calls / requests
+
+def percentile(values:list[float], percent:float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+async def main(requests:int, concurrency:int):
+    # The first run of each mode builds the crew templates, it isn't measured
+    await runHierarchical()
+    await runParallel()
+
+    print(f"{requests} research requests, {concurrency} at a time\n")
+    print(f"{'Mode':<14}{'mean':>10}{'p50':>10}{'p95':>10}{'req/s':>8}{'LLM calls':>11}  (ms)")
+    results = {}
+    for name, run in [("hierarchical", runHierarchical), ("parallel", runParallel)]:
+        timings, elapsed, calls = await measure(run, requests, concurrency)
+        results[name] = statistics.mean(timings)
+        print(f"{name:<14}{statistics.mean(timings):>10.1f}{percentile(timings, 50):>10.1f}"
+              f"{percentile(timings, 95):>10.1f}{requests / elapsed:>8.2f}{calls:>11.1f}")
+    print(f"\nParallel dispatch takes {results['parallel'] / results['hierarchical']:.0%} of the sequential manager's latency")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of sequential against parallel worker dispatch")
+    parser.add_argument("--requests", type=int, default=4, help="Number of research requests per mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests executed at once")
+    parser.add_argument("--angles", type=int, default=3, help="Research angles, i.e. researcher workers per request")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds the fake LLM takes per call")
+    args = parser.parse_args()
+
+    configureEnvironment(args.llm_latency, args.angles)
+    asyncio.run(main(args.requests, args.concurrency))
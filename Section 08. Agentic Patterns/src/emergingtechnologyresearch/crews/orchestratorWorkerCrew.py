@@ -2,7 +2,7 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import Any, List
-from ..utils.mcpUtils import McpUtils
+from ..utils.mcpUtils import McpToolsMixin
 from ..utils.llmUtils import getLlm, getVerbose
 from enum import Enum
 from pydantic import BaseModel, Field
@@ -17,7 +17,7 @@ class OrchestratorWorkerAnswer(BaseModel):
    answer:str = Field(description="Report or answer as generated by the crew")
 
 @CrewBase
-class OrchestratorWorkerCrew():
+class OrchestratorWorkerCrew(McpToolsMixin):
     """OrchestratorWorkerCrew crew"""
 
     agents_config = '../config/orchestratorWorkerAgents.yaml'
@@ -42,7 +42,7 @@ class OrchestratorWorkerCrew():
         return Agent(
             config=self.agents_config['researcher'],
             verbose=getVerbose(),
-            tools=McpUtils().getTools(),
+            tools=self.getTools(),
             llm=getLlm()
         )
 
@@ -51,7 +51,7 @@ class OrchestratorWorkerCrew():
         return Agent(
             config=self.agents_config['reporting_analyst'],
             verbose=getVerbose(),
-            tools=McpUtils().getTools(),
+            tools=self.getTools(),
             llm=getLlm()
         )
 
@@ -68,7 +68,7 @@ class OrchestratorWorkerCrew():
         return Agent(
             config=self.agents_config['assistant'],
             verbose=getVerbose(),
-            tools=McpUtils().getTools(),
+            tools=self.getTools(),
             llm=getLlm()
         )
 
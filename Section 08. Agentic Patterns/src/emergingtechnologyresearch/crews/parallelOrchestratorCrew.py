@@ -0,0 +1,228 @@
+from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from typing import Any, List
+from ..utils.mcpUtils import McpToolsMixin
+from ..utils.llmUtils import getLlm, getVerbose
+from .orchestratorWorkerCrew import Intent, OrchestratorWorkerAnswer
+from enum import Enum
+from pydantic import BaseModel, Field
+
+class Worker(Enum):
+    RESEARCHER = "RESEARCHER"
+    FOLLOWUP = "FOLLOWUP"
+    ASSISTANT = "ASSISTANT"
+
+class WorkerAssignment(BaseModel):
+    worker:Worker = Field(description="Worker the assignment is delegated to")
+    instructions:str = Field(description="Self-contained instructions for the worker")
+
+class DelegationPlan(BaseModel):
+    intent:Intent = Field(description="Intent of the Prompt")
+    topic:str = Field(description="Topic of the emerging technology, empty if there is none")
+    style:str = Field(description="Writing style of the answer")
+    assignments:list[WorkerAssignment] = Field(description="Independent assignments executed concurrently")
+
+@CrewBase
+class DelegationPlannerCrew():
+    """Plans the assignments of the workers, which are then executed concurrently"""
+
+    agents_config = '../config/orchestratorWorkerAgents.yaml'
+    tasks_config = '../config/delegationPlanTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def intent_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config['intent_analyst'],
+            verbose=getVerbose(),
+            llm=getLlm()
+        )
+
+    @task
+    def delegation_plan_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['delegation_plan_task'],
+            output_pydantic=DelegationPlan
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the DelegationPlannerCrew crew"""
+        return Crew(
+            name="DelegationPlannerCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class ResearchWorkerCrew(McpToolsMixin):
+    """Researches one angle of the topic"""
+
+    agents_config = '../config/orchestratorWorkerAgents.yaml'
+    tasks_config = '../config/researchWorkerTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def researcher(self) -> Agent:
+        return Agent(
+            config=self.agents_config['researcher'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm=getLlm()
+        )
+
+    @task
+    def research_worker_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['research_worker_task']
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the ResearchWorkerCrew crew"""
+        return Crew(
+            name="ResearchWorkerCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class FollowupWorkerCrew():
+    """Answers a followup question from the conversation history"""
+
+    agents_config = '../config/orchestratorWorkerAgents.yaml'
+    tasks_config = '../config/followupWorkerTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def followup_question_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config['followup_question_agent'],
+            verbose=getVerbose(),
+            llm=getLlm()
+        )
+
+    @task
+    def followup_worker_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['followup_worker_task']
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the FollowupWorkerCrew crew"""
+        return Crew(
+            name="FollowupWorkerCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class AssistantWorkerCrew(McpToolsMixin):
+    """Responds to general chat"""
+
+    agents_config = '../config/orchestratorWorkerAgents.yaml'
+    tasks_config = '../config/assistantWorkerTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def assistant(self) -> Agent:
+        return Agent(
+            config=self.agents_config['assistant'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm=getLlm()
+        )
+
+    @task
+    def assistant_worker_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['assistant_worker_task']
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the AssistantWorkerCrew crew"""
+        return Crew(
+            name="AssistantWorkerCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class WorkerResultsMergeCrew():
+    """Merges the results of the workers into the final answer"""
+
+    agents_config = '../config/orchestratorWorkerAgents.yaml'
+    tasks_config = '../config/workerResultsMergeTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def reporting_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config['reporting_analyst'],
+            verbose=getVerbose(),
+            llm=getLlm()
+        )
+
+    @task
+    def merge_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['merge_task'],
+            output_pydantic=OrchestratorWorkerAnswer
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the WorkerResultsMergeCrew crew"""
+        return Crew(
+            name="WorkerResultsMergeCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
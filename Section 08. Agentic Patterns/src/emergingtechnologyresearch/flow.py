@@ -8,6 +8,10 @@ import os
 from pydantic import BaseModel, Field
 
 from . utils.memoryUtils import MemoryUtils
+from . utils.crewFactory import kickoffCrew, kickoffCrews
+from . utils.metricsUtils import recordStep
+from . utils.reportPipeline import isPipelined, writeReport
+from . utils.bannerUtils import BannerUtils
 
 from . crews.followupCrew import FollowupQuestionCrew
 from . crews.intentCrew import Intent, PromptIntent, IntentAnalyzer
@@ -26,37 +30,63 @@ class EmergingTechnologyFlowState(BaseModel):
     report:Optional[ResearchReport] = Field(default=None, description="Report generated")
     conversationHistory:Optional[str] = Field(default=None, description="Conversation History")
     preferences:Optional[str] = Field(default=None, description="User Preferences")
-    banners:Optional[list[str]] = Field(default=None, description="Array of banner images for each section")
+    banners:Optional[list[Optional[str]]] = Field(default=None, description="Array of banner images for each section")
 
 # Flow taking care of user prompt
 class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
     stepCallback:Any=None
+    conversationHistoryTask:Any=None
 
     def __init__(self, stepCallback=None):
         super().__init__()
         self.stepCallback = stepCallback
     
     @start()
-    def initialize(self):
-        self.state.conversationHistory = MemoryUtils(
+    @recordStep
+    async def initialize(self):
+        memoryUtils = MemoryUtils(
             sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).loadShortTermMemory()
-
-        self.state.preferences = MemoryUtils(
-            sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).extractUserPreferences()
+            actorId=self.state.actorId)
+
+        # Both AgentCore round trips are started together, off the event loop. Only the 
+        # preferences are needed by the intent prompt, so the history keeps loading while
+        # the IntentAnalyzer runs and is awaited by the steps which consume it.
+        self.conversationHistoryTask = asyncio.create_task(asyncio.to_thread(memoryUtils.loadShortTermMemory))
+        self.state.preferences = await asyncio.to_thread(memoryUtils.extractUserPreferences)
+
+    async def loadConversationHistory(self) -> str:
+        if self.conversationHistoryTask:
+            self.state.conversationHistory = await self.conversationHistoryTask
+            self.conversationHistoryTask = None
+        return self.state.conversationHistory
+
+    async def discardConversationHistory(self):
+        # The flow may end before a step awaited the history, on an error or a route like
+        # UserProfileIsRequired, so the pending load is cancelled instead of being left behind
+        if self.conversationHistoryTask:
+            self.conversationHistoryTask.cancel()
+            await asyncio.gather(self.conversationHistoryTask, return_exceptions=True)
+            self.conversationHistoryTask = None
+
+    async def kickoff_async(self, *args, **kwargs):
+        try:
+            return await super().kickoff_async(*args, **kwargs)
+        finally:
+            await self.discardConversationHistory()
 
     @listen("initialize")
-    def checkIntent(self):
+    @recordStep
+    async def checkIntent(self):
         inputs = {
             'prompt': self.state.prompt,
             'preferences': self.state.preferences
         }
 
-        response = IntentAnalyzer(self.stepCallback).crew().kickoff(inputs=inputs)
+        response = await kickoffCrew(IntentAnalyzer, inputs, self.stepCallback)
         self.state.intent = response.pydantic
 
     @router(checkIntent)
+    @recordStep
     def routeRequest(self):
         match self.state.intent.intent:
             case Intent.EMERGING_TECHNOLOGY_RESEARCH:
@@ -65,37 +95,48 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
                 return "EmergingTechnologyFollowup"
 
     @listen("EmergingTechnologyResearch")
-    def research(self):
+    @recordStep
+    async def research(self):
         inputs = {
             'topic': self.state.intent.topic,
             'current_year': str(datetime.now().year),
             'style': self.state.intent.style,
             'prompt': self.state.prompt,
         }
-        self.state.report = Emergingtechnologyresearch(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        if isPipelined():
+            # One reporting call per research bullet point, executed concurrently
+            self.state.report = await writeReport(inputs, self.stepCallback)
+        else:
+            self.state.report = (await kickoffCrew(Emergingtechnologyresearch, inputs, self.stepCallback)).pydantic
 
     @listen(research)
+    @recordStep
     async def generateBannerImages(self):
         if (os.getenv('GENERATE_BANNERS') == "TRUE" and os.getenv("OPENAI_API_KEY") != None 
                 and self.state.report != None and self.state.report.sections != None):
-            results = []
-            for section in self.state.report.sections:
-                inputs = {
-                    'topic': section.title,
-                    'overview': section.overview,
-                    'style': self.state.intent.style
-                }
-                result = ReportBannerCrew(self.stepCallback).crew().kickoff_async(inputs=inputs)
-                results.append(result)
+            if os.getenv('BANNER_CREW') == "TRUE":
+                kickoffs = []
+                for section in self.state.report.sections:
+                    inputs = {
+                        'topic': section.title,
+                        'overview': section.overview,
+                        'style': self.state.intent.style
+                    }
+                    kickoffs.append((ReportBannerCrew, inputs))
+
+                results = await kickoffCrews(kickoffs, self.stepCallback)
             
-            results = await asyncio.gather(*results)
-        
-            banners = []
-            for result in results:
-                banners.append(result.pydantic.url)
-            self.state.banners = banners
+                banners = []
+                for result in results:
+                    banners.append(result.pydantic.url)
+                self.state.banners = banners
+            else:
+                # Prompts are built straight from the sections, so no agent is needed to call the image API
+                self.state.banners = await BannerUtils().generateBanners(
+                    self.state.report.sections, self.state.intent.style)
 
     @listen(generateBannerImages)
+    @recordStep
     def generateReport(self):
         if self.state.report:
             response = f"# Research Report on: {self.state.intent.topic}\n"
@@ -115,15 +156,18 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
             self.state.response = response
 
     @listen("EmergingTechnologyFollowup")
-    def followup(self):
+    @recordStep
+    async def followup(self):
         inputs = {
             'prompt': self.state.prompt,
             'style': self.state.intent.style,
-            'history': self.state.conversationHistory,
+            'history': await self.loadConversationHistory(),
             'actorId': self.state.actorId
         }
-        self.state.response = FollowupQuestionCrew(self.stepCallback).crew().kickoff(inputs=inputs).raw
+        self.state.response = (await kickoffCrew(FollowupQuestionCrew, inputs, self.stepCallback)).raw
 
     @listen(or_(generateReport, followup))
-    def finish(self):
+    @recordStep
+    async def finish(self):
+        await self.loadConversationHistory()
         return self.state.response
\ No newline at end of file
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from ..tools.dalleTool import getOpenAIClient
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of image generation requests in flight per report
+BANNER_CONCURRENCY = int(os.getenv("BANNER_CONCURRENCY", "4"))
+# Maximum number of banners kept in the cache
+BANNER_CACHE_SIZE = int(os.getenv("BANNER_CACHE_SIZE", "256"))
+# Seconds for which a banner URL is reused. Generated image URLs expire after an hour.
+BANNER_CACHE_TTL = int(os.getenv("BANNER_CACHE_TTL", "3000"))
+
+bannerCache:OrderedDict = OrderedDict()
+bannerCacheLock = threading.Lock()
+
+class BannerUtils:
+    """Generates the section banners by calling the image API directly, without an agent in between.
+    Banners are cached by a hash of (title, overview, style), so unchanged sections cost nothing."""
+
+    def getPrompt(self, title:str, overview:str, style:str) -> str:
+        return (f"Banner image for a report section on: {title}. "
+                f"Section overview: {overview} "
+                f"Expected writing style of the report: {style}. "
+                "The banner should not include any text.")
+
+    def getCacheKey(self, title:str, overview:str, style:str) -> str:
+        return hashlib.sha256(json.dumps([title, overview, style]).encode("utf-8")).hexdigest()
+
+    def getCachedBanner(self, key:str) -> Optional[str]:
+        with bannerCacheLock:
+            cached = bannerCache.get(key)
+            if cached is None:
+                return None
+            url, createdAt = cached
+            if time.monotonic() - createdAt > BANNER_CACHE_TTL:
+                del bannerCache[key]
+                return None
+            bannerCache.move_to_end(key)
+            return url
+
+    def cacheBanner(self, key:str, url:str):
+        with bannerCacheLock:
+            bannerCache[key] = (url, time.monotonic())
+            bannerCache.move_to_end(key)
+            while len(bannerCache) > BANNER_CACHE_SIZE:
+                bannerCache.popitem(last=False)
+
+    def createImage(self, prompt:str) -> str:
+        response = getOpenAIClient().images.generate(
+            model="dall-e-2",
+            prompt=prompt,
+            size="256x256",
+            n=1,
+        )
+        return response.data[0].url
+
+    async def generateBanner(self, semaphore:asyncio.Semaphore, title:str, overview:str, style:str) -> Optional[str]:
+        key = self.getCacheKey(title, overview, style)
+        url = self.getCachedBanner(key)
+        if url:
+            return url
+
+        try:
+            async with semaphore:
+                url = await asyncio.to_thread(self.createImage, self.getPrompt(title, overview, style))
+        except Exception as e:
+            # A missing banner shouldn't fail the report
+            logger.warning(f"Failed to generate the banner for {title}: {e}")
+            return None
+        self.cacheBanner(key, url)
+        return url
+
+    async def generateBanners(self, sections:list, style:str) -> list[Optional[str]]:
+        semaphore = asyncio.Semaphore(BANNER_CONCURRENCY)
+        return await asyncio.gather(*[
+            self.generateBanner(semaphore, section.title, section.overview, style) for section in sections
+        ])
@@ -1,26 +1,71 @@
+import asyncio
 import os
+import time
 from . env import populateEnvWithSecrets
 from .. crews.orchestratorWorkerCrew import OrchestratorWorkerCrew
 from .. flow import EmergingTechnologyFlow
 from . memoryUtils import MemoryUtils
+from . admissionUtils import admissionController
+from . crewFactory import kickoffCrew
+from . metricsUtils import RequestUsage, requestUsage
+from . orchestrationUtils import ParallelOrchestrator
+from . routerUtils import (FLOW_PATH, ORCHESTRATOR_PATH, PARALLEL_ORCHESTRATOR_PATH, adaptiveRouter,
+                           guessIntent, scoreAnswer)
 
-async def executeApp(inputs, step_callback = None)->str:
-    response = ""
-
-    populateEnvWithSecrets()
-    fullAutonomy = True if os.getenv("AUTONOMOUS_ORCHESTRATION") == "TRUE" else False
-    
-    if fullAutonomy:
-        inputs["conversationHistory"] = MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).loadShortTermMemory()
-        inputs["preferences"] = MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).extractUserPreferences()
-        # Trigger the orchestrator worker crew
-        response = OrchestratorWorkerCrew(step_callback).crew().kickoff(inputs=inputs).pydantic.answer
-    else:
+def getOrchestratorPath() -> str:
+    return PARALLEL_ORCHESTRATOR_PATH if os.getenv("PARALLEL_ORCHESTRATION") == "TRUE" else ORCHESTRATOR_PATH
+
+async def runPath(path, inputs, step_callback = None)->str:
+    if path == FLOW_PATH:
         # Trigger the emerging technology flow
-        response = await EmergingTechnologyFlow(step_callback).kickoff_async(inputs=inputs)
+        return await EmergingTechnologyFlow(step_callback).kickoff_async(inputs=inputs)
+
+    # Load history and preferences concurrently, off the event loop
+    memoryUtils = MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId'])
+    inputs["conversationHistory"], inputs["preferences"] = await asyncio.gather(
+        asyncio.to_thread(memoryUtils.loadShortTermMemory),
+        asyncio.to_thread(memoryUtils.extractUserPreferences))
+    if path == PARALLEL_ORCHESTRATOR_PATH:
+        # Workers planned upfront and executed concurrently
+        return (await ParallelOrchestrator(step_callback).run(inputs)).answer
+    # Trigger the orchestrator worker crew
+    return (await kickoffCrew(OrchestratorWorkerCrew, inputs, step_callback)).pydantic.answer
+
+async def runAdaptive(inputs, step_callback = None)->str:
+    # The path with the lowest cost for the intent of the prompt which meets the quality floor
+    intent = guessIntent(inputs['prompt'])
+    path = adaptiveRouter.choose([FLOW_PATH, getOrchestratorPath()], intent)
+    usage = RequestUsage()
+    usageToken = requestUsage.set(usage)
+    startTime = time.perf_counter()
+    try:
+        response = await runPath(path, inputs, step_callback)
+    except Exception:
+        # A failed request counts with the lowest quality
+        adaptiveRouter.record(path, intent, time.perf_counter() - startTime, usage.tokens, 0.0)
+        raise
+    finally:
+        requestUsage.reset(usageToken)
+    adaptiveRouter.record(path, intent, time.perf_counter() - startTime, usage.tokens, scoreAnswer(intent, response))
+    return response
+
+async def executeApp(inputs, step_callback = None)->str:
+    # Requests beyond the concurrency limits wait for a slot, or are rejected when the queue is full
+    async with admissionController.admit(inputs['actorId']):
+        response = ""
+
+        populateEnvWithSecrets()
+        orchestration = os.getenv("AUTONOMOUS_ORCHESTRATION")
+
+        if orchestration == "ADAPTIVE":
+            response = await runAdaptive(inputs, step_callback)
+        elif orchestration == "TRUE":
+            response = await runPath(getOrchestratorPath(), inputs, step_callback)
+        else:
+            response = await runPath(FLOW_PATH, inputs, step_callback)
+
+        # Save response in memory
+        MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
+            userPrompt=inputs['prompt'], assistantResponse=response)
 
-    # Save response in memory
-    MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
-        userPrompt=inputs['prompt'], assistantResponse=response)
-            
-    return response
\ No newline at end of file
+        return response
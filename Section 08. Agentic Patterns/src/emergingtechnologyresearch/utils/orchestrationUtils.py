@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+from .crewFactory import kickoffCrew, kickoffCrews
+from .mcpUtils import MCP_POOL_SIZE
+from ..crews.orchestratorWorkerCrew import Intent, OrchestratorWorkerAnswer
+from ..crews.parallelOrchestratorCrew import (AssistantWorkerCrew, DelegationPlan, DelegationPlannerCrew,
+                                              FollowupWorkerCrew, ResearchWorkerCrew, Worker,
+                                              WorkerAssignment, WorkerResultsMergeCrew)
+
+# Maximum number of worker assignments executed concurrently for a request
+ORCHESTRATOR_MAX_WORKERS = int(os.getenv("ORCHESTRATOR_MAX_WORKERS", "4"))
+
+workerCrews = {
+    Worker.RESEARCHER: ResearchWorkerCrew,
+    Worker.FOLLOWUP: FollowupWorkerCrew,
+    Worker.ASSISTANT: AssistantWorkerCrew
+}
+
+# Worker answering the prompt on its own, when the plan has no assignments
+intentWorkers = {
+    Intent.EMERGING_TECHNOLOGY_RESEARCH: Worker.RESEARCHER,
+    Intent.EMERGING_TECHNOLOGY_FOLLOW_UP_QUERY: Worker.FOLLOWUP,
+    Intent.GENERAL_CHAT: Worker.ASSISTANT
+}
+
+class ParallelOrchestrator:
+    """Orchestrator worker pattern with concurrent workers.
+    Unlike the manager of the hierarchical OrchestratorWorkerCrew, which delegates to one worker
+    at a time, the planner emits all the assignments upfront. The workers then run concurrently
+    and their results are merged into the final answer."""
+
+    def __init__(self, stepCallback=None, maxWorkers:int=ORCHESTRATOR_MAX_WORKERS):
+        self.stepCallback = stepCallback
+        # Every worker leases an MCP session, workers beyond the pool would only wait for one
+        self.maxWorkers = min(maxWorkers, MCP_POOL_SIZE)
+
+    async def plan(self, inputs:dict) -> DelegationPlan:
+        result = await kickoffCrew(DelegationPlannerCrew, dict(inputs, maxWorkers=self.maxWorkers),
+                                   self.stepCallback)
+        return result.pydantic
+
+    async def runWorkers(self, inputs:dict, plan:DelegationPlan) -> list[str]:
+        results = await kickoffCrews([
+            (workerCrews[assignment.worker], dict(inputs, instructions=assignment.instructions))
+            for assignment in plan.assignments
+        ], self.stepCallback, self.maxWorkers)
+        return [result.raw for result in results]
+
+    async def merge(self, inputs:dict, plan:DelegationPlan, results:list[str]) -> OrchestratorWorkerAnswer:
+        workerResults = "\n\n".join(
+            f"Worker: {assignment.worker.value}\nInstructions: {assignment.instructions}\nResult:\n{result}"
+            for assignment, result in zip(plan.assignments, results))
+        result = await kickoffCrew(WorkerResultsMergeCrew, dict(inputs, intent=plan.intent.value, workerResults=workerResults),
+                                   self.stepCallback)
+        return result.pydantic
+
+    async def run(self, inputs:dict) -> OrchestratorWorkerAnswer:
+        inputs = dict(inputs, current_year=str(datetime.now().year))
+        plan = await self.plan(inputs)
+        inputs.update(topic=plan.topic, style=plan.style)
+        plan.assignments = plan.assignments[:self.maxWorkers] or [
+            WorkerAssignment(worker=intentWorkers[plan.intent], instructions=inputs["prompt"])]
+
+        results = await self.runWorkers(inputs, plan)
+        # A single answer of a followup or chat worker is already final, merging would only add latency
+        if len(results) == 1 and plan.assignments[0].worker != Worker.RESEARCHER:
+            return OrchestratorWorkerAnswer(intent=plan.intent, answer=results[0])
+        return await self.merge(inputs, plan, results)
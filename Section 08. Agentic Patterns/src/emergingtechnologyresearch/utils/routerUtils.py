@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+FLOW_PATH = "flow"
+ORCHESTRATOR_PATH = "orchestrator"
+PARALLEL_ORCHESTRATOR_PATH = "parallelOrchestrator"
+
+# File the statistics of the router are persisted to
+ROUTER_STATS_PATH = os.getenv("ROUTER_STATS_PATH", "routerStats.json")
+# Fraction of requests routed to a random path, so that the statistics of every path stay current
+ROUTER_EXPLORATION = float(os.getenv("ROUTER_EXPLORATION", "0.1"))
+# Requests every path gets before the statistics are trusted
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "3"))
+# Minimum average quality score of a path, paths below are only used if no path meets it
+ROUTER_QUALITY_FLOOR = float(os.getenv("ROUTER_QUALITY_FLOOR", "0.8"))
+# Cost that is minimized, "tokens" or "latency"
+ROUTER_OBJECTIVE = os.getenv("ROUTER_OBJECTIVE", "tokens")
+# Weight of the latest request in the moving averages
+ROUTER_WEIGHT = float(os.getenv("ROUTER_WEIGHT", "0.2"))
+
+RESEARCH_KEYWORDS = re.compile(r"\b(research|report|investigate|analy[sz]e|study)\b", re.IGNORECASE)
+
+def guessIntent(prompt:str) -> str:
+    """Coarse intent of the prompt, known before either path analyses it with an LLM."""
+    return "research" if RESEARCH_KEYWORDS.search(prompt) else "conversation"
+
+def scoreAnswer(intent:str, answer:str) -> float:
+    """Quality score of an answer: a research report is expected to have multiple sections."""
+    if not answer or not answer.strip():
+        return 0.0
+    if intent == "research":
+        return 1.0 if answer.count("## ") >= 3 else 0.5
+    return 1.0
+
+class PathStats:
+    def __init__(self, count:int=0, latency:float=0.0, tokens:float=0.0, quality:float=1.0):
+        self.count = count
+        self.latency = latency
+        self.tokens = tokens
+        self.quality = quality
+
+    def update(self, latency:float, tokens:int, quality:float, weight:float):
+        # The first sample initializes the averages
+        weight = 1.0 if self.count == 0 else weight
+        self.count += 1
+        self.latency += weight * (latency - self.latency)
+        self.tokens += weight * (tokens - self.tokens)
+        self.quality += weight * (quality - self.quality)
+
+    def getCost(self, objective:str) -> float:
+        return self.latency if objective == "latency" else self.tokens
+
+class AdaptiveRouter:
+    """Routes a request to the cheapest path which meets the quality floor for its intent.
+    Latency, token cost and quality are kept as moving averages per path and intent, and
+    persisted after every request, so that the router doesn't start over with every run."""
+
+    def __init__(self, path:str=ROUTER_STATS_PATH, exploration:float=ROUTER_EXPLORATION,
+                 minSamples:int=ROUTER_MIN_SAMPLES, qualityFloor:float=ROUTER_QUALITY_FLOOR,
+                 objective:str=ROUTER_OBJECTIVE, weight:float=ROUTER_WEIGHT):
+        self.path = path
+        self.exploration = exploration
+        self.minSamples = minSamples
+        self.qualityFloor = qualityFloor
+        self.objective = objective
+        self.weight = weight
+        self.lock = threading.Lock()
+        self.stats:dict[tuple[str, str], PathStats] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                for entry in json.load(file):
+                    self.stats[(entry["path"], entry["intent"])] = PathStats(
+                        entry["count"], entry["latency"], entry["tokens"], entry["quality"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring the router statistics in {self.path}: {e}")
+
+    def save(self):
+        entries = [{"path": path, "intent": intent, "count": stats.count, "latency": stats.latency,
+                    "tokens": stats.tokens, "quality": stats.quality}
+                   for (path, intent), stats in self.stats.items()]
+        # Written to a temporary file first, so that a crash never leaves a truncated file
+        temporaryPath = f"{self.path}.tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(entries, file, indent=2)
+        os.replace(temporaryPath, self.path)
+
+    def choose(self, paths:list[str], intent:str) -> str:
+        with self.lock:
+            stats = {path: self.stats.get((path, intent), PathStats()) for path in paths}
+        # Paths without enough samples are tried first, the least sampled one first
+        untried = [path for path in paths if stats[path].count < self.minSamples]
+        if untried:
+            return min(untried, key=lambda path: stats[path].count)
+        if random.random() < self.exploration:
+            return random.choice(paths)
+        eligible = [path for path in paths if stats[path].quality >= self.qualityFloor]
+        if not eligible:
+            return max(paths, key=lambda path: stats[path].quality)
+        return min(eligible, key=lambda path: stats[path].getCost(self.objective))
+
+    def record(self, path:str, intent:str, latency:float, tokens:int, quality:float):
+        with self.lock:
+            self.stats.setdefault((path, intent), PathStats()).update(latency, tokens, quality, self.weight)
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning(f"Failed to save the router statistics to {self.path}: {e}")
+
+    def getStats(self) -> dict:
+        with self.lock:
+            return {f"{path}/{intent}": vars(stats).copy() for (path, intent), stats in self.stats.items()}
+
+adaptiveRouter = AdaptiveRouter()
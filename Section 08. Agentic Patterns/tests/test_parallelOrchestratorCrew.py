@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from emergingtechnologyresearch.crews.parallelOrchestratorCrew import (
+    AssistantWorkerCrew,
+    DelegationPlannerCrew,
+    FollowupWorkerCrew,
+    ResearchWorkerCrew,
+    WorkerResultsMergeCrew,
+)
+
+@pytest.mark.parametrize("crewClass", [
+    DelegationPlannerCrew,
+    ResearchWorkerCrew,
+    FollowupWorkerCrew,
+    AssistantWorkerCrew,
+    WorkerResultsMergeCrew,
+])
+def testCrewInstantiates(offlineCrews, crewClass):
+    # Every task of the tasks config has to be assigned to an agent the crew defines
+    crew = crewClass().crew()
+    assert len(crew.tasks) == 1
+    assert crew.tasks[0].agent in crew.agents
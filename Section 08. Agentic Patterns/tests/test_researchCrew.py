@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from emergingtechnologyresearch.crews.researchCrew import (
+    Emergingtechnologyresearch,
+    ReportConclusionCrew,
+    ResearchPointsCrew,
+    SectionWriterCrew,
+)
+
+@pytest.mark.parametrize("crewClass", [
+    Emergingtechnologyresearch,
+    ResearchPointsCrew,
+    SectionWriterCrew,
+    ReportConclusionCrew,
+])
+def testCrewInstantiates(offlineCrews, crewClass):
+    # Every task of the tasks config has to be assigned to an agent the crew defines
+    crew = crewClass().crew()
+    assert crew.tasks
+    assert all(task.agent in crew.agents for task in crew.tasks)
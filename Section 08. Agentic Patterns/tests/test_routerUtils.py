@@ -0,0 +1,65 @@
+import pytest
+
+from emergingtechnologyresearch.utils.routerUtils import (
+    FLOW_PATH,
+    ORCHESTRATOR_PATH,
+    AdaptiveRouter,
+    guessIntent,
+    scoreAnswer,
+)
+
+PATHS = [FLOW_PATH, ORCHESTRATOR_PATH]
+
+@pytest.fixture
+def router(tmp_path) -> AdaptiveRouter:
+    return AdaptiveRouter(path=str(tmp_path / "routerStats.json"), exploration=0.0, minSamples=2, weight=0.2)
+
+def sample(router:AdaptiveRouter, path:str, tokens:int, quality:float=1.0, count:int=2):
+    for _ in range(count):
+        router.record(path, "research", latency=1.0, tokens=tokens, quality=quality)
+
+def testIntentAndScore():
+    assert guessIntent("Write a report on fusion energy") == "research"
+    assert guessIntent("Hello there") == "conversation"
+    assert scoreAnswer("research", "## A\n## B\n## C") == 1.0
+    assert scoreAnswer("research", "## A") == 0.5
+    assert scoreAnswer("conversation", " ") == 0.0
+
+def testLeastSampledPathIsTriedFirst(router):
+    sample(router, FLOW_PATH, tokens=100, count=1)
+    assert router.choose(PATHS, "research") == ORCHESTRATOR_PATH
+
+def testCheapestPathMeetingTheFloorIsChosen(router):
+    sample(router, FLOW_PATH, tokens=1000)
+    sample(router, ORCHESTRATOR_PATH, tokens=200)
+    assert router.choose(PATHS, "research") == ORCHESTRATOR_PATH
+
+    # A cheaper path is no use if its answers fall below the quality floor
+    sample(router, ORCHESTRATOR_PATH, tokens=200, quality=0.0, count=10)
+    assert router.choose(PATHS, "research") == FLOW_PATH
+
+def testBestQualityPathWhenNoneMeetsTheFloor(router):
+    sample(router, FLOW_PATH, tokens=1000, quality=0.5)
+    sample(router, ORCHESTRATOR_PATH, tokens=200, quality=0.2)
+    assert router.choose(PATHS, "research") == FLOW_PATH
+
+def testStatsArePerIntent(router):
+    sample(router, FLOW_PATH, tokens=100)
+    sample(router, ORCHESTRATOR_PATH, tokens=100)
+    assert router.choose(PATHS, "conversation") == FLOW_PATH
+    assert "flow/conversation" not in router.getStats()
+
+def testStatsSurviveRestart(router):
+    sample(router, FLOW_PATH, tokens=100)
+    router.record(FLOW_PATH, "research", latency=1.0, tokens=200, quality=1.0)
+
+    restarted = AdaptiveRouter(path=router.path)
+    stats = restarted.getStats()["flow/research"]
+    assert stats["count"] == 3
+    # The latest sample moves the average by the weight of 0.2
+    assert stats["tokens"] == pytest.approx(120)
+
+def testCorruptStatsAreIgnored(tmp_path):
+    path = tmp_path / "routerStats.json"
+    path.write_text("{not json")
+    assert AdaptiveRouter(path=str(path)).getStats() == {}
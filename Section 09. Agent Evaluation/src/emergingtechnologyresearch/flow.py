@@ -8,11 +8,15 @@ import os
 from pydantic import BaseModel, Field
 
 from . utils.memoryUtils import MemoryUtils
+from . utils.crewFactory import kickoffCrew, kickoffCrews
+from . utils.metricsUtils import recordStep
+from . utils.reportPipeline import isPipelined, writeReport
+from . utils.bannerUtils import BannerUtils
 
 from . crews.followupCrew import FollowupQuestionCrew
 from . crews.intentCrew import Intent, PromptIntent, IntentAnalyzer
-from . crews.researchCrew import Emergingtechnologyresearch, ResearchReport
-from . crews.criticCrew import CriticCrew, CriticFeedback
+from . crews.researchCrew import Emergingtechnologyresearch, ResearchReport, Section, SectionRevisionCrew
+from . crews.criticCrew import CriticCrew, CriticFeedback, SectionCriticCrew
 from . crews.reportBannerCrew import ReportBannerCrew
 
 import asyncio
@@ -29,37 +33,64 @@ class EmergingTechnologyFlowState(BaseModel):
     preferences:Optional[str] = Field(default=None, description="User Preferences")
     criticFeedback:Optional[CriticFeedback] = Field(default=None, description="Feedback from the criticAgent")
     feedbackIter:Optional[int] = Field(default=0, description="Iteration no. of the feedback")
-    banners:Optional[list[str]] = Field(default=None, description="Array of banner images for each section")
+    revisedSections:Optional[list[int]] = Field(default=None, description="Sections rewritten by the last section revision")
+    banners:Optional[list[Optional[str]]] = Field(default=None, description="Array of banner images for each section")
 
 # Flow taking care of user prompt
 class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
     stepCallback:Any=None
+    conversationHistoryTask:Any=None
 
     def __init__(self, stepCallback=None):
         super().__init__()
         self.stepCallback = stepCallback
     
     @start()
-    def initialize(self):
-        self.state.conversationHistory = MemoryUtils(
+    @recordStep
+    async def initialize(self):
+        memoryUtils = MemoryUtils(
             sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).loadShortTermMemory()
+            actorId=self.state.actorId)
 
-        self.state.preferences = MemoryUtils(
-            sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).extractUserPreferences()
+        # Both AgentCore round trips are started together, off the event loop. Only the 
+        # preferences are needed by the intent prompt, so the history keeps loading while
+        # the IntentAnalyzer runs and is awaited by the steps which consume it.
+        self.conversationHistoryTask = asyncio.create_task(asyncio.to_thread(memoryUtils.loadShortTermMemory))
+        self.state.preferences = await asyncio.to_thread(memoryUtils.extractUserPreferences)
+
+    async def loadConversationHistory(self) -> str:
+        if self.conversationHistoryTask:
+            self.state.conversationHistory = await self.conversationHistoryTask
+            self.conversationHistoryTask = None
+        return self.state.conversationHistory
+
+    async def discardConversationHistory(self):
+        # The flow may end before a step awaited the history, on an error or a route like
+        # UserProfileIsRequired, so the pending load is cancelled instead of being left behind
+        if self.conversationHistoryTask:
+            self.conversationHistoryTask.cancel()
+            await asyncio.gather(self.conversationHistoryTask, return_exceptions=True)
+            self.conversationHistoryTask = None
+
+    async def kickoff_async(self, *args, **kwargs):
+        try:
+            return await super().kickoff_async(*args, **kwargs)
+        finally:
+            await self.discardConversationHistory()
 
     @listen("initialize")
-    def checkIntent(self):
+    @recordStep
+    async def checkIntent(self):
         inputs = {
             'prompt': self.state.prompt,
             'preferences': self.state.preferences
         }
 
-        response = IntentAnalyzer(self.stepCallback).crew().kickoff(inputs=inputs)
+        response = await kickoffCrew(IntentAnalyzer, inputs, self.stepCallback)
         self.state.intent = response.pydantic
 
     @router(checkIntent)
+    @recordStep
     def routeRequest(self):
         match self.state.intent.intent:
             case Intent.EMERGING_TECHNOLOGY_RESEARCH:
@@ -68,7 +99,8 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
                 return "EmergingTechnologyFollowup"
 
     @listen("EmergingTechnologyResearch")
-    def research(self):
+    @recordStep
+    async def research(self):
         inputs = {
             'topic': self.state.intent.topic,
             'current_year': str(datetime.now().year),
@@ -77,30 +109,78 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
             'qualityFeedback': self.state.criticFeedback.qualityFeedback if self.state.criticFeedback else "",
             'alreadyGeneratedReport': self.state.response if self.state.response else ""
         }
-        self.state.report = Emergingtechnologyresearch(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        if isPipelined():
+            # One reporting call per research bullet point, executed concurrently
+            self.state.report = await writeReport(inputs, self.stepCallback)
+        else:
+            self.state.report = (await kickoffCrew(Emergingtechnologyresearch, inputs, self.stepCallback)).pydantic
+        self.state.revisedSections = None
 
-    @listen(research)
+    @listen("SectionRevision")
+    @recordStep
+    async def reviseSections(self):
+        # Only the sections rejected by the critic are rewritten, the rest of the report is kept
+        sections = list(self.state.report.sections)
+        rejected = [i for i, sectionFeedback in enumerate(self.state.criticFeedback.sectionFeedback) if not sectionFeedback.approved]
+        kickoffs = []
+        for i in rejected:
+            inputs = {
+                'topic': self.state.intent.topic,
+                'current_year': str(datetime.now().year),
+                'style': self.state.intent.style,
+                'prompt': self.state.prompt,
+                'title': self.state.report.title,
+                'otherSections': ", ".join(section.title for j, section in enumerate(sections) if j != i),
+                'section': self.formatSection(sections[i]),
+                'qualityFeedback': self.state.criticFeedback.sectionFeedback[i].qualityFeedback
+            }
+            kickoffs.append((SectionRevisionCrew, inputs))
+
+        results = await kickoffCrews(kickoffs, self.stepCallback)
+        for i, result in zip(rejected, results):
+            sections[i] = result.pydantic
+        self.state.report = self.state.report.model_copy(update={'sections': sections})
+        self.state.revisedSections = rejected
+
+    @listen(or_(research, reviseSections))
+    @recordStep
     async def generateBannerImages(self):
         if (os.getenv('GENERATE_BANNERS') == "TRUE" and os.getenv("OPENAI_API_KEY") != None 
                 and self.state.report != None and self.state.report.sections != None):
-            results = []
-            for section in self.state.report.sections:
-                inputs = {
-                    'topic': section.title,
-                    'overview': section.overview,
-                    'style': self.state.intent.style
-                }
-                result = ReportBannerCrew(self.stepCallback).crew().kickoff_async(inputs=inputs)
-                results.append(result)
+            # After a section revision, the banners of the unchanged sections are kept
+            indices = list(range(len(self.state.report.sections)))
+            if self.state.revisedSections is not None and self.state.banners:
+                indices = self.state.revisedSections
+            sections = [self.state.report.sections[i] for i in indices]
+
+            if os.getenv('BANNER_CREW') == "TRUE":
+                kickoffs = []
+                for section in sections:
+                    inputs = {
+                        'topic': section.title,
+                        'overview': section.overview,
+                        'style': self.state.intent.style
+                    }
+                    kickoffs.append((ReportBannerCrew, inputs))
+
+                results = await kickoffCrews(kickoffs, self.stepCallback)
             
-            results = await asyncio.gather(*results)
-        
-            banners = []
-            for result in results:
-                banners.append(result.pydantic.url)
-            self.state.banners = banners
+                banners = []
+                for result in results:
+                    banners.append(result.pydantic.url)
+            else:
+                # Prompts are built straight from the sections, so no agent is needed to call the image API
+                banners = await BannerUtils().generateBanners(sections, self.state.intent.style)
+
+            if len(indices) < len(self.state.report.sections):
+                self.state.banners = list(self.state.banners)
+                for i, banner in zip(indices, banners):
+                    self.state.banners[i] = banner
+            else:
+                self.state.banners = banners
 
     @listen(generateBannerImages)
+    @recordStep
     def generateReport(self):
         if self.state.report:
             response = f"# Research Report on: {self.state.intent.topic} after {self.state.feedbackIter} iterations\n"
@@ -119,33 +199,98 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
             response += f"{self.state.report.conclusion} \n"
             self.state.response = response
 
+    def formatSection(self, section:Section) -> str:
+        response = f"## {section.title} \n\n"
+        response += f"### Overview \n"
+        response += f"{section.overview} \n"
+        response += f"### Key Developments \n"
+        for keyDevelopment in section.keyDevelopments:
+            response += f"+ {keyDevelopment} \n"
+        response += f"### Impact \n"
+        response += f"{section.impact} \n"
+        return response
+
+    async def critiqueReport(self) -> CriticFeedback:
+        # The report as a whole and each of its sections are reviewed in parallel. After a 
+        # section revision only the revised sections are reviewed again, as the verdicts on
+        # the rest of the report still hold.
+        previous = self.state.criticFeedback
+        sections = self.state.report.sections
+        reviewReport = (self.state.revisedSections is None or previous is None
+                        or len(previous.sectionFeedback) != len(sections))
+        indices = list(range(len(sections))) if reviewReport else self.state.revisedSections
+
+        kickoffs = []
+        if reviewReport:
+            inputs = {
+                'prompt': self.state.prompt,
+                'style': self.state.intent.style,
+                'report': self.state.response
+            }
+            kickoffs.append((CriticCrew, inputs))
+        for i in indices:
+            inputs = {
+                'prompt': self.state.prompt,
+                'style': self.state.intent.style,
+                'title': self.state.report.title,
+                'section': self.formatSection(sections[i])
+            }
+            kickoffs.append((SectionCriticCrew, inputs))
+        results = await kickoffCrews(kickoffs, self.stepCallback)
+
+        if reviewReport:
+            reportFeedback = results.pop(0).pydantic
+            reportApproved = reportFeedback.approved
+            qualityFeedback = reportFeedback.qualityFeedback
+            sectionFeedback = [None] * len(sections)
+        else:
+            # Section revisions only follow an approved report
+            reportApproved = previous.reportApproved
+            qualityFeedback = ""
+            sectionFeedback = list(previous.sectionFeedback)
+        for i, result in zip(indices, results):
+            sectionFeedback[i] = result.pydantic
+
+        # The combined feedback is what a full research pass gets to work with
+        for section, feedback in zip(sections, sectionFeedback):
+            if not feedback.approved:
+                qualityFeedback += f"\nSection '{section.title}': {feedback.qualityFeedback}"
+        return CriticFeedback(
+            qualityFeedback=qualityFeedback.strip(),
+            approved=reportApproved and all(feedback.approved for feedback in sectionFeedback),
+            reportApproved=reportApproved,
+            sectionFeedback=sectionFeedback
+        )
+
     @router(generateReport)
-    def feedback(self):
+    @recordStep
+    async def feedback(self):
         if self.state.feedbackIter >= 2 or os.getenv('CRITIC_AGENT') != 'TRUE':
             return "ResearchComplete"
 
-        inputs = {
-            'prompt': self.state.prompt,
-            'style': self.state.intent.style,
-            'report': self.state.response
-        }
-        self.state.criticFeedback = CriticCrew(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        self.state.criticFeedback = await self.critiqueReport()
         self.state.feedbackIter += 1
         if self.state.criticFeedback.approved == True:
             return "ResearchComplete"
+        elif self.state.criticFeedback.reportApproved:
+            # Only some sections were rejected, those are rewritten without a new research pass
+            return "SectionRevision"
         else:
             return "EmergingTechnologyResearch"
 
     @listen("EmergingTechnologyFollowup")
-    def followup(self):
+    @recordStep
+    async def followup(self):
         inputs = {
             'prompt': self.state.prompt,
             'style': self.state.intent.style,
-            'history': self.state.conversationHistory,
+            'history': await self.loadConversationHistory(),
             'actorId': self.state.actorId
         }
-        self.state.response = FollowupQuestionCrew(self.stepCallback).crew().kickoff(inputs=inputs).raw
+        self.state.response = (await kickoffCrew(FollowupQuestionCrew, inputs, self.stepCallback)).raw
 
     @listen(or_("ResearchComplete", followup))
-    def finish(self):
+    @recordStep
+    async def finish(self):
+        await self.loadConversationHistory()
         return self.state.response
\ No newline at end of file
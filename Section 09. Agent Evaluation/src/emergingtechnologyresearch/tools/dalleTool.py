@@ -1,4 +1,6 @@
 import json
+import os
+import threading
 from typing import List, Type
 
 from crewai.tools import BaseTool, EnvVar
@@ -6,6 +8,19 @@ from openai import OpenAI
 from pydantic import BaseModel, Field
 
 
+openAIClient:OpenAI = None
+openAIClientLock = threading.Lock()
+
+def getOpenAIClient() -> OpenAI:
+    # The OpenAI client is thread-safe and keeps a connection pool, so one is shared by all calls
+    # until the API key changes
+    global openAIClient
+    with openAIClientLock:
+        if openAIClient is None or openAIClient.api_key != os.getenv("OPENAI_API_KEY"):
+            openAIClient = OpenAI()
+        return openAIClient
+
+
 class ImagePromptSchema(BaseModel):
     """Input for Dall-E Tool."""
 
@@ -27,7 +42,7 @@ class DallETool(BaseTool):
     ]
 
     def _run(self, **kwargs) -> str:
-        client = OpenAI()
+        client = getOpenAIClient()
 
         image_description = kwargs.get("image_description")
 
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent turns whose assistant response is kept verbatim
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "2"))
+# Token budget of the conversation history given to the crews
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+# Responses longer than this are stored with a summary, which replaces them in older turns
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "600"))
+# Encoding of the local tokenizer, close enough for the budget with any of the models used
+HISTORY_ENCODING = os.getenv("HISTORY_ENCODING", "o200k_base")
+
+# Role of the summaries, which are saved as events of a session of their own
+SUMMARY_ROLE = "OTHER"
+# Suffix of the session keeping the summaries of the responses of a conversation session
+SUMMARY_SESSION_SUFFIX = "-summaries"
+
+class Tokenizer:
+    """Counts tokens with tiktoken. Falls back to an estimate of 4 characters per token when
+    the encoding can't be loaded."""
+
+    def __init__(self, encodingName:str=HISTORY_ENCODING):
+        self.encodingName = encodingName
+        self.encoding = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def getEncoding(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    try:
+                        import tiktoken
+                        self.encoding = tiktoken.get_encoding(self.encodingName)
+                    except Exception as e:
+                        logger.warning(f"Tokenizer {self.encodingName} isn't available, estimating tokens: {e}")
+                    self.loaded = True
+        return self.encoding
+
+    def count(self, text:str) -> int:
+        encoding = self.getEncoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+tokenizer = Tokenizer()
+
+def summarizeReport(text:str) -> str | None:
+    """Title and section headings of a research report, None if the text isn't a report."""
+    lines = text.splitlines()
+    if not lines or not lines[0].startswith("# "):
+        return None
+    headings = [line.strip() for line in lines if line.startswith("# ") or line.startswith("## ")]
+    return "\n".join(headings)
+
+def summarizeResponse(text:str, maxChars:int=HISTORY_SUMMARY_CHARS) -> str | None:
+    """Summary of an assistant response for older turns of the history, None if the response is
+    short enough to be kept as it is. Reports are reduced to their headings, other responses
+    to their first sentences."""
+    if len(text) <= maxChars:
+        return None
+    summary = summarizeReport(text)
+    if summary and len(summary) <= maxChars:
+        return summary
+    summary = (summary or text)[:maxChars]
+    end = summary.rfind(". ")
+    return (summary[:end + 1] if end > 0 else summary) + " …"
+
+def getResponseKey(text:str) -> str:
+    # Links a saved summary to the response it summarizes
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def formatMessage(role:str, text:str) -> str:
+    return role + ": " + text + "\n"
+
+def assembleHistory(turns:list[list[dict]], summaries:dict[str, str]=None,
+                    verbatimTurns:int=HISTORY_VERBATIM_TURNS, tokenBudget:int=HISTORY_TOKEN_BUDGET) -> str:
+    """Formats the turns of the short-term memory, newest turn first, as a chronological history.
+    User messages are kept verbatim. Assistant responses are kept verbatim in the most recent
+    turns and replaced with their summary, looked up in summaries by the key of the response, in
+    older turns or when the verbatim response doesn't fit the budget. Older turns are dropped
+    once the budget is used up."""
+    summaries = summaries or {}
+    remaining = tokenBudget
+    lines = []
+    for index, turn in enumerate(turns):
+        turnLines = []
+        for message in turn:
+            role, text = message['role'], message['content']['text']
+            if role == SUMMARY_ROLE:
+                # Turns saved before the summaries got a session of their own still carry them
+                continue
+            candidates = [text]
+            if role == "ASSISTANT":
+                # Responses saved without a summary get it computed here
+                summary = summaries.get(getResponseKey(text)) or summarizeResponse(text)
+                candidates = [text, summary] if index < verbatimTurns else [summary or text]
+                candidates = [candidate for candidate in candidates if candidate]
+            for candidate in candidates:
+                line = formatMessage(role, candidate)
+                tokens = tokenizer.count(line)
+                if tokens <= remaining:
+                    turnLines.append(line)
+                    remaining -= tokens
+                    break
+            else:
+                # Older turns only make sense together with the ones after them
+                logger.info(f"Dropped {len(turns) - index} of {len(turns)} history turns to fit {tokenBudget} tokens")
+                return "".join(reversed(lines))
+        lines.append("".join(turnLines))
+    return "".join(reversed(lines))
@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from opentelemetry import metrics
+
+# Histogram buckets in milliseconds, LLM bound steps take from a second to several minutes
+DURATION_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 60000, 120000, 300000]
+TOKEN_BUCKETS = [100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000]
+
+meter = metrics.get_meter("emergingtechnologyresearch")
+stepDuration = meter.create_histogram("flow.step.duration", unit="ms", description="Wall time of a flow method")
+crewDuration = meter.create_histogram("crew.duration", unit="ms", description="Wall time of a crew kickoff")
+crewLlmDuration = meter.create_histogram("crew.llm.duration", unit="ms", description="Time spent in LLM calls by a crew")
+crewToolDuration = meter.create_histogram("crew.tool.duration", unit="ms", description="Time spent in tool calls by a crew")
+crewTokens = meter.create_histogram("crew.tokens", unit="{token}", description="Tokens used by a crew kickoff")
+
+# Labels of the flow step being executed, inherited by the crews it kicks off
+flowLabels:ContextVar[dict] = ContextVar("flowLabels", default={})
+# Usage of the crew being executed, added to by its LLM and tool calls
+crewUsage:ContextVar["CrewUsage"] = ContextVar("crewUsage", default=None)
+# Tokens used by the request being executed, added to by its crews
+requestUsage:ContextVar["RequestUsage"] = ContextVar("requestUsage", default=None)
+
+prometheusReader = None
+setupLock = threading.Lock()
+
+def setupMetrics(prometheus:bool=False):
+    """Installs the meter provider. Histograms are exported over OTLP when an OTLP endpoint is
+    configured, and kept for the Prometheus endpoint when prometheus is True."""
+    global prometheusReader
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader, PeriodicExportingMetricReader
+    from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+
+    with setupLock:
+        if isinstance(metrics.get_meter_provider(), MeterProvider):
+            return
+        readers = []
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_METRICS_ENDPOINT"):
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+            readers.append(PeriodicExportingMetricReader(OTLPMetricExporter()))
+        if prometheus:
+            prometheusReader = InMemoryMetricReader()
+            readers.append(prometheusReader)
+        views = [
+            View(instrument_name="*.duration", aggregation=ExplicitBucketHistogramAggregation(DURATION_BUCKETS)),
+            View(instrument_name="crew.tokens", aggregation=ExplicitBucketHistogramAggregation(TOKEN_BUCKETS))
+        ]
+        metrics.set_meter_provider(MeterProvider(metric_readers=readers, views=views))
+
+def getFlowLabels(flow, step:str) -> dict:
+    intent = flow.state.intent.intent.value if getattr(flow.state, "intent", None) else "UNKNOWN"
+    return {"step": step, "intent": intent, "iteration": str(getattr(flow.state, "feedbackIter", 0))}
+
+def recordStep(method):
+    """Records the wall time of a flow method. Goes below the @start/@listen/@router decorator."""
+    def record(self, startTime:float):
+        # The labels are read at the end, as the step itself may set the intent or the iteration
+        stepDuration.record(1000 * (time.perf_counter() - startTime), getFlowLabels(self, method.__name__))
+
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def asyncWrapper(self, *args, **kwargs):
+            token = flowLabels.set(getFlowLabels(self, method.__name__))
+            startTime = time.perf_counter()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                record(self, startTime)
+                flowLabels.reset(token)
+        return asyncWrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = flowLabels.set(getFlowLabels(self, method.__name__))
+        startTime = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            record(self, startTime)
+            flowLabels.reset(token)
+    return wrapper
+
+class CrewUsage:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.startTime = time.perf_counter()
+        self.llmTime = 0.0
+        self.toolTime = 0.0
+
+    def add(self, kind:str, elapsed:float):
+        with self.lock:
+            setattr(self, kind, getattr(self, kind) + elapsed)
+
+class RequestUsage:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+
+    def add(self, tokens:int):
+        with self.lock:
+            self.tokens += tokens
+
+def timed(kind:str, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        startTime = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            usage = crewUsage.get()
+            if usage:
+                usage.add(kind, time.perf_counter() - startTime)
+    wrapper.isTimed = True
+    return wrapper
+
+def instrumentCrew(crew, name:str):
+    """Records wall, LLM and tool time and token counts of each kickoff of the crew.
+    LLM and tool time is only counted for calls wrapped with timed."""
+    def startUsage(inputs):
+        crewUsage.set(CrewUsage())
+        return inputs
+
+    def recordUsage(output):
+        usage = crewUsage.get()
+        if usage:
+            labels = dict(flowLabels.get(), crew=name)
+            crewDuration.record(1000 * (time.perf_counter() - usage.startTime), labels)
+            crewLlmDuration.record(1000 * usage.llmTime, labels)
+            crewToolDuration.record(1000 * usage.toolTime, labels)
+            tokenUsage = getattr(output, "token_usage", None)
+            if tokenUsage:
+                crewTokens.record(tokenUsage.prompt_tokens, dict(labels, token_type="prompt"))
+                crewTokens.record(tokenUsage.completion_tokens, dict(labels, token_type="completion"))
+                request = requestUsage.get()
+                if request:
+                    request.add(tokenUsage.prompt_tokens + tokenUsage.completion_tokens)
+            crewUsage.set(None)
+        return output
+
+    crew.before_kickoff_callbacks.insert(0, startUsage)
+    crew.after_kickoff_callbacks.append(recordUsage)
+
+def formatLabels(attributes:dict, extra:dict=None) -> str:
+    labels = dict(attributes, **(extra or {}))
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def renderPrometheus() -> str:
+    """Renders the histograms, counters and gauges in the Prometheus text exposition format."""
+    from opentelemetry.sdk.metrics.export import Histogram, Sum
+
+    if prometheusReader is None:
+        return ""
+    data = prometheusReader.get_metrics_data()
+    lines = []
+    for resourceMetrics in (data.resource_metrics if data else []):
+        for scopeMetrics in resourceMetrics.scope_metrics:
+            for metric in scopeMetrics.metrics:
+                name = metric.name.replace(".", "_") + ("_milliseconds" if metric.unit == "ms" else "")
+                if isinstance(metric.data, Histogram):
+                    lines.append(f"# HELP {name} {metric.description}")
+                    lines.append(f"# TYPE {name} histogram")
+                    for point in metric.data.data_points:
+                        cumulative = 0
+                        for bound, count in zip(list(point.explicit_bounds) + [float("inf")], point.bucket_counts):
+                            cumulative += count
+                            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                            lines.append(f"{name}_bucket{formatLabels(point.attributes, {'le': le})} {cumulative}")
+                        lines.append(f"{name}_sum{formatLabels(point.attributes)} {point.sum}")
+                        lines.append(f"{name}_count{formatLabels(point.attributes)} {point.count}")
+                    continue
+
+                # Monotonic sums are counters, up-down counters and gauges are gauges
+                if isinstance(metric.data, Sum) and metric.data.is_monotonic:
+                    name += "_total"
+                    metricType = "counter"
+                else:
+                    metricType = "gauge"
+                lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} {metricType}")
+                for point in metric.data.data_points:
+                    lines.append(f"{name}{formatLabels(point.attributes)} {point.value}")
+    return "\n".join(lines) + "\n"
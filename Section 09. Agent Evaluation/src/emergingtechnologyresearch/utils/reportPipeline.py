@@ -0,0 +1,33 @@
+import os
+from .crewFactory import kickoffCrew, kickoffCrews
+from ..crews.researchCrew import ReportConclusionCrew, ResearchPointsCrew, ResearchReport, SectionWriterCrew
+
+def isPipelined() -> bool:
+    return os.getenv("PIPELINED_SECTIONS") == "TRUE"
+
+async def writeReport(inputs:dict, stepCallback=None, onSection=None) -> ResearchReport:
+    """Researches the bullet points of the report, then writes one section per bullet point
+    concurrently and gives the report its title and conclusion in a final pass without tools.
+    Up to MCP_POOL_SIZE sections, writing them takes as long as the slowest one instead of the sum
+    of all of them. onSection(section) is called with the sections in report order, as soon as
+    each one and the ones before it are written."""
+    # The critic feedback is only known to the sections with a critic agent
+    inputs = dict({'qualityFeedback': "", 'alreadyGeneratedReport': ""}, **inputs)
+    points = (await kickoffCrew(ResearchPointsCrew, inputs, stepCallback)).pydantic.sections
+
+    def sectionWritten(index:int, result):
+        if onSection:
+            onSection(result.pydantic)
+
+    results = await kickoffCrews([
+        (SectionWriterCrew, dict(
+            inputs,
+            bulletPoint=point,
+            otherBulletPoints="; ".join(other for j, other in enumerate(points) if j != i)))
+        for i, point in enumerate(points)
+    ], stepCallback, onOutput=sectionWritten)
+    sections = [result.pydantic for result in results]
+
+    summary = "\n".join(f"{section.title}: {section.overview}" for section in sections)
+    conclusion = (await kickoffCrew(ReportConclusionCrew, dict(inputs, sections=summary), stepCallback)).pydantic
+    return ResearchReport(title=conclusion.title, sections=sections, conclusion=conclusion.conclusion)
@@ -0,0 +1,15 @@
+import pytest
+
+class FakeMcpSession:
+    tools = []
+    gatewayUrl = "fake"
+
+@pytest.fixture
+def offlineCrews(monkeypatch):
+    """Lets crews be built without an MCP gateway or LLM credentials."""
+    pytest.importorskip("crewai")
+    from emergingtechnologyresearch.utils import mcpUtils
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("VERBOSE_OUTPUT", "FALSE")
+    monkeypatch.setattr(mcpUtils.McpUtils, "acquireSession", lambda self, owner=None: FakeMcpSession())
+    monkeypatch.setattr(mcpUtils.McpUtils, "releaseSession", lambda self, session: None)
@@ -3,13 +3,13 @@ from a2a.server.events import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
     InvalidParamsError,
+    JSONRPCError,
     Part,
     Task,
+    TaskNotCancelableError,
     TextPart,
-    UnsupportedOperationError,
     TaskState,
     TaskStatus,
-    Role
 )
 from a2a.utils import (
     new_agent_text_message,
@@ -17,25 +17,43 @@ from a2a.utils import (
     new_artifact
 )
 from a2a.utils.errors import ServerError
-from .. utils.crewUtils import executeApp
-from .. flow import UserProfileIsRequired
-from .. utils.env import populateEnvWithSecrets
-from langfuse import get_client
-from openinference.instrumentation.crewai import CrewAIInstrumentor
-
-# Step1: Populate environment variables from AWS secrets manager
-populateEnvWithSecrets()
-    
-# Step2: Setup langfuse for tracing
-langfuse = get_client()
-if langfuse.auth_check():
-    print("Langfuse client is authenticated and ready!")
-else:
-    print("Authentication failed. Please check your credentials and host.")
-CrewAIInstrumentor().instrument(skip_dep_check=True)
+from .contextAssembler import ContextAssembler
+from .. utils.admissionUtils import AdmissionRejected, admissionController
+from .. utils.cancellationUtils import CancellationToken, FlowCancelled
+from .. utils.startup import startWarmUp, warmUp, getLangfuse
+import asyncio
+
+# JSON-RPC server error returned when the request isn't admitted, clients may retry it later
+SERVER_BUSY_ERROR_CODE = -32000
 
 class EmergingTechnologyResearchExecutor(AgentExecutor):
-    """Emerging technology research AgentExecutor Example."""
+    """Emerging technology research AgentExecutor Example.
+
+    In streaming mode, progress of the flow is published while it runs: a status update per
+    flow step, and an artifact chunk per finished report section.
+
+    The prompt of each turn is assembled by ContextAssembler: the last turns verbatim and earlier
+    reports reduced to their headings, within a token budget.
+
+    A cancel request stops the running flow: awaiting steps are cancelled and crews running in
+    worker threads stop at their next LLM or tool call.
+
+    Requests take an admission slot before the task is published, so that a busy server rejects
+    them with a retriable error instead of a failed task.
+
+    Secrets, Langfuse and the crews are initialized by warmUp, which the server starts at
+    startup and every request waits for, so that importing the executor stays cheap.
+    """
+
+    def __init__(self, streaming:bool=False):
+        super().__init__()
+        self.streaming = streaming
+        self.contextAssembler = ContextAssembler()
+        # Cancellation tokens of the tasks running in this process
+        self.cancellations:dict[str, CancellationToken] = {}
+
+    def startWarmUp(self):
+        startWarmUp()
 
     async def execute(
         self,
@@ -46,32 +64,56 @@ class EmergingTechnologyResearchExecutor(AgentExecutor):
         if error:
             raise ServerError(error=InvalidParamsError())
 
+        await warmUp()
+
         # Initiate current task
         currentTask = context.current_task
         if not currentTask:
             currentTask = new_task(context.message)
-        history = currentTask.history.copy()
 
-        # Build query String based on conversation history
-        query = ""
-        userInput = context.get_user_input()
-        for message in currentTask.history:
-            for part in message.parts:
-                if (isinstance(part.root, TextPart)):
-                    query += message.role + ": " + part.root.text + "\\n"
-        query += Role.user +  ": " + userInput + "\\n"
+        # Build query String based on conversation history, within the token budget
+        query = self.contextAssembler.assemble(currentTask.history, context.get_user_input(), context.message)
+
+        inputs = {
+            'prompt': query,
+            'sessionId': context.context_id,
+            'actorId': context.context_id # TODO fetch from the bearer token
+        }
+        try:
+            async with admissionController.admit(inputs['actorId']):
+                cancellation = CancellationToken()
+                self.cancellations[currentTask.id] = cancellation
+                try:
+                    if self.streaming:
+                        await self._execute_streaming(context, event_queue, currentTask, inputs, cancellation)
+                    else:
+                        await self._execute(context, event_queue, currentTask, inputs, cancellation)
+                finally:
+                    self.cancellations.pop(currentTask.id, None)
+        except AdmissionRejected as e:
+            raise ServerError(error=JSONRPCError(
+                code=SERVER_BUSY_ERROR_CODE,
+                message=str(e),
+                data={'retriable': True, 'retryAfter': e.retryAfter, 'reason': e.reason}))
+
+    async def _execute(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
+        currentTask: Task,
+        inputs: dict,
+        cancellation: CancellationToken,
+    ) -> None:
+        from .. utils.crewUtils import executeApp
+        from .. flow import UserProfileIsRequired
+        langfuse = getLangfuse()
+        history = currentTask.history.copy()
 
         result = ""
         with langfuse.start_as_current_span(name="A2A: emerging-technology-research-trace"):
             # Trigger CrewAI Flow
             try:
-                inputs = {
-                    'prompt': query,
-                    'sessionId': context.context_id,
-                    'actorId': context.context_id # TODO fetch from the bearer token
-                }
-                
-                result = await executeApp(inputs)
+                result = await executeApp(inputs, cancellation=cancellation)
                 parts = [Part(root=TextPart(text=result))]
                 history.append(new_agent_text_message(result))
                 await event_queue.enqueue_event(
@@ -83,6 +125,9 @@ class EmergingTechnologyResearchExecutor(AgentExecutor):
                         history=history
                     )
                 )
+            except FlowCancelled as e:
+                # The canceled status is published by cancel
+                result = e.message
             except UserProfileIsRequired as e:
                 history.append(new_agent_text_message(e.message))
                 await event_queue.enqueue_event(
@@ -105,10 +150,98 @@ class EmergingTechnologyResearchExecutor(AgentExecutor):
                 langfuse.update_current_trace(input=inputs, output=result)
                 langfuse.flush()
 
+    async def _execute_streaming(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
+        currentTask: Task,
+        inputs: dict,
+        cancellation: CancellationToken,
+    ) -> None:
+        from .. utils.crewUtils import executeApp
+        from .. flow import FlowProgressType, UserProfileIsRequired
+        langfuse = getLangfuse()
+
+        # The task has to be known to the event queue before any update for it is published
+        if not context.current_task:
+            await event_queue.enqueue_event(currentTask)
+        updater = TaskUpdater(event_queue, currentTask.id, currentTask.context_id)
+        artifactId = f'{currentTask.id}'
+
+        # Flow steps report progress from worker threads, so it is handed over to the event loop
+        loop = asyncio.get_running_loop()
+        progressQueue = asyncio.Queue()
+        def onProgress(progressType: FlowProgressType, text: str):
+            loop.call_soon_threadsafe(progressQueue.put_nowait, (progressType, text))
+
+        async def publishProgress():
+            while True:
+                progress = await progressQueue.get()
+                if progress is None:
+                    return
+                progressType, text = progress
+                if cancellation.cancelled:
+                    # Nothing is published after the canceled status
+                    continue
+                if progressType == FlowProgressType.STATUS:
+                    await updater.update_status(
+                        TaskState.working,
+                        message=new_agent_text_message(text, currentTask.context_id, currentTask.id))
+                else:
+                    # Every report, including a revision after critic feedback, replaces the previous one.
+                    # Only the complete response published at the end is the last chunk.
+                    await updater.add_artifact(
+                        [Part(root=TextPart(text=text))],
+                        artifact_id=artifactId,
+                        append=progressType != FlowProgressType.REPORT_STARTED,
+                        last_chunk=False)
+
+        result = ""
+        with langfuse.start_as_current_span(name="A2A: emerging-technology-research-trace"):
+            publisher = asyncio.create_task(publishProgress())
+            try:
+                await updater.start_work()
+                try:
+                    result = await executeApp(inputs, progress_callback=onProgress, cancellation=cancellation)
+                finally:
+                    progressQueue.put_nowait(None)
+                    await publisher
+                # The complete response is published last, so that the artifact always matches it
+                await updater.add_artifact(
+                    [Part(root=TextPart(text=result))],
+                    artifact_id=artifactId,
+                    append=False,
+                    last_chunk=True)
+                await updater.complete()
+            except FlowCancelled as e:
+                result = e.message
+            except UserProfileIsRequired as e:
+                result = e.message
+                await updater.requires_input(
+                    message=new_agent_text_message(e.message, currentTask.context_id, currentTask.id),
+                    final=True)
+            except Exception as e:
+                result = "Failed to get the result"
+                await updater.failed(
+                    message=new_agent_text_message(result, currentTask.context_id, currentTask.id)
+                )
+            finally:
+                langfuse.update_current_trace(input=inputs, output=result)
+                langfuse.flush()
+
     async def cancel(
         self, request: RequestContext, event_queue: EventQueue
     ) -> Task | None:
-        raise ServerError(error=UnsupportedOperationError())
+        # The request handler cancels the asyncio task running execute as well, the token
+        # stops the crews it started in worker threads
+        cancellation = self.cancellations.get(request.task_id)
+        if cancellation is None:
+            # The task already finished, or runs in another worker
+            raise ServerError(error=TaskNotCancelableError())
+        cancellation.cancel()
+        updater = TaskUpdater(event_queue, request.task_id, request.context_id)
+        await updater.cancel(
+            message=new_agent_text_message("The research was canceled", request.context_id, request.task_id))
 
     def _validate_request(self, context: RequestContext) -> bool:
         return False
@@ -6,74 +6,132 @@ and starts the server to handle incoming requests.
 
 import logging
 import os
+from contextlib import asynccontextmanager
 
 import click
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
+from starlette.responses import PlainTextResponse
+from ..utils.startup import loadEnv
+
+# The modules below read their settings when imported, so .env is loaded before them
+loadEnv()
+
 from .a2aResearchExecutor import EmergingTechnologyResearchExecutor
+from .taskStores import createTaskStore
+from ..utils.metricsUtils import renderPrometheus, setupMetrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def createApp():
+    """Builds the A2A application. Used as the uvicorn app factory, so each worker process builds its
+    own from the options the command passed in the environment."""
+    host = os.getenv('A2A_HOST', '127.0.0.1')
+    port = int(os.getenv('A2A_PORT', '9000'))
+    streaming = os.getenv('A2A_STREAMING') == 'TRUE'
+
+    capabilities = AgentCapabilities(streaming=streaming)
+    skill = AgentSkill(
+        id='emerging_technology_research',
+        name='Emerging Technology Research',
+        description=(
+            'Generate engaging and brief report about an emerging technology. '
+            ' The report will have multiple sections and with each section having '
+            ' overview, list of key developments and impact on the world. I can '
+            ' even answer followup questions on already conducted research in same session'
+        ),
+        tags=['emerging technology research', 'technology research'],
+        examples=['Research on use of high range batteries in electric cars',
+            'Research on impact of quantum computing on cryptography',
+            'I have a followup question on its impact on defense'],
+    )
+
+    agent_host_url = (
+        os.getenv('HOST_OVERRIDE')
+        if os.getenv('HOST_OVERRIDE')
+        else f'http://{host}:{port}/'
+    )
+    agent_card = AgentCard(
+        name='Emerging Technology Research',
+        description=(
+            'Generate engaging and brief report about an emerging technology. '
+            ' The report will have multiple sections and with each section having '
+            ' overview, list of key developments and impact on the world.'
+        ),
+        url=agent_host_url,
+        version='1.0.0',
+        default_input_modes=['text', 'text/plain'],
+        default_output_modes=['text', 'text/plain'],
+        capabilities=capabilities,
+        skills=[skill],
+    )
+
+    agent_executor = EmergingTechnologyResearchExecutor(streaming=streaming)
+    request_handler = DefaultRequestHandler(
+        agent_executor=agent_executor,
+        task_store=createTaskStore(os.getenv('A2A_TASK_STORE', 'memory'),
+                                   os.getenv('A2A_TASK_STORE_PATH', 'a2aTasks.db')),
+    )
+    server = A2AStarletteApplication(
+        agent_card=agent_card, http_handler=request_handler
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # The server accepts requests straight away, they wait for the warm-up to finish
+        agent_executor.startWarmUp()
+        yield
+
+    # Step and crew histograms are exposed for Prometheus to scrape, per worker process
+    setupMetrics(prometheus=True)
+    async def metricsEndpoint(request):
+        return PlainTextResponse(renderPrometheus(), media_type="text/plain; version=0.0.4")
+
+    app = server.build(lifespan=lifespan)
+    app.add_route("/metrics", metricsEndpoint, methods=["GET"])
+    return app
+
 @click.command()
 @click.option('--host', 'host', default='127.0.0.1')
 @click.option('--port', 'port', default=9000)
-def a2aServer(host, port):
+@click.option('--streaming/--no-streaming', 'streaming', default=os.getenv('A2A_STREAMING') == 'TRUE',
+              help='Stream status updates and report sections while the research is running')
+@click.option('--workers', 'workers', default=int(os.getenv('A2A_WORKERS', '1')),
+              help='Number of uvicorn worker processes, more than one requires the sqlite task store')
+@click.option('--task-store', 'taskStore', type=click.Choice(['memory', 'sqlite']),
+              default=os.getenv('A2A_TASK_STORE', 'memory'),
+              help='Keep the tasks in memory or in a SQLite database shared by the workers')
+@click.option('--task-store-path', 'taskStorePath', default=os.getenv('A2A_TASK_STORE_PATH', 'a2aTasks.db'),
+              help='SQLite database file of the sqlite task store')
+def a2aServer(host, port, streaming, workers, taskStore, taskStorePath):
     """Entry point for the A2A + CrewAI Emerging Technology Research."""
+    if workers > 1 and taskStore == 'memory':
+        # Each worker would only see the tasks it created itself
+        raise click.UsageError('--workers greater than 1 requires --task-store sqlite')
     try:
-        capabilities = AgentCapabilities(streaming=False)
-        skill = AgentSkill(
-            id='emerging_technology_research',
-            name='Emerging Technology Research',
-            description=(
-                'Generate engaging and brief report about an emerging technology. '
-                ' The report will have multiple sections and with each section having '
-                ' overview, list of key developments and impact on the world. I can '
-                ' even answer followup questions on already conducted research in same session'
-            ),
-            tags=['emerging technology research', 'technology research'],
-            examples=['Research on use of high range batteries in electric cars',
-                'Research on impact of quantum computing on cryptography',
-                'I have a followup question on its impact on defense'],
-        )
-
-        agent_host_url = (
-            os.getenv('HOST_OVERRIDE')
-            if os.getenv('HOST_OVERRIDE')
-            else f'http://{host}:{port}/'
-        )
-        agent_card = AgentCard(
-            name='Emerging Technology Research',
-            description=(
-                'Generate engaging and brief report about an emerging technology. '
-                ' The report will have multiple sections and with each section having '
-                ' overview, list of key developments and impact on the world.'
-            ),
-            url=agent_host_url,
-            version='1.0.0',
-            default_input_modes=['text', 'text/plain'],
-            default_output_modes=['text', 'text/plain'],
-            capabilities=capabilities,
-            skills=[skill],
-        )
-        
-        request_handler = DefaultRequestHandler(
-            agent_executor=EmergingTechnologyResearchExecutor(),
-            task_store=InMemoryTaskStore(),
-        )
-        server = A2AStarletteApplication(
-            agent_card=agent_card, http_handler=request_handler
-        )
+        # The worker processes build the app from the environment
+        os.environ.update({
+            'A2A_HOST': host,
+            'A2A_PORT': str(port),
+            'A2A_STREAMING': 'TRUE' if streaming else 'FALSE',
+            'A2A_TASK_STORE': taskStore,
+            'A2A_TASK_STORE_PATH': os.path.abspath(taskStorePath),
+        })
         import uvicorn
 
-        uvicorn.run(server.build(), host=host, port=port)
+        if workers > 1:
+            # Workers import the factory by name, which is __main__ when started with -m
+            module = __spec__.name if __spec__ else __name__
+            uvicorn.run(f'{module}:createApp', factory=True, host=host, port=port, workers=workers)
+        else:
+            uvicorn.run(createApp(), host=host, port=port)
 
     except Exception as e:
         logger.error(f'An error occurred during server startup: {e}')
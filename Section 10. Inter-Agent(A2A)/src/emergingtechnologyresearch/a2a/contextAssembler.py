@@ -0,0 +1,76 @@
+"""Assembles the prompt of a turn from the conversation history of the A2A task.
+
+The last turns are kept verbatim. Earlier reports of the agent are reduced to their title and
+section headings, which is enough to resolve follow-up questions (the reports themselves are in
+the short-term memory of the flow). Older messages are dropped once the token budget is used up.
+"""
+
+import logging
+import os
+
+from a2a.types import Message, Role, TextPart
+
+from ..utils.historyUtils import Tokenizer, summarizeReport
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent turns (a user message and the agent response) kept verbatim
+A2A_CONTEXT_TURNS = int(os.getenv("A2A_CONTEXT_TURNS", "2"))
+# Token budget of the history and the user input together
+A2A_CONTEXT_TOKENS = int(os.getenv("A2A_CONTEXT_TOKENS", "4000"))
+# Encoding of the local tokenizer, close enough for the budget with any of the models used
+A2A_CONTEXT_ENCODING = os.getenv("A2A_CONTEXT_ENCODING", "o200k_base")
+
+def getText(message:Message) -> str:
+    return "".join(part.root.text for part in message.parts if isinstance(part.root, TextPart))
+
+class ContextAssembler:
+    def __init__(self, turns:int=A2A_CONTEXT_TURNS, tokenBudget:int=A2A_CONTEXT_TOKENS, tokenizer:Tokenizer=None):
+        self.turns = turns
+        self.tokenBudget = tokenBudget
+        self.tokenizer = tokenizer or Tokenizer(A2A_CONTEXT_ENCODING)
+
+    def formatMessage(self, role:Role, text:str) -> str:
+        return role.value + ": " + text + "\\n"
+
+    def assemble(self, history:list[Message], userInput:str, currentMessage:Message=None) -> str:
+        """Builds the query from the history of the task and the input of the user.
+        The input is always included, the history is added newest first while it fits the budget.
+        The history of an ongoing task already ends with currentMessage, which is left out of it,
+        so that the input is neither counted twice nor takes one of the verbatim turns."""
+        userLine = self.formatMessage(Role.user, userInput)
+        remaining = self.tokenBudget - self.tokenizer.count(userLine)
+
+        if currentMessage is not None:
+            history = [message for message in history if message.message_id != currentMessage.message_id]
+        messages = [(message.role, getText(message)) for message in history]
+        messages = [(role, text) for role, text in messages if text]
+        verbatimFrom = len(messages) - 2 * self.turns
+
+        lines = []
+        for index in range(len(messages) - 1, -1, -1):
+            role, text = messages[index]
+            candidates = []
+            if index >= verbatimFrom:
+                candidates.append(text)
+            summary = summarizeReport(text) if role == Role.agent else None
+            if summary:
+                candidates.append(summary)
+            elif index < verbatimFrom:
+                candidates.append(text)
+
+            line = None
+            for candidate in candidates:
+                formatted = self.formatMessage(role, candidate)
+                tokens = self.tokenizer.count(formatted)
+                if tokens <= remaining:
+                    line = formatted
+                    remaining -= tokens
+                    break
+            if line is None:
+                # Older messages only make sense together with the ones after them
+                logger.info(f"Dropped {index + 1} of {len(messages)} history messages to fit {self.tokenBudget} tokens")
+                break
+            lines.append(line)
+
+        return "".join(reversed(lines)) + userLine
@@ -0,0 +1,137 @@
+"""Task stores for the A2A server.
+
+Both stores evict tasks which weren't accessed within the TTL, and the least recently used
+tasks once the maximum number of tasks is exceeded. BoundedInMemoryTaskStore serves a single
+process, SqliteTaskStore shares the tasks between the worker processes on one host.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from a2a.server.tasks import TaskStore
+from a2a.types import Task
+
+logger = logging.getLogger(__name__)
+
+# Seconds after the last access at which a task is evicted
+A2A_TASK_TTL = int(os.getenv("A2A_TASK_TTL", "3600"))
+# Maximum number of tasks kept, the least recently used ones are evicted beyond it
+A2A_MAX_TASKS = int(os.getenv("A2A_MAX_TASKS", "1000"))
+
+class BoundedInMemoryTaskStore(TaskStore):
+    """In-memory task store with TTL and LRU eviction."""
+
+    def __init__(self, maxTasks:int=A2A_MAX_TASKS, ttl:int=A2A_TASK_TTL):
+        self.maxTasks = maxTasks
+        self.ttl = ttl
+        self.tasks:OrderedDict[str, tuple[Task, float]] = OrderedDict()
+        self.lock = asyncio.Lock()
+
+    def evict(self, now:float):
+        # Least recently used first, so expired tasks are at the front
+        while self.tasks:
+            taskId, (_, accessedAt) = next(iter(self.tasks.items()))
+            if len(self.tasks) <= self.maxTasks and now - accessedAt <= self.ttl:
+                break
+            del self.tasks[taskId]
+
+    async def save(self, task:Task, context=None) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            self.tasks[task.id] = (task, now)
+            self.tasks.move_to_end(task.id)
+            self.evict(now)
+
+    async def get(self, task_id:str, context=None) -> Task | None:
+        async with self.lock:
+            now = time.monotonic()
+            self.evict(now)
+            if task_id not in self.tasks:
+                return None
+            task, _ = self.tasks[task_id]
+            self.tasks[task_id] = (task, now)
+            self.tasks.move_to_end(task_id)
+            return task
+
+    async def delete(self, task_id:str, context=None) -> None:
+        async with self.lock:
+            self.tasks.pop(task_id, None)
+
+class SqliteTaskStore(TaskStore):
+    """SQLite task store with TTL and LRU eviction.
+    The database runs in WAL mode, so that the worker processes of the server can read while one
+    of them writes. Queries run in a worker thread to keep them off the event loop."""
+
+    def __init__(self, path:str, maxTasks:int=A2A_MAX_TASKS, ttl:int=A2A_TASK_TTL):
+        self.path = path
+        self.maxTasks = maxTasks
+        self.ttl = ttl
+        self.local = threading.local()
+        connection = self.getConnection()
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, data TEXT NOT NULL, accessed_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS tasks_accessed_at ON tasks (accessed_at)")
+
+    def getConnection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so each thread gets its own
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def evict(self, connection:sqlite3.Connection, now:float):
+        connection.execute("DELETE FROM tasks WHERE accessed_at < ?", (now - self.ttl,))
+        connection.execute(
+            "DELETE FROM tasks WHERE id IN (SELECT id FROM tasks ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxTasks,))
+
+    def saveTask(self, task:Task):
+        # Wall clock time, as it is compared across processes
+        now = time.time()
+        connection = self.getConnection()
+        with connection:
+            connection.execute(
+                "INSERT INTO tasks (id, data, accessed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET data = excluded.data, accessed_at = excluded.accessed_at",
+                (task.id, task.model_dump_json(), now))
+            self.evict(connection, now)
+
+    def getTask(self, taskId:str) -> Task | None:
+        now = time.time()
+        connection = self.getConnection()
+        with connection:
+            row = connection.execute(
+                "SELECT data FROM tasks WHERE id = ? AND accessed_at >= ?", (taskId, now - self.ttl)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE tasks SET accessed_at = ? WHERE id = ?", (now, taskId))
+        return Task.model_validate_json(row[0])
+
+    def deleteTask(self, taskId:str):
+        connection = self.getConnection()
+        with connection:
+            connection.execute("DELETE FROM tasks WHERE id = ?", (taskId,))
+
+    async def save(self, task:Task, context=None) -> None:
+        await asyncio.to_thread(self.saveTask, task)
+
+    async def get(self, task_id:str, context=None) -> Task | None:
+        return await asyncio.to_thread(self.getTask, task_id)
+
+    async def delete(self, task_id:str, context=None) -> None:
+        await asyncio.to_thread(self.deleteTask, task_id)
+
+def createTaskStore(kind:str, path:str) -> TaskStore:
+    if kind == "sqlite":
+        logger.info(f"Using the SQLite task store at {path}")
+        return SqliteTaskStore(path)
+    return BoundedInMemoryTaskStore()
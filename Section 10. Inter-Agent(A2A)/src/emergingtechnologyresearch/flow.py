@@ -8,20 +8,32 @@ import os
 from pydantic import BaseModel, Field
 
 from . utils.memoryUtils import MemoryUtils
+from . utils.crewFactory import kickoffCrew, kickoffCrews
+from . utils.metricsUtils import recordStep
+from . utils.reportPipeline import isPipelined, writeReport
+from . utils.bannerUtils import BannerUtils
 
 from . crews.followupCrew import FollowupQuestionCrew
 from . crews.intentCrew import Intent, PromptIntent, IntentAnalyzer
-from . crews.researchCrew import Emergingtechnologyresearch, ResearchReport
-from . crews.criticCrew import CriticCrew, CriticFeedback
+from . crews.researchCrew import Emergingtechnologyresearch, ResearchReport, Section, SectionRevisionCrew
+from . crews.criticCrew import CriticCrew, CriticFeedback, SectionCriticCrew
 from . crews.reportBannerCrew import ReportBannerCrew
 
 import asyncio
+from enum import Enum
 
 class UserProfileIsRequired(Exception):
     message:str = "User profile information like qualification and experience is required to proceed further"
     def __init__(self):
         super().__init__(self.message)
 
+# Kind of progress reported to the progressCallback while the flow runs
+class FlowProgressType(Enum):
+    STATUS = "STATUS"
+    REPORT_STARTED = "REPORT_STARTED"
+    REPORT_SECTION = "REPORT_SECTION"
+    REPORT_COMPLETED = "REPORT_COMPLETED"
+
 # Pydantic model for the flow state
 class EmergingTechnologyFlowState(BaseModel):
     prompt:Optional[str] = Field(default=None, description="User prompt")
@@ -34,37 +46,72 @@ class EmergingTechnologyFlowState(BaseModel):
     preferences:Optional[str] = Field(default=None, description="User Preferences")
     criticFeedback:Optional[CriticFeedback] = Field(default=None, description="Feedback from the criticAgent")
     feedbackIter:Optional[int] = Field(default=0, description="Iteration no. of the feedback")
-    banners:Optional[list[str]] = Field(default=None, description="Array of banner images for each section")
+    revisedSections:Optional[list[int]] = Field(default=None, description="Sections rewritten by the last section revision")
+    banners:Optional[list[Optional[str]]] = Field(default=None, description="Array of banner images for each section")
 
 # Flow taking care of user prompt
 class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
     stepCallback:Any=None
+    progressCallback:Any=None
+    conversationHistoryTask:Any=None
 
-    def __init__(self, stepCallback=None):
+    def __init__(self, stepCallback=None, progressCallback=None):
         super().__init__()
         self.stepCallback = stepCallback
+        self.progressCallback = progressCallback
+
+    def notifyProgress(self, progressType:FlowProgressType, text:str):
+        # progressCallback may be invoked from worker threads, it must be thread-safe
+        if self.progressCallback:
+            self.progressCallback(progressType, text)
     
     @start()
-    def initialize(self):
-        self.state.conversationHistory = MemoryUtils(
+    @recordStep
+    async def initialize(self):
+        memoryUtils = MemoryUtils(
             sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).loadShortTermMemory()
+            actorId=self.state.actorId)
 
-        self.state.preferences = MemoryUtils(
-            sessionId=self.state.sessionId, 
-            actorId=self.state.actorId).extractUserPreferences()
+        # Both AgentCore round trips are started together, off the event loop. Only the 
+        # preferences are needed by the intent prompt, so the history keeps loading while
+        # the IntentAnalyzer runs and is awaited by the steps which consume it.
+        self.conversationHistoryTask = asyncio.create_task(asyncio.to_thread(memoryUtils.loadShortTermMemory))
+        self.state.preferences = await asyncio.to_thread(memoryUtils.extractUserPreferences)
+
+    async def loadConversationHistory(self) -> str:
+        if self.conversationHistoryTask:
+            self.state.conversationHistory = await self.conversationHistoryTask
+            self.conversationHistoryTask = None
+        return self.state.conversationHistory
+
+    async def discardConversationHistory(self):
+        # The flow may end before a step awaited the history, on an error or a route like
+        # UserProfileIsRequired, so the pending load is cancelled instead of being left behind
+        if self.conversationHistoryTask:
+            self.conversationHistoryTask.cancel()
+            await asyncio.gather(self.conversationHistoryTask, return_exceptions=True)
+            self.conversationHistoryTask = None
+
+    async def kickoff_async(self, *args, **kwargs):
+        try:
+            return await super().kickoff_async(*args, **kwargs)
+        finally:
+            await self.discardConversationHistory()
 
     @listen("initialize")
-    def checkIntent(self):
+    @recordStep
+    async def checkIntent(self):
+        self.notifyProgress(FlowProgressType.STATUS, "Analysing the intent of the prompt")
         inputs = {
             'prompt': self.state.prompt,
             'preferences': self.state.preferences
         }
 
-        response = IntentAnalyzer(self.stepCallback).crew().kickoff(inputs=inputs)
+        response = await kickoffCrew(IntentAnalyzer, inputs, self.stepCallback)
         self.state.intent = response.pydantic
 
     @router(checkIntent)
+    @recordStep
     def routeRequest(self):
         match self.state.intent.intent:
             case Intent.EMERGING_TECHNOLOGY_RESEARCH:
@@ -75,7 +122,10 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
                 return "UserProfileIsRequired"
 
     @listen("EmergingTechnologyResearch")
-    def research(self):
+    @recordStep
+    async def research(self):
+        self.notifyProgress(FlowProgressType.STATUS, f"Researching {self.state.intent.topic}"
+            + (f" (revision {self.state.feedbackIter})" if self.state.feedbackIter else ""))
         inputs = {
             'topic': self.state.intent.topic,
             'current_year': str(datetime.now().year),
@@ -84,79 +134,227 @@ class EmergingTechnologyFlow(Flow[EmergingTechnologyFlowState]):
             'qualityFeedback': self.state.criticFeedback.qualityFeedback if self.state.criticFeedback else "",
             'alreadyGeneratedReport': self.state.response if self.state.response else ""
         }
-        self.state.report = Emergingtechnologyresearch(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        # Every report, including a rewrite after critic feedback, replaces the one streamed before
+        self.notifyProgress(FlowProgressType.REPORT_STARTED, self.formatReportHeading())
+        if isPipelined():
+            # One reporting call per research bullet point, executed concurrently. Sections are
+            # streamed as they are written, banners are only part of the final response.
+            self.state.report = await writeReport(inputs, self.stepCallback, onSection=self.notifySection)
+        else:
+            self.state.report = (await kickoffCrew(Emergingtechnologyresearch, inputs, self.stepCallback)).pydantic
+            for section in self.state.report.sections:
+                self.notifySection(section)
+        self.state.revisedSections = None
 
-    @listen(research)
+    @listen("SectionRevision")
+    @recordStep
+    async def reviseSections(self):
+        # Only the sections rejected by the critic are rewritten, the rest of the report is kept
+        sections = list(self.state.report.sections)
+        rejected = [i for i, sectionFeedback in enumerate(self.state.criticFeedback.sectionFeedback) if not sectionFeedback.approved]
+        self.notifyProgress(FlowProgressType.STATUS, f"Revising {len(rejected)} of {len(sections)} sections"
+            + f" (revision {self.state.feedbackIter})")
+        kickoffs = []
+        for i in rejected:
+            inputs = {
+                'topic': self.state.intent.topic,
+                'current_year': str(datetime.now().year),
+                'style': self.state.intent.style,
+                'prompt': self.state.prompt,
+                'title': self.state.report.title,
+                'otherSections': ", ".join(section.title for j, section in enumerate(sections) if j != i),
+                'section': self.formatSection(sections[i]),
+                'qualityFeedback': self.state.criticFeedback.sectionFeedback[i].qualityFeedback
+            }
+            kickoffs.append((SectionRevisionCrew, inputs))
+
+        # The revised report is streamed in order, the sections up to the next rejected one are
+        # final once the revision before them is in
+        self.notifyProgress(FlowProgressType.REPORT_STARTED, self.formatReportHeading())
+        for section in sections[:rejected[0] if rejected else len(sections)]:
+            self.notifySection(section)
+
+        def sectionRevised(index:int, result):
+            i = rejected[index]
+            sections[i] = result.pydantic
+            for section in sections[i:rejected[index + 1] if index + 1 < len(rejected) else len(sections)]:
+                self.notifySection(section)
+
+        await kickoffCrews(kickoffs, self.stepCallback, onOutput=sectionRevised)
+        self.state.report = self.state.report.model_copy(update={'sections': sections})
+        self.state.revisedSections = rejected
+
+    @listen(or_(research, reviseSections))
+    @recordStep
     async def generateBannerImages(self):
         if (os.getenv('GENERATE_BANNERS') == "TRUE" and os.getenv("OPENAI_API_KEY") != None 
                 and self.state.report != None and self.state.report.sections != None):
-            results = []
-            for section in self.state.report.sections:
-                inputs = {
-                    'topic': section.title,
-                    'overview': section.overview,
-                    'style': self.state.intent.style
-                }
-                result = ReportBannerCrew(self.stepCallback).crew().kickoff_async(inputs=inputs)
-                results.append(result)
+            self.notifyProgress(FlowProgressType.STATUS, "Generating banner images for the report sections")
+            # After a section revision, the banners of the unchanged sections are kept
+            indices = list(range(len(self.state.report.sections)))
+            if self.state.revisedSections is not None and self.state.banners:
+                indices = self.state.revisedSections
+            sections = [self.state.report.sections[i] for i in indices]
+
+            if os.getenv('BANNER_CREW') == "TRUE":
+                kickoffs = []
+                for section in sections:
+                    inputs = {
+                        'topic': section.title,
+                        'overview': section.overview,
+                        'style': self.state.intent.style
+                    }
+                    kickoffs.append((ReportBannerCrew, inputs))
+
+                results = await kickoffCrews(kickoffs, self.stepCallback)
             
-            results = await asyncio.gather(*results)
-        
-            banners = []
-            for result in results:
-                banners.append(result.pydantic.url)
-            self.state.banners = banners
+                banners = []
+                for result in results:
+                    banners.append(result.pydantic.url)
+            else:
+                # Prompts are built straight from the sections, so no agent is needed to call the image API
+                banners = await BannerUtils().generateBanners(sections, self.state.intent.style)
+
+            if len(indices) < len(self.state.report.sections):
+                self.state.banners = list(self.state.banners)
+                for i, banner in zip(indices, banners):
+                    self.state.banners[i] = banner
+            else:
+                self.state.banners = banners
 
     @listen(generateBannerImages)
+    @recordStep
     def generateReport(self):
         if self.state.report:
-            response = f"# Research Report on: {self.state.intent.topic} after {self.state.feedbackIter} iterations\n"
+            # The heading and sections were streamed while they were written
+            response = self.formatReportHeading()
             for i, section in enumerate(self.state.report.sections,0):
-                response += f"## {section.title} \n\n"
-                if (self.state.banners != None and self.state.banners[i] != None):
-                    response += f"![Banner]({self.state.banners[i]}) \n\n"
-                response += f"### Overview \n"
-                response += f"{section.overview} \n"
-                response += f"### Key Developments \n"
-                for keyDevelopment in section.keyDevelopments:
-                    response += f"+ {keyDevelopment} \n"
-                response += f"### Impact \n"
-                response += f"{section.impact} \n\n"
-            response += f"## Conclusion:\n"
-            response += f"{self.state.report.conclusion} \n"
+                banner = self.state.banners[i] if self.state.banners != None else None
+                response += self.formatReportSection(section, banner)
+            conclusion = f"## Conclusion:\n"
+            conclusion += f"{self.state.report.conclusion} \n"
+            response += conclusion
+            self.notifyProgress(FlowProgressType.REPORT_COMPLETED, conclusion)
             self.state.response = response
 
+    def formatReportHeading(self) -> str:
+        return f"# Research Report on: {self.state.intent.topic} after {self.state.feedbackIter} iterations\n"
+
+    def formatReportSection(self, section:Section, banner:Optional[str]=None) -> str:
+        sectionResponse = f"## {section.title} \n\n"
+        if banner != None:
+            sectionResponse += f"![Banner]({banner}) \n\n"
+        sectionResponse += f"### Overview \n"
+        sectionResponse += f"{section.overview} \n"
+        sectionResponse += f"### Key Developments \n"
+        for keyDevelopment in section.keyDevelopments:
+            sectionResponse += f"+ {keyDevelopment} \n"
+        sectionResponse += f"### Impact \n"
+        sectionResponse += f"{section.impact} \n\n"
+        return sectionResponse
+
+    def notifySection(self, section:Section):
+        self.notifyProgress(FlowProgressType.REPORT_SECTION, self.formatReportSection(section))
+
+    def formatSection(self, section:Section) -> str:
+        response = f"## {section.title} \n\n"
+        response += f"### Overview \n"
+        response += f"{section.overview} \n"
+        response += f"### Key Developments \n"
+        for keyDevelopment in section.keyDevelopments:
+            response += f"+ {keyDevelopment} \n"
+        response += f"### Impact \n"
+        response += f"{section.impact} \n"
+        return response
+
+    async def critiqueReport(self) -> CriticFeedback:
+        # The report as a whole and each of its sections are reviewed in parallel. After a 
+        # section revision only the revised sections are reviewed again, as the verdicts on
+        # the rest of the report still hold.
+        previous = self.state.criticFeedback
+        sections = self.state.report.sections
+        reviewReport = (self.state.revisedSections is None or previous is None
+                        or len(previous.sectionFeedback) != len(sections))
+        indices = list(range(len(sections))) if reviewReport else self.state.revisedSections
+
+        kickoffs = []
+        if reviewReport:
+            inputs = {
+                'prompt': self.state.prompt,
+                'style': self.state.intent.style,
+                'report': self.state.response
+            }
+            kickoffs.append((CriticCrew, inputs))
+        for i in indices:
+            inputs = {
+                'prompt': self.state.prompt,
+                'style': self.state.intent.style,
+                'title': self.state.report.title,
+                'section': self.formatSection(sections[i])
+            }
+            kickoffs.append((SectionCriticCrew, inputs))
+        results = await kickoffCrews(kickoffs, self.stepCallback)
+
+        if reviewReport:
+            reportFeedback = results.pop(0).pydantic
+            reportApproved = reportFeedback.approved
+            qualityFeedback = reportFeedback.qualityFeedback
+            sectionFeedback = [None] * len(sections)
+        else:
+            # Section revisions only follow an approved report
+            reportApproved = previous.reportApproved
+            qualityFeedback = ""
+            sectionFeedback = list(previous.sectionFeedback)
+        for i, result in zip(indices, results):
+            sectionFeedback[i] = result.pydantic
+
+        # The combined feedback is what a full research pass gets to work with
+        for section, feedback in zip(sections, sectionFeedback):
+            if not feedback.approved:
+                qualityFeedback += f"\nSection '{section.title}': {feedback.qualityFeedback}"
+        return CriticFeedback(
+            qualityFeedback=qualityFeedback.strip(),
+            approved=reportApproved and all(feedback.approved for feedback in sectionFeedback),
+            reportApproved=reportApproved,
+            sectionFeedback=sectionFeedback
+        )
+
     @router(generateReport)
-    def feedback(self):
+    @recordStep
+    async def feedback(self):
         if self.state.feedbackIter >= 2 or os.getenv('CRITIC_AGENT') != 'TRUE':
             return "ResearchComplete"
 
-        inputs = {
-            'prompt': self.state.prompt,
-            'style': self.state.intent.style,
-            'report': self.state.response
-        }
-        self.state.criticFeedback = CriticCrew(self.stepCallback).crew().kickoff(inputs=inputs).pydantic
+        self.notifyProgress(FlowProgressType.STATUS, "Reviewing the quality of the report")
+        self.state.criticFeedback = await self.critiqueReport()
         self.state.feedbackIter += 1
         if self.state.criticFeedback.approved == True:
             return "ResearchComplete"
+        elif self.state.criticFeedback.reportApproved:
+            # Only some sections were rejected, those are rewritten without a new research pass
+            return "SectionRevision"
         else:
             return "EmergingTechnologyResearch"
 
     @listen("EmergingTechnologyFollowup")
-    def followup(self):
+    @recordStep
+    async def followup(self):
+        self.notifyProgress(FlowProgressType.STATUS, "Answering the follow-up question")
         inputs = {
             'prompt': self.state.prompt,
             'style': self.state.intent.style,
-            'history': self.state.conversationHistory,
+            'history': await self.loadConversationHistory(),
             'actorId': self.state.actorId
         }
-        self.state.response = FollowupQuestionCrew(self.stepCallback).crew().kickoff(inputs=inputs).raw
+        self.state.response = (await kickoffCrew(FollowupQuestionCrew, inputs, self.stepCallback)).raw
 
     @listen("UserProfileIsRequired")
+    @recordStep
     def userProfileIsRequired(self):
         return "UserProfileIsRequired"
 
     @listen(or_("ResearchComplete", followup))
-    def finish(self):
+    @recordStep
+    async def finish(self):
+        await self.loadConversationHistory()
         return self.state.response
\ No newline at end of file
@@ -0,0 +1,84 @@
+import functools
+import threading
+from contextvars import ContextVar
+from .metricsUtils import RequestUsage, getFlowLabels, meter
+
+flowCancellations = meter.create_counter("flow.cancellations", unit="{request}", description="Requests cancelled while running")
+tokensSaved = meter.create_counter("flow.cancelled.tokens_saved", unit="{token}",
+                                   description="Estimated tokens not spent because of cancelled requests")
+
+class FlowCancelled(Exception):
+    message:str = "The request was canceled"
+    def __init__(self):
+        super().__init__(self.message)
+
+class CancellationToken:
+    """Cancellation of one request, shared by the flow and the crews it kicks off.
+    Awaiting steps are cancelled with their asyncio task, crews running in worker threads
+    check the token before each LLM and tool call."""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def raiseIfCancelled(self):
+        if self.event.is_set():
+            raise FlowCancelled()
+
+# Token of the request being executed, inherited by the tasks and threads it starts
+currentCancellation:ContextVar[CancellationToken] = ContextVar("currentCancellation", default=None)
+
+def checkCancelled():
+    cancellation = currentCancellation.get()
+    if cancellation:
+        cancellation.raiseIfCancelled()
+
+def cancellable(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        checkCancelled()
+        return function(*args, **kwargs)
+    wrapper.isCancellable = True
+    return wrapper
+
+class TokenEstimator:
+    """Moving average of the tokens used by a completed request per intent, the baseline for the
+    tokens saved by cancelling a request."""
+
+    def __init__(self, weight:float=0.2):
+        self.lock = threading.Lock()
+        self.weight = weight
+        self.expectedTokens:dict[str, float] = {}
+
+    def update(self, intent:str, tokens:int):
+        with self.lock:
+            expected = self.expectedTokens.get(intent)
+            self.expectedTokens[intent] = tokens if expected is None else expected + self.weight * (tokens - expected)
+
+    def getExpectedTokens(self, intent:str) -> float | None:
+        with self.lock:
+            return self.expectedTokens.get(intent)
+
+tokenEstimator = TokenEstimator()
+
+def getIntent(flow) -> str:
+    return getFlowLabels(flow, "")["intent"]
+
+def recordRequestTokens(flow, usage:RequestUsage):
+    tokenEstimator.update(getIntent(flow), usage.tokens)
+
+def recordCancellation(flow, usage:RequestUsage):
+    """Counts a cancelled request and the tokens a completed request of its intent would have used
+    on top of what it used so far. Tokens of crews cut short mid-kickoff aren't reported by them,
+    so the saving is an upper estimate."""
+    intent = getIntent(flow)
+    flowCancellations.add(1, {"intent": intent})
+    expected = tokenEstimator.getExpectedTokens(intent)
+    if expected is not None:
+        tokensSaved.add(max(0, int(expected) - usage.tokens), {"intent": intent})
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+from crewai import Crew
+from .mcpUtils import MCP_POOL_SIZE, McpUtils
+from .metricsUtils import instrumentCrew, timed
+from .cancellationUtils import cancellable
+from .llmCache import llmCache
+
+class CrewTemplate:
+    """A crew built once from its @CrewBase class and never kicked off itself.
+    Its agents and tasks keep their uninterpolated configuration, so copies of the template
+    can be bound to the inputs of each request."""
+
+    def __init__(self, crewClass):
+        instance = crewClass()
+        self.name = crewClass.__name__
+        self.crew:Crew = instance.crew()
+        # The MCP session leased while building the template only tells which tools get
+        # bound to a fresh session per request, so it goes straight back to the pool
+        mcpSession = getattr(instance, "mcpSession", None)
+        self.mcpToolIds = {id(tool) for tool in mcpSession.tools} if mcpSession else set()
+        if mcpSession:
+            McpUtils().releaseSession(mcpSession)
+            instance.mcpSession = None
+
+    def build(self, stepCallback=None) -> Crew:
+        crew = self.crew.copy()
+        crew.step_callback = stepCallback
+        crew.task_callback = stepCallback
+        wrapAgentCalls(crew.agents)
+        instrumentCrew(crew, self.name)
+        if self.mcpToolIds:
+            self.bindMcpTools(crew)
+        return crew
+
+    def bindMcpTools(self, crew:Crew):
+        # One pooled MCP session is leased per kickoff, in the thread running it, and shared by the agents
+        mcpAgents = [(agent, [tool for tool in agent.tools if id(tool) not in self.mcpToolIds])
+                     for agent in crew.agents
+                     if agent.tools and any(id(tool) in self.mcpToolIds for tool in agent.tools)]
+        kickoff = crew.kickoff
+
+        def kickoffWithMcpTools(*args, **kwargs):
+            # The session goes back to the pool however the kickoff ends
+            with McpUtils().session() as mcpSession:
+                for agent, otherTools in mcpAgents:
+                    agent.tools = otherTools + list(mcpSession.tools)
+                wrapAgentCalls(agent for agent, _ in mcpAgents)
+                return kickoff(*args, **kwargs)
+        object.__setattr__(crew, "kickoff", kickoffWithMcpTools)
+
+def wrapCall(owner, name:str, wrapper, marker:str):
+    """Replaces a method of a single LLM or tool object with its wrapped version, unless it's wrapped already."""
+    method = getattr(owner, name)
+    if not getattr(method, marker, False):
+        # LLMs and tools may be pydantic models, which don't allow setting undeclared attributes
+        object.__setattr__(owner, name, wrapper(method))
+
+def wrapAgentCalls(agents):
+    """Serves the LLM calls of the agents from the LLM cache, times the LLM and tool calls and aborts
+    them once their request is cancelled. Every crew copy has its own LLM objects, so their calls
+    run on the copy, while tools are shared between copies and only wrapped once."""
+    for agent in agents:
+        if agent.llm is not None:
+            # Responses are served from and recorded to the LLM cache when LLM_CACHE_MODE is set
+            llmCache.wrap(agent.llm)
+            wrapCall(agent.llm, "call", lambda call: timed("llmTime", call), "isTimed")
+            wrapCall(agent.llm, "call", cancellable, "isCancellable")
+        for tool in agent.tools or []:
+            wrapCall(tool, "_run", lambda run: timed("toolTime", run), "isTimed")
+            wrapCall(tool, "_run", cancellable, "isCancellable")
+
+class CrewFactory:
+    """Process-wide cache of crew templates.
+    The YAML configs are parsed and the agents, tasks and LLMs are created once per crew class,
+    each request gets a copy with only its callbacks and tools bound."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.templates:dict[tuple, CrewTemplate] = {}
+
+    def getKey(self, crewClass) -> tuple:
+        # The LLM and verbosity of the agents depend on the environment, which can change
+        # once the secrets are loaded
+        return (crewClass, os.getenv("OPENAI_API_KEY"), os.getenv("VERBOSE_OUTPUT"))
+
+    def getTemplate(self, crewClass) -> CrewTemplate:
+        key = self.getKey(crewClass)
+        template = self.templates.get(key)
+        if template:
+            return template
+
+        with self.lock:
+            if key not in self.templates:
+                self.templates[key] = CrewTemplate(crewClass)
+            return self.templates[key]
+
+    def buildCrew(self, crewClass, stepCallback=None) -> Crew:
+        return self.getTemplate(crewClass).build(stepCallback)
+
+    def clear(self):
+        with self.lock:
+            self.templates.clear()
+
+crewFactory = CrewFactory()
+
+def buildCrew(crewClass, stepCallback=None) -> Crew:
+    return crewFactory.buildCrew(crewClass, stepCallback)
+
+async def kickoffCrew(crewClass, inputs:dict, stepCallback=None):
+    """Builds and kicks off a crew in a worker thread. Building a template and leasing its MCP
+    session block on the pool and the network, which must not happen on the event loop."""
+    return await asyncio.to_thread(lambda: buildCrew(crewClass, stepCallback).kickoff(inputs=inputs))
+
+async def kickoffCrews(kickoffs:list[tuple], stepCallback=None, limit:int=MCP_POOL_SIZE, onOutput=None) -> list:
+    """Kicks off (crewClass, inputs) pairs concurrently and returns their outputs in order. At most
+    limit crews run at a time, so that the crews waiting for an MCP session don't time out while
+    the pool is taken by the others. onOutput(index, output) is called in order too, as soon as
+    an output and all the outputs before it are in."""
+    semaphore = asyncio.Semaphore(limit)
+    outputs = {}
+    handedOn = 0
+
+    async def kickoff(index:int, crewClass, inputs:dict):
+        nonlocal handedOn
+        async with semaphore:
+            outputs[index] = await kickoffCrew(crewClass, inputs, stepCallback)
+        while onOutput and handedOn in outputs:
+            onOutput(handedOn, outputs[handedOn])
+            handedOn += 1
+        return outputs[index]
+    return await asyncio.gather(*[kickoff(index, crewClass, inputs) for index, (crewClass, inputs) in enumerate(kickoffs)])
@@ -1,20 +1,44 @@
+import asyncio
 import os
 from . env import populateEnvWithSecrets
 from .. flow import EmergingTechnologyFlow
 from . memoryUtils import MemoryUtils
+from . admissionUtils import admissionController
+from . cancellationUtils import (CancellationToken, FlowCancelled, currentCancellation, recordCancellation,
+                                recordRequestTokens)
+from . metricsUtils import RequestUsage, requestUsage
 from .. flow import UserProfileIsRequired
 
-async def executeApp(inputs, step_callback = None)->str:
-    response = ""
+async def executeApp(inputs, step_callback = None, progress_callback = None, cancellation:CancellationToken = None)->str:
+    # Requests beyond the concurrency limits wait for a slot, or are rejected when the queue is full
+    async with admissionController.admit(inputs['actorId']):
+        response = ""
 
-    populateEnvWithSecrets()
-    # Trigger the emerging technology flow
-    response = await EmergingTechnologyFlow(step_callback).kickoff_async(inputs=inputs)
-    if response == "UserProfileIsRequired":
-        raise UserProfileIsRequired()
+        populateEnvWithSecrets()
+        cancellation = cancellation or CancellationToken()
+        usage = RequestUsage()
+        cancellationToken = currentCancellation.set(cancellation)
+        usageToken = requestUsage.set(usage)
+        flow = EmergingTechnologyFlow(step_callback, progress_callback)
+        try:
+            # Trigger the emerging technology flow
+            response = await flow.kickoff_async(inputs=inputs)
+            cancellation.raiseIfCancelled()
+        except (asyncio.CancelledError, FlowCancelled):
+            # Crews still running in worker threads stop at their next LLM or tool call
+            cancellation.cancel()
+            recordCancellation(flow, usage)
+            raise
+        finally:
+            requestUsage.reset(usageToken)
+            currentCancellation.reset(cancellationToken)
+        recordRequestTokens(flow, usage)
 
-    # Save response in memory
-    MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
-        userPrompt=inputs['prompt'], assistantResponse=response)
-            
-    return response
\ No newline at end of file
+        if response == "UserProfileIsRequired":
+            raise UserProfileIsRequired()
+
+        # Save response in memory
+        MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
+            userPrompt=inputs['prompt'], assistantResponse=response)
+
+        return response
@@ -1,24 +1,105 @@
 import json
+import logging
 import os
+import threading
+import time
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
-def populateEnvWithSecrets():
-    secret_name = os.getenv("SECRET_NAME")
-    region_name = os.getenv("SECRET_REGION")
+logger = logging.getLogger(__name__)
+
+# Seconds for which loaded secrets are used without checking for a new version
+SECRETS_CACHE_TTL = int(os.getenv("SECRETS_CACHE_TTL", "300"))
+# Seconds after which stale secrets are no longer served while a refresh is pending
+SECRETS_MAX_STALENESS = int(os.getenv("SECRETS_MAX_STALENESS", "3600"))
+
+class SecretCache:
+    """Process-wide cache of a Secrets Manager secret.
+    Fresh values are served from memory, stale-but-valid values are served while a background
+    refresh checks for a new AWSCURRENT version, and only expired values block the caller."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client = None
+        self.key = None
+        self.versionId = None
+        self.values = None
+        self.loadedAt = 0.0
+        self.refreshing = False
+
+    def getClient(self, region_name:str):
+        if self.client is None or self.client.meta.region_name != region_name:
+            # Create a Secrets Manager client
+            session = boto3.session.Session()
+            self.client = session.client(
+                service_name='secretsmanager',
+                region_name=region_name
+            )
+        return self.client
+
+    def getCurrentVersionId(self, client, secret_name:str) -> str:
+        # Describing the secret is cheaper than fetching it, as nothing needs to be decrypted.
+        # Without permission to describe it, the secret value is fetched again instead.
+        try:
+            versions = client.describe_secret(SecretId=secret_name).get("VersionIdsToStages", {})
+        except ClientError:
+            return None
+        for versionId, stages in versions.items():
+            if "AWSCURRENT" in stages:
+                return versionId
+        return None
+
+    def load(self, secret_name:str, region_name:str):
+        client = self.getClient(region_name)
+        key = (secret_name, region_name)
+        if self.values is not None and self.key == key:
+            versionId = self.getCurrentVersionId(client, secret_name)
+            if versionId and versionId == self.versionId:
+                self.loadedAt = time.monotonic()
+                return
 
-    if secret_name and region_name:
-        # Create a Secrets Manager client
-        session = boto3.session.Session()
-        client = session.client(
-            service_name='secretsmanager',
-            region_name=region_name
-        )
-        
         get_secret_value_response = client.get_secret_value(
             SecretId=secret_name
         )
         secret = get_secret_value_response['SecretString']
-        secret = json.loads(secret)
-        for key, value in secret.items():
-            os.environ[key] = value
\ No newline at end of file
+        self.values = json.loads(secret)
+        self.versionId = get_secret_value_response.get('VersionId')
+        self.key = key
+        self.loadedAt = time.monotonic()
+        for name, value in self.values.items():
+            os.environ[name] = value
+
+    def refreshInBackground(self, secret_name:str, region_name:str):
+        def refresh():
+            try:
+                with self.lock:
+                    self.load(secret_name, region_name)
+            except (BotoCoreError, ClientError) as e:
+                logger.warning(f"Failed to refresh secret {secret_name}, serving the cached values: {e}")
+            finally:
+                self.refreshing = False
+
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def populateEnv(self, secret_name:str, region_name:str):
+        age = time.monotonic() - self.loadedAt
+        if self.values is None or self.key != (secret_name, region_name) or age > SECRETS_MAX_STALENESS:
+            with self.lock:
+                age = time.monotonic() - self.loadedAt
+                if self.values is None or self.key != (secret_name, region_name) or age > SECRETS_MAX_STALENESS:
+                    self.load(secret_name, region_name)
+        elif age > SECRETS_CACHE_TTL:
+            self.refreshInBackground(secret_name, region_name)
+
+secretCache = SecretCache()
+
+def populateEnvWithSecrets():
+    secret_name = os.getenv("SECRET_NAME")
+    region_name = os.getenv("SECRET_REGION")
+
+    if secret_name and region_name:
+        secretCache.populateEnv(secret_name, region_name)
@@ -1,33 +1,283 @@
+import asyncio
+import atexit
+import logging
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any
 import requests
+from crewai.project import after_kickoff
 from crewai_tools import MCPServerAdapter
 
+logger = logging.getLogger(__name__)
+
+# Seconds before expiry at which the bearer token gets refreshed
+TOKEN_REFRESH_MARGIN = int(os.getenv("MCP_TOKEN_REFRESH_MARGIN", "60"))
+# Maximum number of open MCP sessions per gateway
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+# Seconds to wait for a free session once the pool is exhausted
+MCP_POOL_TIMEOUT = float(os.getenv("MCP_POOL_TIMEOUT", "60"))
+# Seconds after which an idle session is closed instead of being reused
+MCP_SESSION_IDLE_TTL = int(os.getenv("MCP_SESSION_IDLE_TTL", "300"))
+# Seconds of idleness after which a session is pinged before being handed out
+MCP_SESSION_PING_AFTER = int(os.getenv("MCP_SESSION_PING_AFTER", "30"))
+
+class TokenCache:
+    """Process-wide cache of the MCP gateway bearer token.
+    Refreshes are single-flight, so concurrent crews share one token request."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.key = None
+        self.token = None
+        self.expiresAt = 0.0
+
+    def isFresh(self, key) -> bool:
+        return (self.token is not None and self.key == key
+                and time.monotonic() < self.expiresAt - TOKEN_REFRESH_MARGIN)
+
+    def getToken(self) -> str:
+        tokenUrl = os.getenv("MCP_TOKEN_URL")
+        client_id = os.getenv("MCP_CLIENT_ID")
+        client_secret = os.getenv("MCP_CLIENT_SECRET")
+        key = (tokenUrl, client_id, client_secret)
+        if self.isFresh(key):
+            return self.token
+
+        with self.lock:
+            # Another thread may have refreshed the token while this one was waiting
+            if not self.isFresh(key):
+                response = requests.post(
+                    tokenUrl,
+                    data="grant_type=client_credentials&client_id={client_id}&client_secret={client_secret}".format(client_id=client_id, client_secret=client_secret),
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'}
+                )
+                tokenResponse = response.json()
+                self.token = tokenResponse["access_token"]
+                self.expiresAt = time.monotonic() + int(tokenResponse.get("expires_in", 3600))
+                self.key = key
+            return self.token
+
+class McpSession:
+    """A live streamable-HTTP MCP session and the tools bound to it."""
+
+    def __init__(self, gatewayUrl:str, bearerToken:str):
+        server_params = {
+            "url": gatewayUrl,
+            "transport": "streamable-http",
+            "headers": {
+                "Authorization": f"Bearer {bearerToken}"
+            }
+        }
+        self.adapter = MCPServerAdapter(server_params)
+        self.tools = self.adapter.tools
+        self.gatewayUrl = gatewayUrl
+        self.bearerToken = bearerToken
+        self.lastUsed = time.monotonic()
+        self.leased = False
+        self.finalizer = None
+
+    def isHealthy(self, bearerToken:str) -> bool:
+        idleTime = time.monotonic() - self.lastUsed
+        if self.bearerToken != bearerToken or idleTime > MCP_SESSION_IDLE_TTL:
+            return False
+        if idleTime < MCP_SESSION_PING_AFTER:
+            return True
+        return self.ping()
+
+    def ping(self) -> bool:
+        # MCPServerAdapter runs its client sessions on a private event loop thread
+        mcpAdapt = getattr(self.adapter, "_adapter", None)
+        sessions = getattr(mcpAdapt, "sessions", None)
+        loop = getattr(mcpAdapt, "loop", None)
+        if sessions is None or loop is None:
+            return True
+        async def pingSessions():
+            await asyncio.gather(*[session.send_ping() for session in sessions])
+        try:
+            asyncio.run_coroutine_threadsafe(pingSessions(), loop).result(timeout=5)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session failed the health check: {e}")
+            return False
+
+    def close(self):
+        try:
+            self.adapter.stop()
+        except Exception as e:
+            logger.warning(f"An error occurred while closing the MCP session: {e}")
+
+class McpSessionPool:
+    """Bounded pool of MCP sessions for one gateway.
+    Sessions are leased to a crew for the duration of its run and handed back for reuse."""
+
+    def __init__(self, gatewayUrl:str, maxSize:int=MCP_POOL_SIZE):
+        self.gatewayUrl = gatewayUrl
+        self.maxSize = maxSize
+        self.condition = threading.Condition()
+        self.idle:list[McpSession] = []
+        self.size = 0
+        self.closed = False
+        self.acquired = 0
+        self.hits = 0
+        self.totalWait = 0.0
+        self.maxWait = 0.0
+
+    def acquire(self, bearerToken:str) -> McpSession:
+        startTime = time.monotonic()
+        deadline = startTime + MCP_POOL_TIMEOUT
+        while True:
+            session = None
+            with self.condition:
+                if self.closed:
+                    raise RuntimeError("MCP session pool is closed")
+                if self.idle:
+                    # Most recently used first, so that surplus sessions age out
+                    session = self.idle.pop()
+                elif self.size < self.maxSize:
+                    self.size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Timed out after {MCP_POOL_TIMEOUT}s waiting for an MCP session")
+                    self.condition.wait(remaining)
+                    continue
+
+            if session is None:
+                try:
+                    session = McpSession(self.gatewayUrl, bearerToken)
+                except Exception:
+                    self.discard(None)
+                    raise
+                return self.lease(session, startTime, hit=False)
+
+            if session.isHealthy(bearerToken):
+                return self.lease(session, startTime, hit=True)
+            self.discard(session)
+
+    def lease(self, session:McpSession, startTime:float, hit:bool) -> McpSession:
+        waitTime = time.monotonic() - startTime
+        with self.condition:
+            session.leased = True
+            self.acquired += 1
+            self.hits += 1 if hit else 0
+            self.totalWait += waitTime
+            self.maxWait = max(self.maxWait, waitTime)
+        return session
+
+    def release(self, session:McpSession):
+        with self.condition:
+            if not session.leased:
+                return
+            session.leased = False
+            if session.finalizer:
+                session.finalizer.detach()
+                session.finalizer = None
+            session.lastUsed = time.monotonic()
+            if not self.closed:
+                self.idle.append(session)
+                self.condition.notify()
+                return
+        self.discard(session)
+
+    def discard(self, session:McpSession):
+        if session:
+            session.close()
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            sessions, self.idle = self.idle, []
+            self.condition.notify_all()
+        for session in sessions:
+            self.discard(session)
+
+    def getStats(self) -> dict:
+        with self.condition:
+            return {
+                "gatewayUrl": self.gatewayUrl,
+                "size": self.size,
+                "idle": len(self.idle),
+                "leased": self.size - len(self.idle),
+                "acquired": self.acquired,
+                "hitRate": self.hits / self.acquired if self.acquired else 0.0,
+                "avgWaitMs": 1000 * self.totalWait / self.acquired if self.acquired else 0.0,
+                "maxWaitMs": 1000 * self.maxWait
+            }
+
+tokenCache = TokenCache()
+sessionPools:dict[str, McpSessionPool] = {}
+sessionPoolsLock = threading.Lock()
+
+def getSessionPool(gatewayUrl:str) -> McpSessionPool:
+    with sessionPoolsLock:
+        if gatewayUrl not in sessionPools:
+            sessionPools[gatewayUrl] = McpSessionPool(gatewayUrl)
+        return sessionPools[gatewayUrl]
+
+@atexit.register
+def closeSessionPools():
+    with sessionPoolsLock:
+        pools = list(sessionPools.values())
+    for pool in pools:
+        pool.close()
+
 class McpUtils:
-    def getTools(self):
-        # Retrieves and configures MCP (Model Context Protocol) tools for the crew agents.
+    def acquireSession(self, owner=None) -> McpSession:
+        # Leases a live MCP (Model Context Protocol) session for the crew agents.
         # This method handles the complete authentication flow with the MCP gateway:
         # 1. Retrieves OAuth2 credentials from environment variables
-        # 2. Obtains a bearer token using client credentials grant
-        # 3. Configures the MCP server adapter with the token
-        # 4. Returns the available tools for use by crew agents
+        # 2. Obtains a bearer token using client credentials grant (cached until shortly before expiry)
+        # 3. Hands out a pooled MCP session for the gateway, opening one if none is idle
+        # When an owner is given, the session goes back to the pool once the owner is garbage collected,
+        # in case it is not released explicitly.
+        # Blocks while the pool is exhausted and connects over the network, so async code only
+        # calls it from worker threads, e.g. through crewFactory.kickoffCrew.
         try:
-            client_id = os.getenv("MCP_CLIENT_ID")
-            client_secret = os.getenv("MCP_CLIENT_SECRET")
-            response = requests.post(
-                os.getenv("MCP_TOKEN_URL"),
-                data="grant_type=client_credentials&client_id={client_id}&client_secret={client_secret}".format(client_id=client_id, client_secret=client_secret),
-                headers={'Content-Type': 'application/x-www-form-urlencoded'}
-            )
-            bearer_token = response.json()["access_token"]
-        
-            server_params = {
-                "url": os.getenv("MCP_GATEWAY_URL"),
-                "transport": "streamable-http",
-                "headers": {
-                    "Authorization": f"Bearer {bearer_token}"
-                }
-            }
-            mcp_server_adapter = MCPServerAdapter(server_params)
-            return mcp_server_adapter.tools
+            bearer_token = tokenCache.getToken()
+            pool = getSessionPool(os.getenv("MCP_GATEWAY_URL"))
+            session = pool.acquire(bearer_token)
         except Exception as e:
-            raise Exception(f"An error occurred while getting tools from MCP: {e}")
\ No newline at end of file
+            raise Exception(f"An error occurred while getting tools from MCP: {e}")
+        if owner is not None:
+            session.finalizer = weakref.finalize(owner, pool.release, session)
+        return session
+
+    def releaseSession(self, session:McpSession):
+        if session:
+            getSessionPool(session.gatewayUrl).release(session)
+
+    @contextmanager
+    def session(self):
+        session = self.acquireSession()
+        try:
+            yield session
+        finally:
+            self.releaseSession(session)
+
+    def getPoolStats(self) -> list[dict]:
+        with sessionPoolsLock:
+            pools = list(sessionPools.values())
+        return [pool.getStats() for pool in pools]
+
+class McpToolsMixin:
+    """Base of the @CrewBase classes whose agents use the MCP tools.
+    One pooled MCP session is leased per crew, shared by its agents and released after the kickoff."""
+
+    mcpSession:Any=None
+
+    def getTools(self):
+        if self.mcpSession is None:
+            self.mcpSession = McpUtils().acquireSession(owner=self)
+        return self.mcpSession.tools
+
+    @after_kickoff
+    def releaseTools(self, output):
+        McpUtils().releaseSession(self.mcpSession)
+        self.mcpSession = None
+        return output
@@ -0,0 +1,81 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds the preference profile of an actor is served from the cache
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", "900"))
+# Seconds AgentCore takes to extract preferences from a new turn, the profile is read again after it
+PREFERENCE_EXTRACTION_DELAY = float(os.getenv("PREFERENCE_EXTRACTION_DELAY", "60"))
+# Maximum number of actors whose profile is cached
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "1000"))
+
+PREFERENCE_HINTS = re.compile(
+    r"\b(prefer\w*|style|format\w*|tone|concise|brief|short\w*|detailed|long\w*|bullet\w*|"
+    r"table\w*|always|never|instead|language)\b", re.IGNORECASE)
+
+def mayUpdatePreferences(userPrompt:str) -> bool:
+    """Whether the prompt could state a preference the memory strategy extracts."""
+    return bool(PREFERENCE_HINTS.search(userPrompt))
+
+def buildProfile(preferences:list[str]) -> str:
+    """Preferences without duplicates, in the order they were retrieved."""
+    profile = {}
+    for preference in preferences:
+        preference = " ".join(preference.split()).rstrip(".")
+        if preference:
+            profile.setdefault(preference.casefold(), preference)
+    return ". ".join(profile.values())
+
+class PreferenceCache:
+    """Preference profiles of the actors, so that the long-term memory isn't searched on every turn."""
+
+    def __init__(self, ttl:float=PREFERENCE_CACHE_TTL, extractionDelay:float=PREFERENCE_EXTRACTION_DELAY,
+                 maxEntries:int=PREFERENCE_CACHE_SIZE):
+        self.ttl = ttl
+        self.extractionDelay = extractionDelay
+        self.maxEntries = maxEntries
+        self.lock = threading.Lock()
+        # Profile and expiry time per actor
+        self.entries:OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+        # Time the preferences of the latest turn of an actor are likely extracted at
+        self.refreshes:dict[tuple, float] = {}
+
+    def get(self, key:tuple) -> str | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            profile, expiresAt = entry
+            if time.monotonic() >= expiresAt:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return profile
+
+    def put(self, key:tuple, profile:str):
+        now = time.monotonic()
+        with self.lock:
+            # A profile read before the preferences of the latest turn are extracted is kept until then only
+            refreshAt = self.refreshes.pop(key, 0)
+            self.entries[key] = (profile, refreshAt if refreshAt > now else now + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key:tuple):
+        """Expires the profile once the preferences of a new turn are likely extracted. Reading it
+        earlier would only cache the profile without them again."""
+        refreshAt = time.monotonic() + self.extractionDelay
+        with self.lock:
+            self.refreshes.pop(key, None)
+            self.refreshes[key] = refreshAt
+            while len(self.refreshes) > self.maxEntries:
+                del self.refreshes[next(iter(self.refreshes))]
+            entry = self.entries.get(key)
+            if entry:
+                profile, expiresAt = entry
+                self.entries[key] = (profile, min(expiresAt, refreshAt))
+
+preferenceCache = PreferenceCache()
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("a2a")
+
+from a2a.types import Message, Part, Role, TextPart
+
+from emergingtechnologyresearch.a2a.contextAssembler import ContextAssembler
+
+class WordTokenizer:
+    def count(self, text:str) -> int:
+        return len(text.split())
+
+def message(messageId:str, role:Role, text:str) -> Message:
+    return Message(message_id=messageId, role=role, parts=[Part(root=TextPart(text=text))])
+
+REPORT = "# Quantum Cryptography\n## Post-quantum algorithms\nLattice based schemes are being standardised."
+
+def testCurrentMessageIsOnlyCountedOnce():
+    current = message("3", Role.user, "second question")
+    history = [message("1", Role.user, "first question"), message("2", Role.agent, "first answer"), current]
+    # Three words per formatted message, the budget fits the input and the two earlier messages
+    assembler = ContextAssembler(turns=2, tokenBudget=9, tokenizer=WordTokenizer())
+
+    query = assembler.assemble(history, "second question", current)
+
+    assert query.count("second question") == 1
+    assert query.startswith("user: first question")
+    assert query.endswith("user: second question\\n")
+
+def testOlderReportsAreReducedToHeadings():
+    current = message("5", Role.user, "what about regulation")
+    history = [message("1", Role.user, "research quantum cryptography"), message("2", Role.agent, REPORT),
+               message("3", Role.user, "and costs"), message("4", Role.agent, REPORT), current]
+    assembler = ContextAssembler(turns=1, tokenBudget=1000, tokenizer=WordTokenizer())
+
+    query = assembler.assemble(history, "what about regulation", current)
+
+    # Only the report of the last turn is kept verbatim
+    assert query.count("Lattice based schemes") == 1
+    assert query.count("## Post-quantum algorithms") == 2
+
+def testOldestMessagesAreDroppedOverBudget():
+    current = message("5", Role.user, "third question")
+    history = [message("1", Role.user, "first question"), message("2", Role.agent, "first answer"),
+               message("3", Role.user, "second question"), message("4", Role.agent, "second answer"), current]
+    assembler = ContextAssembler(turns=2, tokenBudget=9, tokenizer=WordTokenizer())
+
+    query = assembler.assemble(history, "third question", current)
+
+    assert "first" not in query
+    assert query == "user: second question\\nagent: second answer\\nuser: third question\\n"
@@ -0,0 +1,57 @@
+# Microbenchmark of crew construction per request: a new @CrewBase instance (YAML parsing,
+# Agent/Task creation and getLlm per agent) against a copy of the cached crew template.
+# MCP sessions are faked, so neither the gateway nor an LLM is contacted.
+#
+# Run with: uv run python -m src.emergingtechnologyresearch.benchmarks.crewBuildBenchmark [iterations]
+import os
+import statistics
+import sys
+import time
+
+from crewai.tools import BaseTool
+
+from ..utils import mcpUtils
+from ..utils.crewFactory import CrewFactory
+from ..crews.intentCrew import IntentAnalyzer
+from ..crews.researchCrew import Emergingtechnologyresearch
+from ..crews.criticCrew import CriticCrew
+from ..crews.followupCrew import FollowupQuestionCrew
+
+class FakeMcpTool(BaseTool):
+    name: str = "Fake MCP Tool"
+    description: str = "Stands in for a tool of the MCP gateway."
+
+    def _run(self, **kwargs) -> str:
+        return ""
+
+class FakeMcpSession:
+    def __init__(self):
+        self.tools = [FakeMcpTool()]
+        self.gatewayUrl = "fake"
+
+def measure(build, iterations:int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        startTime = time.perf_counter()
+        build()
+        timings.append(1000 * (time.perf_counter() - startTime))
+    return timings
+
+def main(iterations:int):
+    # The LLM objects are only constructed, a placeholder key is enough for that
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    mcpUtils.McpUtils.acquireSession = lambda self, owner=None: FakeMcpSession()
+    mcpUtils.McpUtils.releaseSession = lambda self, session: None
+
+    crewFactory = CrewFactory()
+    print(f"{'Crew':<30}{'per request (ms)':>18}{'template copy (ms)':>20}{'speedup':>10}")
+    for crewClass in [IntentAnalyzer, Emergingtechnologyresearch, CriticCrew, FollowupQuestionCrew]:
+        before = measure(lambda: crewClass().crew(), iterations)
+        # The first build of the template is paid once per process, it is excluded here
+        crewFactory.getTemplate(crewClass)
+        after = measure(lambda: crewFactory.buildCrew(crewClass), iterations)
+        beforeMs, afterMs = statistics.median(before), statistics.median(after)
+        print(f"{crewClass.__name__:<30}{beforeMs:>18.2f}{afterMs:>20.2f}{beforeMs / afterMs:>9.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
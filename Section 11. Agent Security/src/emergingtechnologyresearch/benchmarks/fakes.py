@@ -0,0 +1,194 @@
+# Local stand-ins for the LLM, the MCP gateway, AgentCore memory and MongoDB, so that the
+# flow can be benchmarked end to end without network calls or LLM cost.
+import json
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from crewai.llms.base_llm import BaseLLM
+
+# Research prompts of the benchmark are marked, so that the fake intent analysis can route them
+RESEARCH_MARKER = "[research]"
+FOLLOWUP_MARKER = "[followup]"
+
+def finalAnswer(output) -> str:
+    if not isinstance(output, str):
+        output = json.dumps(output)
+    return f"Thought: I now know the final answer\nFinal Answer: {output}"
+
+def cannedSection(number:int) -> dict:
+    return {
+        "title": f"Sub-topic {number}",
+        "overview": f"Overview of sub-topic {number}.",
+        "keyDevelopments": [f"First development of sub-topic {number}.", f"Second development of sub-topic {number}."],
+        "impact": f"Impact of sub-topic {number}."
+    }
+
+class FakeLLM(BaseLLM):
+    """Scripted LLM returning canned structured outputs for each task of the flow.
+    The second section of a new report is rejected by the section critic once, so that the
+    section revision path is exercised as well."""
+
+    # Calls across all instances, as getLlm creates one per agent
+    calls = 0
+    callsLock = threading.Lock()
+
+    def __init__(self, latency:float=0.0):
+        super().__init__(model="fake/scripted")
+        self.latency = latency
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        with FakeLLM.callsLock:
+            FakeLLM.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(messages, str):
+            text = messages
+        else:
+            text = "\n".join(str(message.get("content", "")) for message in messages)
+        return finalAnswer(self.respond(text))
+
+    def respond(self, text:str):
+        if "Main task is to revise one section" in text:
+            section = cannedSection(2)
+            section["title"] += " (revised)"
+            return section
+        if "Analyze the section of the report for quality" in text:
+            approved = "Sub-topic 2" not in text or "(revised)" in text
+            return {"qualityFeedback": "Quality is good. No changes needed." if approved else "Shorten the overview.",
+                    "approved": approved}
+        if "Each section is reviewed separately" in text:
+            return {"qualityFeedback": "Quality is good. No changes needed.", "approved": True}
+        if "Main task is to write one section" in text:
+            match = re.search(r"Research Bullet Point of the Section: \"Bullet point (\d+)\"", text)
+            return cannedSection(int(match.group(1)) if match else 1)
+        if "Main task is to give a title and a conclusion" in text:
+            return {"title": "Benchmark report", "conclusion": "Conclusion of the benchmark report."}
+        if "expand each bullet point into a full section" in text:
+            return {"title": "Benchmark report", "sections": [cannedSection(i) for i in range(1, 4)],
+                    "conclusion": "Conclusion of the benchmark report."}
+        if "Main task is to conduct a thorough research" in text:
+            return {"sections": [f"Bullet point {i}" for i in range(1, 4)]}
+        if "generate a banner image" in text:
+            return {"url": "https://example.com/banner.png"}
+        if "answer the question based on the already conducted research" in text:
+            return "Answer to the follow-up question."
+        if "Analyse the prompt" in text:
+            intent = ("EMERGING_TECHNOLOGY_FOLLOW_UP_QUERY" if FOLLOWUP_MARKER in text
+                      else "EMERGING_TECHNOLOGY_RESEARCH")
+            return {"intent": intent, "topic": "quantum computing in cryptography", "style": "concise"}
+        return "Done."
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+class FakeMemoryClient:
+    """In-memory MemoryClient keeping the events of each session."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = defaultdict(list)
+
+    def create_event(self, memory_id, actor_id, session_id, messages, **kwargs):
+        with self.lock:
+            self.events[(actor_id, session_id)].append(
+                [{"role": role, "content": {"text": text}} for text, role in messages])
+
+    def get_last_k_turns(self, memory_id, actor_id, session_id, k=5, **kwargs):
+        # Newest turn first, as returned by AgentCore
+        with self.lock:
+            return list(reversed(self.events[(actor_id, session_id)][-k:]))
+
+    def list_events(self, memory_id, actor_id, session_id, max_results=100, **kwargs):
+        with self.lock:
+            return [{"payload": [{"conversational": message} for message in event]}
+                    for event in self.events[(actor_id, session_id)][-max_results:]]
+
+    def retrieve_memories(self, memory_id, namespace, query, actor_id=None, **kwargs):
+        return [{"content": {"text": json.dumps({"preference": "Prefers concise reports"})}}]
+
+class FakeCursor:
+    def __init__(self, documents:list[dict]):
+        self.documents = documents
+
+    def sort(self, key:str, direction:int):
+        self.documents = sorted(self.documents, key=lambda document: document.get(key), reverse=direction < 0)
+        return self
+
+    def limit(self, count:int):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+class FakeCollection:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents:list[dict] = []
+
+    def create_index(self, keys, **kwargs):
+        return "index"
+
+    def insert_one(self, document:dict):
+        self.insert_many([document])
+
+    def insert_many(self, documents:list[dict], ordered:bool=True):
+        with self.lock:
+            for document in documents:
+                document.setdefault("_id", len(self.documents))
+                self.documents.append(document)
+
+    def find(self, query:dict=None, projection:dict=None):
+        # Only equality filters are used on this path
+        query = {key: value for key, value in (query or {}).items() if not isinstance(value, dict)}
+        with self.lock:
+            return FakeCursor([document for document in self.documents
+                               if all(document.get(key) == value for key, value in query.items())])
+
+class FakeMongoClient:
+    def __init__(self):
+        self.collections = defaultdict(FakeCollection)
+
+    def __getitem__(self, database:str):
+        client = self
+        class Database:
+            def __getitem__(self, collection:str):
+                return client.collections[(database, collection)]
+        return Database()
+
+def getFreePort() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def startStubMcpServer() -> str:
+    """Starts a local streamable-HTTP MCP server with a canned search tool and returns its URL."""
+    from mcp.server.fastmcp import FastMCP
+
+    port = getFreePort()
+    server = FastMCP("stub-gateway", host="127.0.0.1", port=port)
+
+    @server.tool()
+    def search(query:str) -> str:
+        """Searches the web for the query."""
+        return f"Canned search results for {query}."
+
+    threading.Thread(target=server.run, kwargs={"transport": "streamable-http"},
+                     name="StubMcpServer", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Stub MCP server did not start")
@@ -0,0 +1,162 @@
+# Offline end to end benchmark of EmergingTechnologyFlow, the regression baseline for changes to
+# the orchestration. The LLM, the MCP gateway, AgentCore memory and MongoDB are replaced by the
+# local stand-ins in fakes.py, so the numbers are the overhead of the flow itself (plus the
+# scripted LLM latency, if any). Each session researches a topic (with one critic revision of a
+# section) and then asks follow-up questions.
+#
+# Run with: uv run python -m src.emergingtechnologyresearch.benchmarks.flowBenchmark --sessions 8
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+from . fakes import (FOLLOWUP_MARKER, RESEARCH_MARKER, FakeLLM, FakeMemoryClient, FakeMongoClient,
+                     startStubMcpServer)
+
+stepTimings:dict[str, list[float]] = defaultdict(list)
+
+def configureEnvironment(llmLatency:float, stubMcp:bool, pipelinedSections:bool):
+    os.environ.update({
+        "PIPELINED_SECTIONS": "TRUE" if pipelinedSections else "FALSE",
+        "CRITIC_AGENT": "TRUE",
+        "GENERATE_BANNERS": "TRUE",
+        "BANNER_CREW": "TRUE",
+        "REPORT_CACHE": "FALSE",
+        "VERBOSE_OUTPUT": "FALSE",
+        "OPENAI_API_KEY": "benchmark",
+        "MEMORY_ID": "benchmark",
+        "MEMORY_STRATEGY_ID": "benchmark",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true"
+    })
+    # Secrets are never loaded from AWS
+    os.environ.pop("SECRET_NAME", None)
+
+    from .. crews import criticCrew, followupCrew, intentCrew, reportBannerCrew, researchCrew
+    from .. utils import memoryUtils, mcpUtils, publishedReportUtils
+    from .. utils.crewFactory import crewFactory
+
+    # Crew modules import getLlm by name, so it is replaced in each of them
+    for module in [criticCrew, followupCrew, intentCrew, reportBannerCrew, researchCrew]:
+        module.getLlm = lambda: FakeLLM(llmLatency)
+    crewFactory.clear()
+
+    fakeMemoryClient = FakeMemoryClient()
+    memoryUtils.getMemoryClient = lambda memoryId=None: fakeMemoryClient
+    publishedReportUtils.mongoClient = FakeMongoClient()
+
+    if stubMcp:
+        os.environ["MCP_GATEWAY_URL"] = startStubMcpServer()
+        mcpUtils.tokenCache.getToken = lambda: "benchmark"
+    else:
+        class FakeMcpSession:
+            tools = []
+            gatewayUrl = "fake"
+        mcpUtils.McpUtils.acquireSession = lambda self, owner=None: FakeMcpSession()
+        mcpUtils.McpUtils.releaseSession = lambda self, session: None
+
+def timed(name:str, method):
+    # The flow awaits coroutine methods and runs the others as they are, so the wrapper keeps the kind
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def asyncWrapper(*args, **kwargs):
+            startTime = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                stepTimings[name].append(1000 * (time.perf_counter() - startTime))
+        return asyncWrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        startTime = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stepTimings[name].append(1000 * (time.perf_counter() - startTime))
+    return wrapper
+
+def instrumentFlow():
+    from .. flow import EmergingTechnologyFlow
+    from .. utils import crewUtils
+
+    def createFlow(*args, **kwargs):
+        flow = EmergingTechnologyFlow(*args, **kwargs)
+        for name, method in list(getattr(flow, "_methods", {}).items()):
+            flow._methods[name] = timed(name, method)
+        return flow
+    crewUtils.EmergingTechnologyFlow = createFlow
+
+async def runSession(turns:int, requestTimings:list[float]):
+    from .. utils.crewUtils import executeApp
+
+    sessionId = f"{uuid.uuid4()}"
+    prompts = [f"Research on quantum computing in cryptography {RESEARCH_MARKER}"]
+    prompts += [f"How does it affect banking? {FOLLOWUP_MARKER}"] * (turns - 1)
+    for prompt in prompts:
+        inputs = {"prompt": prompt, "sessionId": sessionId, "actorId": f"benchmark-{sessionId}"}
+        startTime = time.perf_counter()
+        await executeApp(inputs)
+        requestTimings.append(1000 * (time.perf_counter() - startTime))
+
+def percentile(values:list[float], percent:float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+def printTimings(title:str, timings:dict[str, list[float]]):
+    print(f"\n{title:<28}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}  (ms)")
+    for name, values in timings.items():
+        print(f"{name:<28}{len(values):>7}{statistics.mean(values):>10.1f}{percentile(values, 50):>10.1f}"
+              f"{percentile(values, 95):>10.1f}{max(values):>10.1f}")
+
+async def main(sessions:int, turns:int, warmUpRuns:int, traceAllocations:bool):
+    # The first runs build the crew templates and open the MCP sessions, they aren't measured
+    for _ in range(warmUpRuns):
+        await runSession(turns, [])
+    stepTimings.clear()
+    FakeLLM.calls = 0
+
+    if traceAllocations:
+        tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+
+    requestTimings:list[float] = []
+    startTime = time.perf_counter()
+    await asyncio.gather(*[runSession(turns, requestTimings) for _ in range(sessions)])
+    elapsed = time.perf_counter() - startTime
+
+    requests = sessions * turns
+    print(f"{sessions} concurrent sessions x {turns} turns: {requests} requests in {elapsed:.2f} s, "
+          f"{requests / elapsed:.2f} requests/s, {FakeLLM.calls / requests:.1f} LLM calls per request")
+    printTimings("Step", dict(stepTimings))
+    printTimings("Request", {"executeApp": requestTimings})
+
+    if traceAllocations:
+        current, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+        print(f"\nAllocations: {allocated / 2**20:.1f} MiB net allocated, {allocated / requests / 2**10:.0f} KiB per request, "
+              f"{peak / 2**20:.1f} MiB peak traced")
+        for stat in stats[:10]:
+            print(f"    {stat.size_diff / 2**10:>10.1f} KiB  {stat.traceback[0]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of EmergingTechnologyFlow")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent sessions")
+    parser.add_argument("--turns", type=int, default=2, help="Requests per session, a research followed by follow-ups")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake LLM takes per call")
+    parser.add_argument("--warm-up", type=int, default=1, help="Unmeasured sessions run first")
+    parser.add_argument("--no-stub-mcp", action="store_true", help="Fake MCP sessions instead of running a stub MCP server")
+    parser.add_argument("--pipelined-sections", action="store_true", help="Write the report sections concurrently")
+    parser.add_argument("--trace-allocations", action="store_true", help="Report allocations with tracemalloc")
+    args = parser.parse_args()
+
+    configureEnvironment(args.llm_latency, not args.no_stub_mcp, args.pipelined_sections)
+    instrumentFlow()
+    asyncio.run(main(args.sessions, args.turns, args.warm_up, args.trace_allocations))
@@ -0,0 +1,65 @@
+# Import-time budget of the entry points, measured with `python -X importtime`.
+# Importing an entry point must stay cheap, the heavy initialization belongs to the warm-up
+# (utils/startup.py). Exits with a non-zero status when an entry point exceeds its budget.
+#
+# Run with: uv run python -m src.emergingtechnologyresearch.benchmarks.importTimeBudget
+# After an intended change, the budgets can be re-based on the measured times with --update.
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).with_name("importTimeBudget.json")
+PROJECT_DIR = Path(__file__).parents[3]
+PACKAGE = __package__.rsplit(".", 1)[0]
+# Every measurement is repeated, and the fastest run counts, to keep noise out of the check
+REPEAT = 3
+# Headroom over the measured time when the budgets are re-based
+UPDATE_HEADROOM = 1.5
+
+def importTimes(statement:str) -> dict[str, int]:
+    # -X importtime writes "import time: self [us] | cumulative | imported package" to stderr
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                             cwd=PROJECT_DIR, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"'{statement}' failed:\n{process.stderr[-2000:]}")
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        selfTime, _, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(selfTime)
+    return times
+
+def measure(module:str) -> tuple[float, dict[str, int]]:
+    # The imports of the bare interpreter startup don't count towards the budget
+    baseline = importTimes("pass")
+    runs = []
+    for _ in range(REPEAT):
+        times = {name: time for name, time in importTimes(f"import {PACKAGE}.{module}").items()
+                 if name not in baseline}
+        runs.append((sum(times.values()) / 1000, times))
+    return min(runs, key=lambda run: run[0])
+
+def main(update:bool):
+    budgets = json.loads(BUDGET_FILE.read_text())
+    exceeded = []
+    for module, budgetMs in budgets.items():
+        totalMs, times = measure(module)
+        status = "OK" if totalMs <= budgetMs else "OVER BUDGET"
+        print(f"{module}: {totalMs:.0f} ms of {budgetMs} ms budget {status}")
+        for name, time in sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]:
+            print(f"    {time / 1000:>8.1f} ms  {name}")
+        if totalMs > budgetMs:
+            exceeded.append(module)
+        budgets[module] = round(totalMs * UPDATE_HEADROOM)
+
+    if update:
+        BUDGET_FILE.write_text(json.dumps(budgets, indent=4) + "\n")
+        print(f"Updated the budgets in {BUDGET_FILE.name}")
+    elif exceeded:
+        print(f"Import-time budget exceeded by: {', '.join(exceeded)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main("--update" in sys.argv[1:])
@@ -2,18 +2,28 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import Any, List
-from ..utils.mcpUtils import McpUtils
+from ..utils.mcpUtils import McpToolsMixin
 from ..utils.llmUtils import getLlm, getVerbose
 
 # Define Pydantic models for output
 from pydantic import BaseModel, Field
 
+class ReportFeedback(BaseModel):
+   qualityFeedback: str = Field(description="Feedback on report quality")
+   approved: bool = Field(description="True if approved, false if has feedback")
+
+class SectionFeedback(BaseModel):
+   qualityFeedback: str = Field(description="Feedback on section quality")
+   approved: bool = Field(description="True if approved, false if has feedback")
+
 class CriticFeedback(BaseModel):
    qualityFeedback: str = Field(description="Feedback on report quality")
    approved: bool = Field(description="True if approved, false if has feedback")
+   reportApproved: bool = Field(default=True, description="True if the report as a whole is approved")
+   sectionFeedback: list[SectionFeedback] = Field(default=[], description="Feedback on each section of the report")
 
 @CrewBase
-class CriticCrew():
+class CriticCrew(McpToolsMixin):
     """CriticCrew"""
 
     agents_config = '../config/criticAgents.yaml'
@@ -24,9 +34,6 @@ class CriticCrew():
 
     def __init__(self, stepCallback=None):
         self.stepCallback = stepCallback
-    
-    def getTools(self):
-        return McpUtils().getTools()
 
     @agent
     def critic_agent(self) -> Agent:
@@ -41,7 +48,7 @@ class CriticCrew():
     def critic_task(self) -> Task:
         return Task(
             config=self.tasks_config['critic_task'],
-            output_pydantic=CriticFeedback
+            output_pydantic=ReportFeedback
         )
 
     @crew
@@ -56,4 +63,47 @@ class CriticCrew():
             verbose=getVerbose(),
             step_callback=self.stepCallback,
             task_callback=self.stepCallback
+        )
+
+@CrewBase
+class SectionCriticCrew(McpToolsMixin):
+    """SectionCriticCrew reviewing a single section of the report"""
+
+    agents_config = '../config/criticAgents.yaml'
+    tasks_config = '../config/sectionCriticTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def critic_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config['critic_agent'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm = getLlm()
+        )
+
+    @task
+    def section_critic_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['section_critic_task'],
+            output_pydantic=SectionFeedback
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the SectionCriticCrew crew"""
+
+        return Crew(
+            name="SectionCriticCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
         )
\ No newline at end of file
@@ -1,7 +1,7 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from ..utils.mcpUtils import McpUtils
+from ..utils.mcpUtils import McpToolsMixin
 from ..utils.llmUtils import getLlm, getVerbose
 from typing import (
     Any,
@@ -23,8 +23,12 @@ class ResearchReport(BaseModel):
 class ResearchPoints(BaseModel):
    sections: list[str] = Field(description="List of bullet points together forming a report")
 
+class ReportConclusion(BaseModel):
+    title:str = Field(description="Title of the report")
+    conclusion:str = Field(description="Conclusion of the report")
+
 @CrewBase
-class Emergingtechnologyresearch():
+class Emergingtechnologyresearch(McpToolsMixin):
     """Emergingtechnologyresearch crew"""
 
     agents_config = '../config/researchAgents.yaml'
@@ -35,9 +39,6 @@ class Emergingtechnologyresearch():
 
     def __init__(self, stepCallback=None):
         self.stepCallback = stepCallback
-    
-    def getTools(self):
-        return McpUtils().getTools()
 
     @agent
     def researcher(self) -> Agent:
@@ -82,4 +83,171 @@ class Emergingtechnologyresearch():
             verbose=getVerbose(),
             step_callback=self.stepCallback,
             task_callback=self.stepCallback
-        )
\ No newline at end of file
+        )
+
+@CrewBase
+class SectionRevisionCrew(McpToolsMixin):
+    """SectionRevisionCrew rewriting a single section rejected by the critic"""
+
+    agents_config = '../config/researchAgents.yaml'
+    tasks_config = '../config/sectionRevisionTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def reporting_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config['reporting_analyst'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm=getLlm()
+        )
+
+    @task
+    def section_revision_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['section_revision_task'],
+            output_pydantic=Section
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the SectionRevisionCrew crew"""
+        return Crew(
+            name="SectionRevisionCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class ResearchPointsCrew(McpToolsMixin):
+    """ResearchPointsCrew researching the bullet points of a report, each written by a SectionWriterCrew"""
+
+    agents_config = '../config/researchAgents.yaml'
+    tasks_config = '../config/researchPointsTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def researcher(self) -> Agent:
+        return Agent(
+            config=self.agents_config['researcher'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm=getLlm()
+        )
+
+    @task
+    def research_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['research_task'],
+            output_pydantic=ResearchPoints
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the ResearchPointsCrew crew"""
+        return Crew(
+            name="ResearchPointsCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class SectionWriterCrew(McpToolsMixin):
+    """SectionWriterCrew expanding a single research bullet point into a section"""
+
+    agents_config = '../config/researchAgents.yaml'
+    tasks_config = '../config/sectionWritingTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def reporting_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config['reporting_analyst'],
+            verbose=getVerbose(),
+            tools=self.getTools(),
+            llm=getLlm()
+        )
+
+    @task
+    def section_writing_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['section_writing_task'],
+            output_pydantic=Section
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the SectionWriterCrew crew"""
+        return Crew(
+            name="SectionWriterCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
+
+@CrewBase
+class ReportConclusionCrew():
+    """ReportConclusionCrew giving the title and conclusion to the written sections, without tools"""
+
+    agents_config = '../config/researchAgents.yaml'
+    tasks_config = '../config/sectionWritingTasks.yaml'
+    agents: List[BaseAgent]
+    tasks: List[Task]
+    stepCallback:Any=None
+
+    def __init__(self, stepCallback=None):
+        self.stepCallback = stepCallback
+
+    @agent
+    def reporting_analyst(self) -> Agent:
+        return Agent(
+            config=self.agents_config['reporting_analyst'],
+            verbose=getVerbose(),
+            llm=getLlm()
+        )
+
+    @task
+    def report_conclusion_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['report_conclusion_task'],
+            output_pydantic=ReportConclusion
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        """Creates the ReportConclusionCrew crew"""
+        return Crew(
+            name="ReportConclusionCrew",
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=getVerbose(),
+            step_callback=self.stepCallback,
+            task_callback=self.stepCallback
+        )
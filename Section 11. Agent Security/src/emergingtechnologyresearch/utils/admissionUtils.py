@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from .metricsUtils import meter
+
+# Maximum number of requests executed at once, and per actor
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_PER_ACTOR = int(os.getenv("ADMISSION_MAX_PER_ACTOR", "2"))
+# Maximum number of requests waiting for a slot, and per actor. Requests beyond are rejected.
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_MAX_QUEUED_PER_ACTOR = int(os.getenv("ADMISSION_MAX_QUEUED_PER_ACTOR", "4"))
+# Seconds a request waits for a slot before it is rejected
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "120"))
+# Seconds after which a rejected client is asked to retry
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "30"))
+
+admissionWait = meter.create_histogram("admission.wait.duration", unit="ms", description="Time a request waited for a slot")
+admissionQueueDepth = meter.create_up_down_counter("admission.queue.depth", unit="{request}", description="Requests waiting for a slot")
+admissionActive = meter.create_up_down_counter("admission.active", unit="{request}", description="Requests being executed")
+admissionRejections = meter.create_counter("admission.rejections", unit="{request}", description="Requests rejected by admission control")
+
+# Set while a request holds a slot, so that nested admissions of the same request are no-ops
+admitted:ContextVar[bool] = ContextVar("admitted", default=False)
+
+class AdmissionRejected(Exception):
+    """The request wasn't admitted, it can be retried after retryAfter seconds."""
+    def __init__(self, reason:str, retryAfter:int=ADMISSION_RETRY_AFTER):
+        super().__init__(f"The server is busy ({reason}), please retry in {retryAfter} seconds")
+        self.reason = reason
+        self.retryAfter = retryAfter
+
+class Waiter:
+    def __init__(self, actorId:str):
+        self.actorId = actorId
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+class AdmissionController:
+    """Global and per-actor concurrency limits with a bounded FIFO wait queue.
+    A freed slot goes to the longest waiting request whose actor is below its limit.
+    State is guarded by a threading lock, as requests may come from different event loops."""
+
+    def __init__(self, maxConcurrent:int=ADMISSION_MAX_CONCURRENT, maxPerActor:int=ADMISSION_MAX_PER_ACTOR,
+                 maxQueue:int=ADMISSION_MAX_QUEUE, maxQueuedPerActor:int=ADMISSION_MAX_QUEUED_PER_ACTOR,
+                 queueTimeout:float=ADMISSION_QUEUE_TIMEOUT):
+        self.maxConcurrent = maxConcurrent
+        self.maxPerActor = maxPerActor
+        self.maxQueue = maxQueue
+        self.maxQueuedPerActor = maxQueuedPerActor
+        self.queueTimeout = queueTimeout
+        self.lock = threading.Lock()
+        self.active = 0
+        self.activePerActor:dict[str, int] = defaultdict(int)
+        self.queuedPerActor:dict[str, int] = defaultdict(int)
+        self.waiters:deque[Waiter] = deque()
+
+    def canRun(self, actorId:str) -> bool:
+        return self.active < self.maxConcurrent and self.activePerActor[actorId] < self.maxPerActor
+
+    def take(self, actorId:str):
+        self.active += 1
+        self.activePerActor[actorId] += 1
+        admissionActive.add(1)
+
+    def release(self, actorId:str):
+        with self.lock:
+            self.active -= 1
+            self.activePerActor[actorId] -= 1
+            if not self.activePerActor[actorId]:
+                del self.activePerActor[actorId]
+            admissionActive.add(-1)
+            for waiter in list(self.waiters):
+                if self.active >= self.maxConcurrent:
+                    break
+                if self.canRun(waiter.actorId):
+                    self.removeWaiter(waiter)
+                    self.take(waiter.actorId)
+                    waiter.granted = True
+                    waiter.loop.call_soon_threadsafe(self.wake, waiter.future)
+
+    def wake(self, future:asyncio.Future):
+        if not future.done():
+            future.set_result(True)
+
+    def removeWaiter(self, waiter:Waiter):
+        self.waiters.remove(waiter)
+        self.queuedPerActor[waiter.actorId] -= 1
+        if not self.queuedPerActor[waiter.actorId]:
+            del self.queuedPerActor[waiter.actorId]
+        admissionQueueDepth.add(-1)
+
+    def reject(self, reason:str):
+        admissionRejections.add(1, {"reason": reason})
+        raise AdmissionRejected(reason)
+
+    async def acquire(self, actorId:str):
+        startTime = time.perf_counter()
+        with self.lock:
+            if self.canRun(actorId):
+                self.take(actorId)
+                waiter = None
+            elif len(self.waiters) >= self.maxQueue:
+                self.reject("queue full")
+            elif self.queuedPerActor[actorId] >= self.maxQueuedPerActor:
+                self.reject("too many requests of the actor")
+            else:
+                waiter = Waiter(actorId)
+                self.waiters.append(waiter)
+                self.queuedPerActor[actorId] += 1
+                admissionQueueDepth.add(1)
+
+        if waiter:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queueTimeout)
+            except BaseException as e:
+                with self.lock:
+                    granted = waiter.granted
+                    if not granted:
+                        self.removeWaiter(waiter)
+                # The slot may have been granted while the wait timed out or was cancelled
+                if granted:
+                    self.release(actorId)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.reject("queue timeout")
+                raise
+        admissionWait.record(1000 * (time.perf_counter() - startTime))
+
+    @asynccontextmanager
+    async def admit(self, actorId:str):
+        """Holds a slot for the request while the block runs, raises AdmissionRejected when the
+        queue is full or the wait times out."""
+        if admitted.get():
+            yield
+            return
+
+        await self.acquire(actorId)
+        token = admitted.set(True)
+        try:
+            yield
+        finally:
+            admitted.reset(token)
+            self.release(actorId)
+
+    def getStats(self) -> dict:
+        with self.lock:
+            return {"active": self.active, "queued": len(self.waiters)}
+
+admissionController = AdmissionController()
@@ -1,17 +1,20 @@
 from . env import populateEnvWithSecrets
 from .. flow import EmergingTechnologyFlow
 from . memoryUtils import MemoryUtils
+from . admissionUtils import admissionController
 
 async def executeApp(inputs, step_callback = None)->str:
-    response = ""
+    # Requests beyond the concurrency limits wait for a slot, or are rejected when the queue is full
+    async with admissionController.admit(inputs['actorId']):
+        response = ""
 
-    populateEnvWithSecrets()
+        populateEnvWithSecrets()
 
-    # Trigger the emerging technology flow
-    response = await EmergingTechnologyFlow(step_callback).kickoff_async(inputs=inputs)
-    
-    # Save response in memory
-    MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
-        userPrompt=inputs['prompt'], assistantResponse=response)
-            
-    return response
\ No newline at end of file
+        # Trigger the emerging technology flow
+        response = await EmergingTechnologyFlow(step_callback).kickoff_async(inputs=inputs)
+
+        # Save response in memory
+        MemoryUtils(sessionId=inputs['sessionId'], actorId=inputs['actorId']).saveMemory(
+            userPrompt=inputs['prompt'], assistantResponse=response)
+
+        return response
\ No newline at end of file
@@ -1,16 +1,62 @@
-import itertools
 import json
+import logging
 import os
+import threading
 from typing import List
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from bedrock_agentcore.memory import MemoryClient
+from .historyUtils import SUMMARY_ROLE, SUMMARY_SESSION_SUFFIX, assembleHistory, getResponseKey, summarizeResponse
+from .memoryWriter import MemoryWriter
+from .preferenceCache import buildProfile, mayUpdatePreferences, preferenceCache
+
+logger = logging.getLogger(__name__)
+
+# Connection pool size of the shared AgentCore data plane client
+MEMORY_MAX_POOL_CONNECTIONS = int(os.getenv("MEMORY_MAX_POOL_CONNECTIONS", "25"))
+# Events are written in the background instead of on the response path
+MEMORY_WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "TRUE") == "TRUE"
+
+memoryClients = {}
+memoryClientsLock = threading.Lock()
+
+def getMemoryClient(memoryId:str=None) -> MemoryClient:
+    """Returns the process-wide MemoryClient for the current region and memory ID.
+    boto3 clients are thread-safe, so one client and its connection pool serve every MemoryUtils call."""
+    region = os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION"))
+    key = (region, memoryId or os.getenv("MEMORY_ID"))
+    client = memoryClients.get(key)
+    if client:
+        return client
+
+    with memoryClientsLock:
+        if key not in memoryClients:
+            client = MemoryClient(region_name=region)
+            # The data plane client serves every event and retrieval call, so it gets a larger
+            # connection pool with TCP keep-alive on top of the configuration set by MemoryClient
+            if hasattr(client, "gmdp_client"):
+                tunedConfig = client.gmdp_client.meta.config.merge(Config(
+                    max_pool_connections=MEMORY_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True))
+                client.gmdp_client = boto3.client(
+                    "bedrock-agentcore",
+                    region_name=client.gmdp_client.meta.region_name,
+                    config=tunedConfig)
+            memoryClients[key] = client
+        return memoryClients[key]
+
+memoryWriter = MemoryWriter(lambda memoryId: getMemoryClient(memoryId))
 
 class MemoryUtils:
     sessionId:str = None
     actorId:str = None
+    memoryClient:MemoryClient = None
 
-    def __init__(self, sessionId:str, actorId:str):
+    def __init__(self, sessionId:str, actorId:str, memoryClient:MemoryClient=None):
         self.sessionId = sessionId
         self.actorId = actorId
+        self.memoryClient = memoryClient or getMemoryClient()
 
     def saveMemory(self, userPrompt:str, assistantResponse:str):
         userPrompt = userPrompt[:9000]
@@ -21,13 +67,35 @@ class MemoryUtils:
             [assistantResponse, "ASSISTANT"]
         ]
 
-        params = {
+        events = [{
             "memory_id": os.getenv("MEMORY_ID"),
             "actor_id": self.actorId,
             "session_id": self.sessionId,
             "messages": payload
-        }
-        MemoryClient().create_event(**params)
+        }]
+        # The summary replaces the response once the turn is no longer among the most recent ones.
+        # It's saved in a session of its own, so that it never comes back as a conversation turn.
+        summary = summarizeResponse(assistantResponse)
+        if summary:
+            events.append({
+                "memory_id": os.getenv("MEMORY_ID"),
+                "actor_id": self.actorId,
+                "session_id": self.getSummarySessionId(),
+                "messages": [[json.dumps({"response": getResponseKey(assistantResponse), "summary": summary}), SUMMARY_ROLE]]
+            })
+        for params in events:
+            if MEMORY_WRITE_BEHIND:
+                memoryWriter.submit(self.memoryClient, params)
+            else:
+                self.memoryClient.create_event(**params)
+        if mayUpdatePreferences(userPrompt):
+            preferenceCache.invalidate(self.getPreferenceKey())
+
+    def getSummarySessionId(self) -> str:
+        return self.sessionId + SUMMARY_SESSION_SUFFIX
+
+    def getPreferenceKey(self) -> tuple:
+        return (os.getenv("MEMORY_ID"), os.getenv("MEMORY_STRATEGY_ID"), self.actorId)
 
     def loadShortTermMemory(self, count:int=10) -> str:
         params = {
@@ -36,14 +104,44 @@ class MemoryUtils:
             "session_id": self.sessionId,
             "k": count
         }
-        turns = MemoryClient().get_last_k_turns(**params)
-        flattened_list = list(itertools.chain.from_iterable(turns))
-        response = ""
-        for item in flattened_list:
-            response += item['role'] + ": " + item['content']['text'] + "\n"
-        return response
+        # Taken before reading the memory, so that no event is missed while it's being written
+        pendingTurns = memoryWriter.getPendingTurns(self.actorId, self.sessionId)
+        turns = self.memoryClient.get_last_k_turns(**params)
+        # Pending events written in the meantime are already among the latest turns
+        pendingTurns = [turn for turn in pendingTurns if turn not in turns[:len(pendingTurns)]]
+        return assembleHistory((pendingTurns + turns)[:count], self.loadSummaries(count))
+
+    def loadSummaries(self, count:int) -> dict[str, str]:
+        # Summaries of the latest responses by the key of the response. A missing summary is
+        # computed from the response again, so failing to load them isn't an error.
+        sessionId = self.getSummarySessionId()
+        messages = [message for turn in memoryWriter.getPendingTurns(self.actorId, sessionId) for message in turn]
+        try:
+            events = self.memoryClient.list_events(
+                memory_id=os.getenv("MEMORY_ID"),
+                actor_id=self.actorId,
+                session_id=sessionId,
+                max_results=count)
+            messages += [item['conversational'] for event in events
+                         for item in event.get('payload', []) if 'conversational' in item]
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to load the summaries of the session: {e}")
+
+        summaries = {}
+        for message in messages:
+            try:
+                content = json.loads(message['content']['text'])
+                summaries[content['response']] = content['summary']
+            except (ValueError, KeyError, TypeError):
+                continue
+        return summaries
 
     def extractUserPreferences(self) -> str:
+        # Preferences change rarely, so the profile is only searched for again once it expires
+        profile = preferenceCache.get(self.getPreferenceKey())
+        if profile is not None:
+            return profile
+
         namespace = "/strategies/{memoryStrategyId}/actors/{actorId}".format(memoryStrategyId=os.getenv("MEMORY_STRATEGY_ID"), actorId=self.actorId)
         params = {
             "memory_id": os.getenv("MEMORY_ID"),
@@ -51,7 +149,7 @@ class MemoryUtils:
             "namespace": namespace,
             "query": "report style expected by the user"
         }
-        memory_records = MemoryClient().retrieve_memories(**params)
+        memory_records = self.memoryClient.retrieve_memories(**params)
 
         preferences:List[str] = []
         for item in memory_records:
@@ -61,7 +159,8 @@ class MemoryUtils:
                     preferences.append(contentJSON['preference'])
                 except Exception as e:
                     print (f"An error occurred while reading the memory JSON: {e}")
-        response = ". ".join(preferences)
+        response = buildProfile(preferences)
+        preferenceCache.put(self.getPreferenceKey(), response)
         return response
         
 
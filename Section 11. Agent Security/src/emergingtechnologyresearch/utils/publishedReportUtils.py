@@ -1,48 +1,168 @@
+import atexit
+import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, PyMongoError
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of pooled connections of the shared MongoDB client
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "20"))
+# Maximum number of reports written by one insert_many call
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "50"))
+# Seconds the background writer waits for more reports before writing a partial batch
+PUBLISH_BATCH_WAIT = float(os.getenv("PUBLISH_BATCH_WAIT", "0.5"))
+# Number of times a failed batch is retried before it is dropped
+PUBLISH_MAX_RETRIES = int(os.getenv("PUBLISH_MAX_RETRIES", "3"))
+# Seconds allowed for writing the queued reports at shutdown
+PUBLISH_SHUTDOWN_TIMEOUT = float(os.getenv("PUBLISH_SHUTDOWN_TIMEOUT", "10"))
+
+mongoClient:MongoClient = None
+mongoClientLock = threading.Lock()
+
+def getMongoClient() -> MongoClient:
+    """Returns the process-wide MongoDB client. MongoClient is thread-safe and keeps its own
+    connection pool, so it is created once. It connects lazily, creating it does no I/O."""
+    global mongoClient
+    if mongoClient:
+        return mongoClient
+
+    with mongoClientLock:
+        if not mongoClient:
+            mongoClient = MongoClient(os.getenv("MONGODB_URL"), maxPoolSize=MONGODB_MAX_POOL_SIZE)
+        return mongoClient
+
+def createIndexes():
+    # Called during the warm-up, a failure only slows down the queries below
+    try:
+        getCollection(getMongoClient()).create_index([("actor_id", ASCENDING), ("created_at", DESCENDING)])
+    except PyMongoError as e:
+        logger.warning(f"Failed to create the indexes of the published reports: {e}")
+
+def getCollection(client:MongoClient):
+    # Get database name from environment variable or use default
+    database_name = os.getenv("MONGODB_DATABASE", "default")
+    return client[database_name]["published_reports"]
+
+class ReportPublisher:
+    """Write-behind queue for published reports.
+    A background worker batches queued reports into insert_many calls, retrying failed writes.
+    Reports stay visible through getPending until they are written. Once the publisher is
+    flushed at shutdown, reports are written synchronously instead."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending:list[dict] = []
+        self.worker = None
+        self.stopped = threading.Event()
+
+    def enqueue(self, document:dict):
+        with self.lock:
+            # Checked under the lock, so that no report is queued once the worker may have exited
+            if not self.stopped.is_set():
+                self.pending.append(document)
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self.run, name="ReportPublisher", daemon=True)
+                    self.worker.start()
+                self.queue.put(document)
+                return
+        logger.warning("Report publisher is shut down, the report is written synchronously")
+        self.insertBatch([document])
+
+    def getPending(self, actor_id:str) -> list[dict]:
+        with self.lock:
+            return [document for document in self.pending if document["actor_id"] == actor_id]
+
+    def run(self):
+        while not (self.stopped.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=PUBLISH_BATCH_WAIT)]
+            except queue.Empty:
+                continue
+            # Drain whatever else is queued, up to the batch size
+            while len(batch) < PUBLISH_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.insertBatch(batch)
+            except Exception as e:
+                logger.error(f"Dropped {len(batch)} reports due to an unexpected error: {e}")
+            finally:
+                written = {id(document) for document in batch}
+                with self.lock:
+                    self.pending = [document for document in self.pending if id(document) not in written]
+                for _ in batch:
+                    self.queue.task_done()
+
+    def insertBatch(self, documents:list[dict]):
+        for attempt in range(PUBLISH_MAX_RETRIES + 1):
+            try:
+                getCollection(getMongoClient()).insert_many(documents, ordered=False)
+                return
+            except BulkWriteError as e:
+                # Duplicate keys belong to documents already written by an earlier attempt
+                failed = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != 11000}
+                documents = [document for i, document in enumerate(documents) if i in failed]
+                if not documents:
+                    return
+                logger.warning(f"Failed to publish {len(documents)} reports (attempt {attempt + 1}): {e}")
+            except PyMongoError as e:
+                logger.warning(f"Failed to publish {len(documents)} reports (attempt {attempt + 1}): {e}")
+            if attempt < PUBLISH_MAX_RETRIES:
+                time.sleep(min(0.5 * 2 ** attempt, 10))
+        logger.error(f"Dropped {len(documents)} reports after {PUBLISH_MAX_RETRIES} retries")
+
+    def flush(self, timeout:float=PUBLISH_SHUTDOWN_TIMEOUT):
+        with self.lock:
+            self.stopped.set()
+        if self.worker:
+            self.worker.join(timeout)
+        if not self.queue.empty():
+            logger.error(f"{self.queue.qsize()} reports were not published before shutdown")
+
+reportPublisher = ReportPublisher()
+atexit.register(reportPublisher.flush)
 
 class PublishedReportUtils:
     def _get_mongodb_client(self) -> MongoClient:
-        """Creates and returns a MongoDB client based on environment variables."""
-        mongodb_url = os.getenv("MONGODB_URL")
-        
-        return MongoClient(mongodb_url)
+        """Returns the shared MongoDB client based on environment variables."""
+        return getMongoClient()
+
+    def _create_document(self, actor_id:str, report_topic:str, report_contents:str,
+                         report_style:str=None, report_data:dict=None) -> dict:
+        document = {
+            "actor_id": actor_id,
+            "report_topic": report_topic,
+            "report_contents": report_contents,
+            "created_at": datetime.utcnow(),
+        }
+        # The structured report lets the report cache serve it again without research
+        if report_data is not None:
+            document["report_style"] = report_style or ""
+            document["report_data"] = report_data
+        return document
 
     def publishReport(self, actor_id:str, report_topic:str, report_contents:str) -> str:
         if not actor_id or not report_topic or not report_contents:
             return "Error: actor_id, report_topic, and report_contents are all required."
 
         try:
-            # Get MongoDB client
-            client = self._get_mongodb_client()
-            
-            # Get database name from environment variable or use default
-            database_name = os.getenv("MONGODB_DATABASE", "default")
-            db = client[database_name]
-            
             # Get collection
-            collection = db["published_reports"]
-            
-            # Create document
-            document = {
-                "actor_id": actor_id,
-                "report_topic": report_topic,
-                "report_contents": report_contents,
-                "created_at": datetime.utcnow(),
-            }
-            
+            collection = getCollection(self._get_mongodb_client())
+
             # Insert document
-            result = collection.insert_one(document)
-            
-            # Close connection
-            client.close()
-            
+            result = collection.insert_one(self._create_document(actor_id, report_topic, report_contents))
+
             return f"Successfully stored report. Document ID: {result.inserted_id}"
-            
+
         except ConnectionFailure as e:
             return f"Error: Failed to connect to MongoDB. {str(e)}"
         except PyMongoError as e:
@@ -50,37 +170,42 @@ class PublishedReportUtils:
         except Exception as e:
             return f"Error: An unexpected error occurred. {str(e)}"
 
+    def queueReport(self, actor_id:str, report_topic:str, report_contents:str,
+                    report_style:str=None, report_data:dict=None) -> str:
+        # Returns immediately, the report is written behind by the background publisher
+        if not actor_id or not report_topic or not report_contents:
+            return "Error: actor_id, report_topic, and report_contents are all required."
+
+        reportPublisher.enqueue(self._create_document(actor_id, report_topic, report_contents,
+                                                      report_style, report_data))
+        return "Successfully queued report for publishing."
+
     def getReportTopics(self, actor_id:str) -> list[str]:
         if not actor_id:
             return []
 
         try:
-            # Get MongoDB client
-            client = self._get_mongodb_client()
-            
-            # Get database name from environment variable or use default
-            database_name = os.getenv("MONGODB_DATABASE", "default")
-            db = client[database_name]
-            
+            # Reports still waiting in the write-behind queue are the most recent ones
+            pending = reportPublisher.getPending(actor_id)
+            pendingIds = {document["_id"] for document in pending if "_id" in document}
+            result_list = [document["report_topic"] for document in reversed(pending)]
+
             # Get collection
-            collection = db["published_reports"]
-            
+            collection = getCollection(self._get_mongodb_client())
+
             # Query last 10 documents filtered by actor_id, sorted by created_at descending
             documents = collection.find(
-                {"actor_id": actor_id}
+                {"actor_id": actor_id},
+                {"report_topic": 1}
             ).sort("created_at", -1).limit(10)
-            
-            print (documents)
+
             # Convert documents to list
-            result_list = []
             for doc in documents:
-                result_list.append(doc["report_topic"])
-            
-            # Close connection
-            client.close()
-            
-            return result_list
-            
+                if doc["_id"] not in pendingIds:
+                    result_list.append(doc["report_topic"])
+
+            return result_list[:10]
+
         except ConnectionFailure as e:
             return []
         except PyMongoError as e:
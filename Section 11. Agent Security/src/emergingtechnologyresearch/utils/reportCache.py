@@ -0,0 +1,185 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from .metricsUtils import meter
+from .publishedReportUtils import getCollection, getMongoClient
+
+logger = logging.getLogger(__name__)
+
+# Minimum cosine similarity of both topic and style for a cached report to be reused
+REPORT_CACHE_THRESHOLD = float(os.getenv("REPORT_CACHE_THRESHOLD", "0.8"))
+# Seconds for which a report is served from the cache
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "86400"))
+# Maximum number of reports kept in the cache
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "500"))
+
+reportCacheHits = meter.create_counter("report.cache.hits", unit="{request}", description="Research requests served from the report cache")
+reportCacheMisses = meter.create_counter("report.cache.misses", unit="{request}", description="Research requests without a similar cached report")
+reportCacheBypasses = meter.create_counter("report.cache.bypasses", unit="{request}", description="Research requests which skipped the report cache")
+
+# Words which carry no meaning for the topic of a report
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is",
+    "it", "its", "of", "on", "or", "the", "to", "with", "about", "over", "report",
+    "research", "latest", "recent", "emerging", "technology", "technologies", "impact",
+    "impacts", "role", "use", "uses", "trends", "developments", "future"
+}
+
+def tokenize(text:str) -> list[str]:
+    # Lower case, punctuation and stop words removed, and plurals reduced to a common stem
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def cosine(first:dict, second:dict) -> float:
+    if not first and not second:
+        return 1.0
+    dot = sum(weight * second.get(token, 0.0) for token, weight in first.items())
+    norm = math.sqrt(sum(w * w for w in first.values())) * math.sqrt(sum(w * w for w in second.values()))
+    return dot / norm if norm else 0.0
+
+class CachedReport:
+    def __init__(self, topic:str, style:str, report:dict, createdAt:float):
+        self.topic = topic
+        self.style = style
+        self.report = report
+        self.createdAt = createdAt
+        self.topicTerms = Counter(tokenize(topic))
+        self.styleTerms = Counter(tokenize(style))
+
+class ReportCache:
+    """Semantic cache of research reports keyed on the topic and style of the prompt intent.
+    Topics are compared as TF-IDF vectors, so rephrasings of the same topic hit the same report.
+    The cache is seeded from the published reports still within the TTL during the warm-up,
+    or on first use if it was enabled later. The lock is never held while MongoDB is queried."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries:OrderedDict[tuple, CachedReport] = OrderedDict()
+        self.documentFrequency = Counter()
+        self.seeded = False
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def isEnabled(self) -> bool:
+        return os.getenv("REPORT_CACHE") == "TRUE"
+
+    def getKey(self, topic:str, style:str) -> tuple:
+        return (" ".join(sorted(set(tokenize(topic)))), " ".join(sorted(set(tokenize(style)))))
+
+    def weigh(self, terms:Counter) -> dict:
+        # Smoothed inverse document frequency over the topics in the cache
+        count = len(self.entries)
+        return {token: frequency * (math.log((1 + count) / (1 + self.documentFrequency[token])) + 1)
+                for token, frequency in terms.items()}
+
+    def add(self, entry:CachedReport):
+        key = self.getKey(entry.topic, entry.style)
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = entry
+        self.documentFrequency.update(set(entry.topicTerms))
+        while len(self.entries) > REPORT_CACHE_SIZE:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key:tuple):
+        entry = self.entries.pop(key)
+        self.documentFrequency.subtract(set(entry.topicTerms))
+
+    def seed(self):
+        # Only published reports stored along with their structured report can be reused
+        with self.lock:
+            if self.seeded:
+                return
+            self.seeded = True
+        published = []
+        try:
+            documents = getCollection(getMongoClient()).find(
+                {"report_data": {"$exists": True},
+                 "created_at": {"$gte": datetime.utcnow() - timedelta(seconds=REPORT_CACHE_TTL)}},
+                {"report_topic": 1, "report_style": 1, "report_data": 1, "created_at": 1}
+            ).sort("created_at", 1).limit(REPORT_CACHE_SIZE)
+            for document in documents:
+                age = (datetime.utcnow() - document["created_at"]).total_seconds()
+                published.append(CachedReport(document["report_topic"], document.get("report_style", ""),
+                                              document["report_data"], time.time() - age))
+        except PyMongoError as e:
+            logger.warning(f"Failed to seed the report cache from the published reports: {e}")
+        with self.lock:
+            # Reports stored while the published ones were loaded are newer, so they go last
+            stored = list(self.entries.values())
+            self.entries.clear()
+            self.documentFrequency.clear()
+            for entry in published + stored:
+                self.add(entry)
+        logger.info(f"Seeded the report cache with {len(published)} published reports")
+
+    def lookup(self, topic:str, style:str) -> dict:
+        """Returns the most similar fresh report, or None. No LLM is involved in the lookup,
+        but the first one may query MongoDB, so async code calls it from a worker thread."""
+        if not self.seeded:
+            self.seed()
+        with self.lock:
+            now = time.time()
+            for key in [key for key, entry in self.entries.items() if now - entry.createdAt > REPORT_CACHE_TTL]:
+                self.remove(key)
+
+            topicVector = self.weigh(Counter(tokenize(topic)))
+            styleVector = Counter(tokenize(style))
+            best, bestScore = None, 0.0
+            for entry in self.entries.values():
+                # Style is compared on plain term frequencies, it is not what tells reports apart
+                if cosine(styleVector, entry.styleTerms) < REPORT_CACHE_THRESHOLD:
+                    continue
+                score = cosine(topicVector, self.weigh(entry.topicTerms))
+                if score > bestScore:
+                    best, bestScore = entry, score
+
+            if best is None or bestScore < REPORT_CACHE_THRESHOLD:
+                self.misses += 1
+                reportCacheMisses.add(1)
+                logger.info(f"Report cache miss for '{topic}' (best score {bestScore:.2f})")
+                return None
+            self.hits += 1
+            reportCacheHits.add(1)
+            self.entries.move_to_end(self.getKey(best.topic, best.style))
+            logger.info(f"Report cache hit for '{topic}' on '{best.topic}' (score {bestScore:.2f})")
+            return best.report
+
+    def store(self, topic:str, style:str, report:dict):
+        with self.lock:
+            self.add(CachedReport(topic, style, report, time.time()))
+
+    def recordBypass(self):
+        with self.lock:
+            self.bypassed += 1
+        reportCacheBypasses.add(1)
+
+    def getStats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+reportCache = ReportCache()
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from emergingtechnologyresearch.crews.researchCrew import ResearchPointsCrew
+from emergingtechnologyresearch.utils import crewFactory as crewFactoryModule
+from emergingtechnologyresearch.utils import mcpUtils
+from emergingtechnologyresearch.utils.crewFactory import CrewFactory, kickoffCrews
+
+def testTemplateIsBuiltOncePerEnvironment(offlineCrews, monkeypatch):
+    factory = CrewFactory()
+    template = factory.getTemplate(ResearchPointsCrew)
+    assert factory.getTemplate(ResearchPointsCrew) is template
+
+    # A changed API key means different LLMs, so a new template
+    monkeypatch.setenv("OPENAI_API_KEY", "otherTest")
+    assert factory.getTemplate(ResearchPointsCrew) is not template
+
+def testTemplateHandsItsMcpSessionBack(offlineCrews, monkeypatch):
+    released = []
+    monkeypatch.setattr(mcpUtils.McpUtils, "releaseSession", lambda self, session: released.append(session))
+    CrewFactory().getTemplate(ResearchPointsCrew)
+    assert len(released) == 1
+
+def testBuiltCrewsAreCopiesWithTheirOwnCallbacks(offlineCrews):
+    factory = CrewFactory()
+    firstCallback, secondCallback = (lambda step: None), (lambda step: None)
+    first = factory.buildCrew(ResearchPointsCrew, firstCallback)
+    second = factory.buildCrew(ResearchPointsCrew, secondCallback)
+    template = factory.getTemplate(ResearchPointsCrew).crew
+
+    assert first is not second
+    assert first.step_callback is firstCallback and second.step_callback is secondCallback
+    assert template.step_callback is None
+    assert first.agents[0] is not second.agents[0]
+    assert first.agents[0].llm.call.isTimed
+
+def testKickoffCrewsKeepsOrderAndLimit(monkeypatch):
+    running = 0
+    maxRunning = 0
+    handedOn = []
+
+    async def kickoffCrew(crewClass, inputs, stepCallback=None):
+        nonlocal running, maxRunning
+        running += 1
+        maxRunning = max(maxRunning, running)
+        # Later crews finish first
+        await asyncio.sleep(0.01 * (4 - inputs["index"]))
+        running -= 1
+        return inputs["index"]
+    monkeypatch.setattr(crewFactoryModule, "kickoffCrew", kickoffCrew)
+
+    kickoffs = [(ResearchPointsCrew, {"index": index}) for index in range(4)]
+    outputs = asyncio.run(kickoffCrews(kickoffs, limit=2, onOutput=lambda index, output: handedOn.append((index, output))))
+
+    assert outputs == [0, 1, 2, 3]
+    assert handedOn == [(0, 0), (1, 1), (2, 2), (3, 3)]
+    assert maxRunning == 2
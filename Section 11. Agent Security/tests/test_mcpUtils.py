@@ -0,0 +1,102 @@
+import gc
+import threading
+
+import pytest
+
+pytest.importorskip("crewai_tools")
+
+from emergingtechnologyresearch.utils import mcpUtils
+from emergingtechnologyresearch.utils.mcpUtils import McpSessionPool, McpToolsMixin, McpUtils
+
+class FakeSession:
+    """Stands in for an MCP session, without connecting to a gateway."""
+    opened = 0
+
+    def __init__(self, gatewayUrl:str, bearerToken:str):
+        FakeSession.opened += 1
+        self.gatewayUrl = gatewayUrl
+        self.bearerToken = bearerToken
+        self.tools = [object()]
+        self.leased = False
+        self.finalizer = None
+        self.closed = False
+
+    def isHealthy(self, bearerToken:str) -> bool:
+        return self.bearerToken == bearerToken
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def fakeSessions(monkeypatch):
+    FakeSession.opened = 0
+    monkeypatch.setattr(mcpUtils, "McpSession", FakeSession)
+    monkeypatch.setattr(mcpUtils, "MCP_POOL_TIMEOUT", 0.2)
+    monkeypatch.setattr(mcpUtils.tokenCache, "getToken", lambda: "token")
+    monkeypatch.setenv("MCP_GATEWAY_URL", "http://gateway")
+    monkeypatch.setattr(mcpUtils, "sessionPools", {})
+
+def testReleasedSessionIsReused():
+    pool = McpSessionPool("http://gateway", maxSize=2)
+    session = pool.acquire("token")
+    pool.release(session)
+
+    assert pool.acquire("token") is session
+    assert FakeSession.opened == 1
+    stats = pool.getStats()
+    assert stats["acquired"] == 2
+    assert stats["hitRate"] == 0.5
+
+def testExhaustedPoolTimesOut():
+    pool = McpSessionPool("http://gateway", maxSize=1)
+    pool.acquire("token")
+
+    with pytest.raises(TimeoutError):
+        pool.acquire("token")
+
+def testWaitingAcquireGetsReleasedSession():
+    pool = McpSessionPool("http://gateway", maxSize=1)
+    session = pool.acquire("token")
+    threading.Timer(0.05, pool.release, [session]).start()
+
+    assert pool.acquire("token") is session
+
+def testSessionOfExpiredTokenIsReplaced():
+    pool = McpSessionPool("http://gateway", maxSize=1)
+    session = pool.acquire("token")
+    pool.release(session)
+
+    replacement = pool.acquire("newToken")
+    assert replacement is not session
+    assert session.closed
+    assert pool.getStats()["size"] == 1
+
+def testReleaseAfterCloseDiscardsSession():
+    pool = McpSessionPool("http://gateway", maxSize=1)
+    session = pool.acquire("token")
+    pool.close()
+    pool.release(session)
+
+    assert session.closed
+    assert pool.getStats()["size"] == 0
+
+def testSessionOfCollectedOwnerGoesBackToPool():
+    class Owner:
+        pass
+    owner = Owner()
+    session = McpUtils().acquireSession(owner=owner)
+    del owner
+    gc.collect()
+
+    assert McpUtils().getPoolStats()[0]["idle"] == 1
+    assert McpUtils().acquireSession() is session
+
+def testMixinLeasesOneSessionPerCrew():
+    crew = McpToolsMixin()
+    tools = crew.getTools()
+
+    assert crew.getTools() is tools
+    assert McpUtils().getPoolStats()[0]["leased"] == 1
+    assert crew.releaseTools("output") == "output"
+    assert crew.mcpSession is None
+    assert McpUtils().getPoolStats()[0]["idle"] == 1
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import PyMongoError
+
+from emergingtechnologyresearch.utils import reportCache as reportCacheModule
+from emergingtechnologyresearch.utils.reportCache import ReportCache
+
+class FakeCursor(list):
+    def sort(self, *args):
+        return self
+
+    def limit(self, count:int):
+        return self
+
+class FakeCollection:
+    """Stands in for the published reports collection, with the documents found by any query."""
+    def __init__(self, documents:list[dict]=None, error:Exception=None):
+        self.documents = documents or []
+        self.error = error
+
+    def find(self, *args):
+        if self.error:
+            raise self.error
+        return FakeCursor(self.documents)
+
+def useCollection(monkeypatch, collection:FakeCollection):
+    monkeypatch.setattr(reportCacheModule, "getMongoClient", lambda: None)
+    monkeypatch.setattr(reportCacheModule, "getCollection", lambda client: collection)
+
+@pytest.fixture
+def cache(monkeypatch) -> ReportCache:
+    useCollection(monkeypatch, FakeCollection())
+    cache = ReportCache()
+    cache.store("Quantum computing in drug discovery", "technical", {"title": "Quantum"})
+    cache.store("Solid state batteries for electric cars", "technical", {"title": "Batteries"})
+    return cache
+
+def testRephrasedTopicHits(cache):
+    assert cache.lookup("Latest research on quantum computing for drug discovery", "technical") == {"title": "Quantum"}
+    assert cache.getStats()["hits"] == 1
+
+def testOtherTopicOrStyleMisses(cache):
+    assert cache.lookup("Quantum computing in finance", "technical") is None
+    assert cache.lookup("Quantum computing in drug discovery", "casual overview") is None
+    stats = cache.getStats()
+    assert stats["misses"] == 2
+    assert stats["hitRate"] == 0.0
+
+def testExpiredReportIsDropped(cache, monkeypatch):
+    expiry = time.time() + reportCacheModule.REPORT_CACHE_TTL + 1
+    monkeypatch.setattr(time, "time", lambda: expiry)
+    assert cache.lookup("Quantum computing in drug discovery", "technical") is None
+    assert cache.getStats()["size"] == 0
+
+def testSeedKeepsReportsStoredBeforeIt(monkeypatch):
+    useCollection(monkeypatch, FakeCollection([{
+        "report_topic": "Gene editing in agriculture", "report_style": "technical",
+        "report_data": {"title": "Crops"}, "created_at": datetime.utcnow() - timedelta(hours=1)
+    }]))
+    cache = ReportCache()
+    cache.store("Quantum computing in drug discovery", "technical", {"title": "Quantum"})
+    cache.seed()
+
+    assert cache.getStats()["size"] == 2
+    assert cache.lookup("Gene editing for agriculture", "technical") == {"title": "Crops"}
+    assert cache.lookup("Quantum computing in drug discovery", "technical") == {"title": "Quantum"}
+
+def testSeedFailureLeavesCacheUsable(monkeypatch):
+    useCollection(monkeypatch, FakeCollection(error=PyMongoError("unreachable")))
+    cache = ReportCache()
+    cache.seed()
+    cache.store("Quantum computing in drug discovery", "technical", {"title": "Quantum"})
+
+    assert cache.seeded
+    assert cache.lookup("Quantum computing in drug discovery", "technical") == {"title": "Quantum"}
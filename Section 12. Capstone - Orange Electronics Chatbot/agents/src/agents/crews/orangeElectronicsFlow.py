@@ -79,7 +79,8 @@ class OrangeElectronicsFlow(Flow[OrangeElectronicsFlowState]):
 
     @listen("DeviceRegistration")
     def deviceRegistration(self):
-        self.state.response = self.runCrew(crewName="device_registration", tools=McpUtils().getTools()).raw
+        with McpUtils().session() as mcpSession:
+            self.state.response = self.runCrew(crewName="device_registration", tools=mcpSession.tools).raw
 
     @listen("ProductInformation")
     def productInformation(self):
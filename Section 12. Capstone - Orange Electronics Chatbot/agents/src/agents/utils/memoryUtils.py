@@ -1,14 +1,55 @@
 import itertools
 import os
+import threading
+import boto3
+from botocore.config import Config
 from bedrock_agentcore.memory import MemoryClient
+from .memoryWriter import MemoryWriter
+
+# Connection pool size of the shared AgentCore data plane client
+MEMORY_MAX_POOL_CONNECTIONS = int(os.getenv("MEMORY_MAX_POOL_CONNECTIONS", "25"))
+# Events are written in the background instead of on the response path
+MEMORY_WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "TRUE") == "TRUE"
+
+memoryClients = {}
+memoryClientsLock = threading.Lock()
+
+def getMemoryClient(memoryId:str=None) -> MemoryClient:
+    """Returns the process-wide MemoryClient for the current region and memory ID.
+    boto3 clients are thread-safe, so one client and its connection pool serve every MemoryUtils call."""
+    region = os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION"))
+    key = (region, memoryId or os.getenv("MEMORY_ID"))
+    client = memoryClients.get(key)
+    if client:
+        return client
+
+    with memoryClientsLock:
+        if key not in memoryClients:
+            client = MemoryClient(region_name=region)
+            # The data plane client serves every event and retrieval call, so it gets a larger
+            # connection pool with TCP keep-alive on top of the configuration set by MemoryClient
+            if hasattr(client, "gmdp_client"):
+                tunedConfig = client.gmdp_client.meta.config.merge(Config(
+                    max_pool_connections=MEMORY_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True))
+                client.gmdp_client = boto3.client(
+                    "bedrock-agentcore",
+                    region_name=client.gmdp_client.meta.region_name,
+                    config=tunedConfig)
+            memoryClients[key] = client
+        return memoryClients[key]
+
+memoryWriter = MemoryWriter(lambda memoryId: getMemoryClient(memoryId))
 
 class MemoryUtils:
     sessionId:str = None
     customerId:str = None
+    memoryClient:MemoryClient = None
 
-    def __init__(self, sessionId:str, customerId:str):
+    def __init__(self, sessionId:str, customerId:str, memoryClient:MemoryClient=None):
         self.sessionId = sessionId
         self.customerId = customerId
+        self.memoryClient = memoryClient or getMemoryClient()
 
     def saveMemory(self, userPrompt:str, assistantResponse:str):
         userPrompt = userPrompt[:9000]
@@ -25,7 +66,10 @@ class MemoryUtils:
             "session_id": self.sessionId,
             "messages": payload
         }
-        MemoryClient().create_event(**params)
+        if MEMORY_WRITE_BEHIND:
+            memoryWriter.submit(self.memoryClient, params)
+        else:
+            self.memoryClient.create_event(**params)
 
     def loadShortTermMemory(self, count:int=10) -> str:
         params = {
@@ -34,7 +78,12 @@ class MemoryUtils:
             "session_id": self.sessionId,
             "k": count
         }
-        turns = MemoryClient().get_last_k_turns(**params)
+        # Taken before reading the memory, so that no event is missed while it's being written
+        pendingTurns = memoryWriter.getPendingTurns(self.customerId, self.sessionId)
+        turns = self.memoryClient.get_last_k_turns(**params)
+        # Pending events written in the meantime are already among the latest turns
+        pendingTurns = [turn for turn in pendingTurns if turn not in turns[:len(pendingTurns)]]
+        turns = (pendingTurns + turns)[:count]
         flattened_list = list(itertools.chain.from_iterable(turns))
         response = ""
         for item in flattened_list:
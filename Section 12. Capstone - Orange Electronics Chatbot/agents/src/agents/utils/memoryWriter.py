@@ -0,0 +1,175 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Threads writing events, the events of a session are always written in order by one of them
+MEMORY_WRITER_THREADS = int(os.getenv("MEMORY_WRITER_THREADS", "4"))
+# Attempts of an event before it's given up and spilled to disk
+MEMORY_WRITE_ATTEMPTS = int(os.getenv("MEMORY_WRITE_ATTEMPTS", "5"))
+# Delay in seconds before the first retry, doubled on every further retry
+MEMORY_WRITE_BACKOFF = float(os.getenv("MEMORY_WRITE_BACKOFF", "0.5"))
+# Seconds the pending events are given to be written on shutdown
+MEMORY_WRITER_FLUSH_TIMEOUT = float(os.getenv("MEMORY_WRITER_FLUSH_TIMEOUT", "10"))
+# Directory relative spill paths are resolved against, the one containing the package by default,
+# so that the next start finds the spilled events whatever its working directory is
+MEMORY_WRITER_SPILL_DIR = os.getenv("MEMORY_WRITER_SPILL_DIR",
+                                    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# File the events which couldn't be written are kept in, they are written again on the next start
+MEMORY_WRITER_SPILL_PATH = os.path.join(os.path.abspath(MEMORY_WRITER_SPILL_DIR),
+                                        os.getenv("MEMORY_WRITER_SPILL_PATH", "pendingMemoryEvents.jsonl"))
+
+class MemoryWriter:
+    """Writes the events of the short-term memory in the background, so that the AgentCore
+    latency isn't added to the response. Events are kept in a queue per session until they are
+    written, which keeps them in order and lets the session read its own pending events."""
+
+    def __init__(self, clientFactory, threads:int=MEMORY_WRITER_THREADS, attempts:int=MEMORY_WRITE_ATTEMPTS,
+                 backoff:float=MEMORY_WRITE_BACKOFF, spillPath:str=MEMORY_WRITER_SPILL_PATH):
+        self.clientFactory = clientFactory
+        self.threads = threads
+        self.attempts = attempts
+        self.backoff = backoff
+        self.spillPath = spillPath
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        # Pending events per (actor, session), the first one is being written
+        self.sessions:dict[tuple[str, str], deque] = {}
+        self.writing:set[tuple[str, str]] = set()
+        self.ready = queue.Queue()
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        for index in range(self.threads):
+            threading.Thread(target=self.run, name=f"memoryWriter-{index}", daemon=True).start()
+        atexit.register(self.close)
+        for client, params in self.loadSpilled():
+            self.submit(client, params)
+
+    def submit(self, client, params:dict):
+        """Queues the create_event call of the client and returns immediately. The event keeps the
+        time it was submitted at, however late it's written."""
+        if not self.started:
+            self.start()
+        params = dict(params)
+        params.setdefault("event_timestamp", datetime.now(timezone.utc))
+        key = (params["actor_id"], params["session_id"])
+        with self.lock:
+            if self.closed:
+                self.spill([params])
+                return
+            events = self.sessions.setdefault(key, deque())
+            events.append((client, params))
+            if len(events) == 1:
+                self.ready.put(key)
+
+    def getPendingTurns(self, actorId:str, sessionId:str) -> list[list[dict]]:
+        """Turns of the session which aren't written yet, newest turn first, in the format of
+        MemoryClient.get_last_k_turns."""
+        with self.lock:
+            events = list(self.sessions.get((actorId, sessionId), ()))
+        return [[{"role": role, "content": {"text": text}} for text, role in params["messages"]]
+                for _, params in reversed(events)]
+
+    def run(self):
+        while True:
+            key = self.ready.get()
+            while True:
+                with self.lock:
+                    events = self.sessions.get(key)
+                    if self.closed or not events:
+                        break
+                    client, params = events[0]
+                    self.writing.add(key)
+                self.write(client, params)
+                with self.lock:
+                    self.writing.discard(key)
+                    events.popleft()
+                    if not events:
+                        del self.sessions[key]
+                        self.idle.notify_all()
+                        break
+
+    def write(self, client, params:dict):
+        for attempt in range(self.attempts):
+            try:
+                client.create_event(**params)
+                return
+            except Exception as e:
+                if attempt == self.attempts - 1 or self.closed:
+                    logger.error(f"Failed to write the memory event of session {params['session_id']}, spilling it: {e}")
+                    with self.lock:
+                        self.spill([params])
+                    return
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"Failed to write the memory event of session {params['session_id']}, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def flush(self, timeout:float=None) -> bool:
+        """Waits until every pending event is written, returns False on timeout."""
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.sessions, timeout)
+
+    def close(self, timeout:float=MEMORY_WRITER_FLUSH_TIMEOUT):
+        """Flushes the pending events on shutdown. Events still pending after the timeout are
+        spilled to disk, apart from the ones being written."""
+        if not self.flush(timeout):
+            logger.warning(f"Memory events still pending after {timeout}s, spilling them to {self.spillPath}")
+        with self.lock:
+            self.closed = True
+            for key, events in list(self.sessions.items()):
+                if key in self.writing:
+                    self.spill([params for _, params in list(events)[1:]])
+                    while len(events) > 1:
+                        events.pop()
+                else:
+                    self.spill([params for _, params in events])
+                    del self.sessions[key]
+
+    def spill(self, events:list[dict]):
+        # Called with the lock held, so that spilled events are appended one at a time
+        if not events:
+            return
+        try:
+            with open(self.spillPath, "a") as file:
+                for params in events:
+                    file.write(json.dumps(dict(params, event_timestamp=params["event_timestamp"].isoformat())) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to spill {len(events)} memory events to {self.spillPath}: {e}")
+
+    def loadSpilled(self) -> list:
+        # Claimed by renaming, so that only one process writes the spilled events again
+        claimedPath = f"{self.spillPath}.{os.getpid()}"
+        try:
+            os.replace(self.spillPath, claimedPath)
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            logger.warning(f"Failed to claim the spilled memory events in {self.spillPath}: {e}")
+            return []
+        try:
+            with open(claimedPath) as file:
+                events = [json.loads(line) for line in file if line.strip()]
+            # Events spilled before timestamps were recorded are stamped when they are submitted again
+            for params in events:
+                if "event_timestamp" in params:
+                    params["event_timestamp"] = datetime.fromisoformat(params["event_timestamp"])
+            os.remove(claimedPath)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read the spilled memory events in {claimedPath}: {e}")
+            return []
+        logger.info(f"Writing {len(events)} spilled memory events again")
+        return [(self.clientFactory(params["memory_id"]), params) for params in events]